@@ -14,3 +14,11 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_asgi_application()
+
+# Renderizadores de PDF aquecidos na subida de cada worker (core/pdf.py)
+from django.conf import settings  # noqa: E402
+
+if settings.PDF_INICIAR_NO_SERVIDOR:
+    from core import pdf
+
+    pdf.iniciar()
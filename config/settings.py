@@ -30,6 +30,8 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Adicionado para arquivos estáticos em produção (WhiteNoise)
+    'core.metricas.MetricasMiddleware',  # Métricas do Prometheus em /metrics (core/metricas.py)
+    'core.consultas.ConsultasMiddleware',  # Nº e tempo das consultas SQL por view (core/consultas.py)
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -205,6 +207,10 @@ LOGGING = {
             'format': '{levelname} {asctime} {module} {message}',
             'style': '{',
         },
+        'mensagem': {
+            'format': '{message}',
+            'style': '{',
+        },
     },
     'handlers': {
         'file': {
@@ -213,6 +219,16 @@ LOGGING = {
             'filename': LOGS_DIR / 'sislicit.log',
             'formatter': 'verbose',
         },
+        # Uma linha JSON por consulta lenta (core/consultas.py), lida pelo comando consultas_lentas
+        'consultas_lentas': {
+            'level': 'WARNING',
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': LOGS_DIR / 'consultas_lentas.log',
+            'maxBytes': 10 * 1024 * 1024,
+            'backupCount': 5,
+            'encoding': 'utf-8',
+            'formatter': 'mensagem',
+        },
         'console': {
             'level': 'DEBUG',
             'class': 'logging.StreamHandler',
@@ -230,6 +246,11 @@ LOGGING = {
             'level': 'DEBUG',
             'propagate': False,
         },
+        'core.consultas_lentas': {
+            'handlers': ['consultas_lentas'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
     },
 }
 
@@ -247,12 +268,16 @@ SHORT_DATE_FORMAT = 'd/m/Y'
 SHORT_DATETIME_FORMAT = 'd/m/Y H:i'
 
 # ====================================
-# CONFIGURAÇÕES DE CACHE (Opcional)
+# CONFIGURAÇÕES DE CACHE
 # ====================================
+# Cache em arquivos: compartilhado pelos workers do gunicorn da mesma máquina, sem
+# serviço externo. Dashboard e relatórios usam chaves versionadas (core/cache.py).
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': config('CACHE_DIR', default=str(BASE_DIR / 'cache')),
+        'TIMEOUT': 24 * 60 * 60,  # Só para liberar espaço; a invalidação é pelas versões
+        'OPTIONS': {'MAX_ENTRIES': 2000},
     }
 }
 
@@ -265,7 +290,46 @@ SYSTEM_VERSION = '1.0.0'
 
 # Configurações de relatórios
 REPORT_MAX_RECORDS = 10000  # Máximo de registros por relatório
+REPORT_CHUNK_SIZE = 500  # Linhas por lote na renderização do relatório em PDF
+
+# Processos usados na geração de documentos em lote (ZIP): um pool por worker do
+# gunicorn, dividido entre os downloads simultâneos (core/lote.py)
+DOCUMENTOS_LOTE_PROCESSOS = min(4, os.cpu_count() or 1)
+
+# Renderizadores de PDF (core/pdf.py). Com 0 o PDF é gerado no próprio processo.
+PDF_RENDERIZADORES = config('PDF_RENDERIZADORES', default=2, cast=int)
+PDF_TEMPO_MAXIMO = 60  # Segundos por PDF antes de o renderizador ser descartado
+PDF_MEMORIA_MAXIMA_MB = 512  # Renderizador é reciclado ao passar deste pico de memória
+PDF_TAREFAS_POR_RENDERIZADOR = 500  # Reciclagem preventiva após N PDFs
+# Sobe os renderizadores quando o servidor web carrega config/wsgi.py (ou asgi.py), e
+# não no primeiro PDF pedido. Comandos do manage.py e testes não carregam esses módulos.
+PDF_INICIAR_NO_SERVIDOR = config('PDF_INICIAR_NO_SERVIDOR', default=True, cast=bool)
+
+# Biblioteca de textos do ETP: segundos que cada processo mantém os blocos em memória
+BLOCOS_TEXTO_TTL = 300
 
 # Configurações de backup
 BACKUP_ENABLED = config('BACKUP_ENABLED', default=False, cast=bool)
-BACKUP_DIR = BASE_DIR / 'backups'
\ No newline at end of file
+BACKUP_DIR = BASE_DIR / 'backups'
+
+# Configurações da fila de tarefas (python manage.py processar_tarefas)
+# O worker renova o sinal de vida da tarefa a cada TAREFAS_INTERVALO_SINAL segundos;
+# sem sinal por TAREFAS_TEMPO_MAXIMO segundos a tarefa volta à fila (worker morto), até
+# TAREFAS_MAX_TENTATIVAS execuções, e então fica com ERRO.
+TAREFAS_INTERVALO_SINAL = 30
+TAREFAS_TEMPO_MAXIMO = 120
+TAREFAS_MAX_TENTATIVAS = 3
+
+# Instrumentação SQL (core/consultas.py): requisição em que a mesma consulta se
+# repete este número de vezes é registrada como WARNING no log (provável N+1)
+CONSULTAS_LIMITE_REPETICOES = config('CONSULTAS_LIMITE_REPETICOES', default=5, cast=int)
+# Consultas que levam este tempo ou mais vão, com o plano de execução, para
+# logs/consultas_lentas.log (resumo: python manage.py consultas_lentas). 0 registra todas.
+CONSULTAS_LENTAS_MS = config('CONSULTAS_LENTAS_MS', default=200, cast=int)
+
+# Métricas do Prometheus (core/metricas.py): cada processo grava as suas nesta pasta
+# e /metrics soma todas. O Prometheus autentica com "Authorization: Bearer <token>";
+# usuários staff logados também podem abrir a página.
+METRICAS_DIR = config('METRICAS_DIR', default=str(BASE_DIR / 'metricas'))
+METRICAS_TOKEN = config('METRICAS_TOKEN', default='')
+METRICAS_INTERVALO_GRAVACAO = 1  # Segundos entre gravações do arquivo de cada processo
@@ -1,7 +1,8 @@
 # Arquivo: core/admin.py (Completo e Atualizado)
 
 from django.contrib import admin
-from .models import Orgao, Secretaria, Fornecedor, Processo, Responsavel
+from .busca import filtro_busca
+from .models import Orgao, Secretaria, Fornecedor, Processo, Responsavel, BlocoTexto
 
 class OrgaoAdmin(admin.ModelAdmin):
     list_display = ('nome', 'cnpj', 'email', 'telefone')
@@ -17,6 +18,7 @@ class ResponsavelAdmin(admin.ModelAdmin):
     list_display = ('nome', 'matricula', 'cargo', 'secretaria')
     search_fields = ('nome', 'matricula', 'cargo')
     list_filter = ('secretaria',)
+    list_select_related = ('secretaria__orgao',)  # Secretaria.__str__ mostra o órgão
 
 class FornecedorAdmin(admin.ModelAdmin):
     list_display = ('razao_social', 'cnpj', 'email')
@@ -28,9 +30,22 @@ class ProcessoAdmin(admin.ModelAdmin):
     list_display = ('numero_processo', 'orgao_responsavel', 'secretaria_responsavel', 'responsavel_demanda', 'modalidade', 'status')
     search_fields = ('numero_processo', 'objeto')
     list_filter = ('status', 'modalidade', 'orgao_responsavel', 'secretaria_responsavel')
+    list_select_related = ('orgao_responsavel', 'secretaria_responsavel__orgao', 'responsavel_demanda')
+
+    def get_search_results(self, request, queryset, search_term):
+        # Usa o índice FTS5 (core/busca.py) em vez de icontains em objeto
+        if not search_term.strip():
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(filtro_busca(search_term)), False
+
+class BlocoTextoAdmin(admin.ModelAdmin):
+    list_display = ('campo', 'orgao', 'data_atualizacao')
+    search_fields = ('texto',)
+    list_filter = ('campo', 'orgao')
 
 admin.site.register(Orgao, OrgaoAdmin)
 admin.site.register(Secretaria, SecretariaAdmin)
 admin.site.register(Responsavel, ResponsavelAdmin) # <-- Registro do novo modelo
 admin.site.register(Fornecedor, FornecedorAdmin)
-admin.site.register(Processo, ProcessoAdmin)
\ No newline at end of file
+admin.site.register(Processo, ProcessoAdmin)
+admin.site.register(BlocoTexto, BlocoTextoAdmin)
\ No newline at end of file
@@ -0,0 +1,124 @@
+# Arquivo: core/analise.py (Tempo entre etapas dos processos)
+
+# Quanto tempo cada etapa leva, medido no histórico: os dias entre a conclusão de uma
+# etapa e a da etapa concluída imediatamente antes no mesmo processo (ou a abertura,
+# para a primeira), e o tempo total da abertura até a homologação.
+#
+# A etapa anterior vem de uma window function (LAG particionado por processo), numa
+# única leitura sequencial do histórico. Como o SQLite não tem funções de percentil,
+# a distribuição (média, mediana, p90, máximo) é calculada aqui e gravada em
+# TempoEtapa pelo comando `calcular_tempos_etapas`, agendado para rodar à noite.
+# Relatório e endpoint JSON só leem esse resumo.
+from collections import defaultdict
+from datetime import datetime, time
+from statistics import fmean
+
+from django.db import transaction
+from django.db.models import F, Window
+from django.db.models.functions import Lag
+from django.utils import timezone
+
+from .models import HistoricoProcesso, Processo, Orgao, Secretaria, TempoEtapa, ETAPAS_CHOICES
+
+TAMANHO_LOTE_LEITURA = 5000
+SEGUNDOS_POR_DIA = 24 * 60 * 60
+ETAPA_FINAL = 'HOMOLOGACAO'
+
+# Ordem de exibição: etapas na ordem do processo, o total por último
+ORDEM_ETAPAS = {etapa: ordem for ordem, (etapa, _) in enumerate(ETAPAS_CHOICES + [(TempoEtapa.ETAPA_TOTAL, '')])}
+
+
+def _inicio_do_dia(data):
+    return timezone.make_aware(datetime.combine(data, time.min))
+
+
+def _dias(inicio, fim):
+    return max((fim - inicio).total_seconds(), 0) / SEGUNDOS_POR_DIA
+
+
+def intervalos_etapas():
+    """
+    Gera (etapa, dias, modalidade, orgao_id, secretaria_id) para cada etapa concluída,
+    mais uma medição TOTAL (abertura até a homologação) por processo homologado.
+    """
+    anterior = Window(
+        Lag('data_conclusao'), partition_by=F('processo_id'), order_by=[F('data_conclusao').asc(), F('pk').asc()]
+    )
+    historico = HistoricoProcesso.objects.annotate(anterior=anterior).values_list(
+        'etapa', 'data_conclusao', 'anterior', 'processo__data_abertura',
+        'processo__modalidade', 'processo__orgao_responsavel_id', 'processo__secretaria_responsavel_id',
+    ).order_by()
+    for etapa, conclusao, concluida_antes, abertura, modalidade, orgao_id, secretaria_id in historico.iterator(chunk_size=TAMANHO_LOTE_LEITURA):
+        inicio_processo = _inicio_do_dia(abertura)
+        yield etapa, _dias(concluida_antes or inicio_processo, conclusao), modalidade, orgao_id, secretaria_id
+        if etapa == ETAPA_FINAL:
+            yield TempoEtapa.ETAPA_TOTAL, _dias(inicio_processo, conclusao), modalidade, orgao_id, secretaria_id
+
+
+def _recortes(modalidade, orgao_id, secretaria_id):
+    yield 'GERAL', ''
+    yield 'MODALIDADE', modalidade
+    yield 'ORGAO', str(orgao_id)
+    if secretaria_id:
+        yield 'SECRETARIA', str(secretaria_id)
+
+
+def _percentil(ordenados, fracao):
+    """Percentil com interpolação linear entre as duas posições vizinhas."""
+    posicao = (len(ordenados) - 1) * fracao
+    abaixo = int(posicao)
+    acima = min(abaixo + 1, len(ordenados) - 1)
+    return ordenados[abaixo] + (ordenados[acima] - ordenados[abaixo]) * (posicao - abaixo)
+
+
+def _rotulos():
+    rotulos = {('GERAL', ''): 'Todos os Processos'}
+    rotulos.update({('MODALIDADE', chave): nome for chave, nome in Processo.MODALIDADE_CHOICES})
+    rotulos.update({('ORGAO', str(pk)): nome for pk, nome in Orgao.objects.values_list('pk', 'nome')})
+    rotulos.update({('SECRETARIA', str(pk)): nome for pk, nome in Secretaria.objects.values_list('pk', 'nome')})
+    return rotulos
+
+
+def calcular_tempos():
+    """Refaz a tabela TempoEtapa a partir de todo o histórico. Retorna o número de linhas gravadas."""
+    duracoes = defaultdict(list)
+    for etapa, dias, modalidade, orgao_id, secretaria_id in intervalos_etapas():
+        for dimensao, valor in _recortes(modalidade, orgao_id, secretaria_id):
+            duracoes[dimensao, valor, etapa].append(dias)
+
+    rotulos = _rotulos()
+    agora = timezone.now()
+    linhas = []
+    for (dimensao, valor, etapa), dias in duracoes.items():
+        dias.sort()
+        linhas.append(TempoEtapa(
+            dimensao=dimensao, valor=valor, rotulo=rotulos.get((dimensao, valor), valor), etapa=etapa,
+            quantidade=len(dias), media_dias=round(fmean(dias), 2), mediana_dias=round(_percentil(dias, 0.5), 2),
+            p90_dias=round(_percentil(dias, 0.9), 2), maximo_dias=round(dias[-1], 2), calculado_em=agora,
+        ))
+    with transaction.atomic():
+        TempoEtapa.objects.all().delete()
+        TempoEtapa.objects.bulk_create(linhas, batch_size=500)
+    return len(linhas)
+
+
+# ==============================================================================
+# CONSULTA DO RESUMO
+# ==============================================================================
+def recortes_disponiveis():
+    """[(dimensao, valor, rotulo), ...] com resultado calculado, para o seletor do relatório."""
+    recortes = TempoEtapa.objects.order_by().values_list('dimensao', 'valor', 'rotulo').distinct()
+    ordem_dimensao = {chave: ordem for ordem, (chave, _) in enumerate(TempoEtapa.DIMENSAO_CHOICES)}
+    return sorted(recortes, key=lambda recorte: (ordem_dimensao[recorte[0]], recorte[2]))
+
+
+def tempos_do_recorte(dimensao='GERAL', valor=''):
+    """Linhas de TempoEtapa do recorte, na ordem das etapas (o total por último)."""
+    linhas = TempoEtapa.objects.filter(dimensao=dimensao, valor=valor)
+    return sorted(linhas, key=lambda linha: ORDEM_ETAPAS.get(linha.etapa, len(ORDEM_ETAPAS)))
+
+
+def gargalo(linhas):
+    """A etapa com a maior mediana (onde os processos mais ficam parados), sem contar o total."""
+    etapas = [linha for linha in linhas if linha.etapa != TempoEtapa.ETAPA_TOTAL]
+    return max(etapas, key=lambda linha: linha.mediana_dias, default=None)
@@ -0,0 +1,163 @@
+# Arquivo: core/busca.py (Busca textual nos processos - SQLite FTS5)
+
+# O índice é a tabela virtual core_processo_busca (FTS5, criada na migração 0018),
+# com uma linha por processo e rowid = id do Processo. O tokenizador unicode61 com
+# remove_diacritics faz "combustivel" encontrar "combustível".
+#
+# Quem mantém o índice são os signals de core/signals.py. Gravações que não disparam
+# signals (bulk_create, queryset.update) devem chamar indexar_processos() com os ids
+# afetados; o comando `reindexar_busca` reconstrói o índice inteiro.
+#
+# Em outros bancos (sem FTS5) a busca cai para icontains, sem ranking nem trechos.
+import re
+from dataclasses import dataclass
+from django.db import connection
+from django.db.models import Q, TextField
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Processo, ProcessoETP
+
+TABELA_BUSCA = 'core_processo_busca'
+BUSCA_POR_PAGINA = 20
+TAMANHO_LOTE_INDICE = 500
+
+# Colunas do índice e o peso de cada uma no ranking (bm25)
+COLUNAS_BUSCA = ('numero_processo', 'objeto', 'justificativa', 'descricao_detalhada_objeto', 'etp')
+PESOS_BUSCA = (10.0, 5.0, 2.0, 2.0, 1.0)
+
+# Campos de Processo que, alterados, exigem reindexar a linha
+CAMPOS_PROCESSO_BUSCA = frozenset(COLUNAS_BUSCA[:-1])
+
+# Marcadores do trecho destacado; viram <mark> depois do escape do texto
+_INICIO, _FIM = '\x02', '\x03'
+
+
+@dataclass
+class ResultadoBusca:
+    processo: Processo
+    trecho: str
+    relevancia: float
+
+
+def busca_disponivel():
+    return connection.vendor == 'sqlite'
+
+
+def _colunas_etp():
+    # Todas as seções de texto do ETP, concatenadas numa única coluna do índice.
+    # Seções nulas (texto da biblioteca) não entram: o índice só guarda texto próprio.
+    return [campo.column for campo in ProcessoETP._meta.fields if isinstance(campo, TextField)]
+
+
+def _select_documentos(filtro=''):
+    etp = " || ' ' || ".join(f"COALESCE(e.{coluna}, '')" for coluna in _colunas_etp())
+    return (
+        f"SELECT p.id, p.numero_processo, p.objeto, p.justificativa, p.descricao_detalhada_objeto, {etp} "
+        f"FROM core_processo p LEFT JOIN core_processoetp e ON e.processo_id = p.id {filtro}"
+    )
+
+
+def _inserir(cursor, filtro='', params=()):
+    cursor.execute(
+        f"INSERT INTO {TABELA_BUSCA} (rowid, {', '.join(COLUNAS_BUSCA)}) {_select_documentos(filtro)}", params
+    )
+
+
+def indexar_processos(ids):
+    """(Re)indexa os processos `ids`; os que não existem mais saem do índice."""
+    if not busca_disponivel():
+        return
+    ids = list(ids)
+    with connection.cursor() as cursor:
+        for inicio in range(0, len(ids), TAMANHO_LOTE_INDICE):
+            lote = ids[inicio:inicio + TAMANHO_LOTE_INDICE]
+            marcadores = ', '.join(['%s'] * len(lote))
+            cursor.execute(f'DELETE FROM {TABELA_BUSCA} WHERE rowid IN ({marcadores})', lote)
+            _inserir(cursor, f'WHERE p.id IN ({marcadores})', lote)
+
+
+def remover_processos(ids):
+    if not busca_disponivel():
+        return
+    ids = list(ids)
+    with connection.cursor() as cursor:
+        for inicio in range(0, len(ids), TAMANHO_LOTE_INDICE):
+            lote = ids[inicio:inicio + TAMANHO_LOTE_INDICE]
+            cursor.execute(f"DELETE FROM {TABELA_BUSCA} WHERE rowid IN ({', '.join(['%s'] * len(lote))})", lote)
+
+
+def reindexar():
+    """Reconstrói o índice inteiro e o compacta. Retorna o número de processos indexados."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABELA_BUSCA}')
+        _inserir(cursor)
+        cursor.execute(f"INSERT INTO {TABELA_BUSCA} ({TABELA_BUSCA}) VALUES ('optimize')")
+        cursor.execute(f'SELECT COUNT(*) FROM {TABELA_BUSCA}')
+        return cursor.fetchone()[0]
+
+
+def consulta_fts(texto):
+    """
+    Converte o texto digitado numa consulta FTS5 segura: cada palavra vira um termo
+    entre aspas com prefixo ("merend"*), todos obrigatórios. Aspas, parênteses e
+    operadores digitados pelo usuário não chegam ao MATCH.
+    """
+    return ' '.join(f'"{termo}"*' for termo in re.findall(r'\w+', texto or ''))
+
+
+def filtro_busca(texto):
+    """Q com os processos que casam com `texto` (usado pela busca do admin)."""
+    consulta = consulta_fts(texto)
+    if not consulta:
+        return Q(pk__in=[])
+    if busca_disponivel():
+        return Q(pk__in=RawSQL(f'SELECT rowid FROM {TABELA_BUSCA} WHERE {TABELA_BUSCA} MATCH %s', [consulta]))
+    condicao = Q()
+    for termo in re.findall(r'\w+', texto or ''):
+        condicao &= Q(numero_processo__icontains=termo) | Q(objeto__icontains=termo) | Q(justificativa__icontains=termo)
+    return condicao
+
+
+def _destacar(trecho):
+    trecho = re.sub(r'\s+', ' ', trecho).strip()  # seções do ETP vazias deixam espaços sobrando
+    return mark_safe(escape(trecho).replace(_INICIO, '<mark>').replace(_FIM, '</mark>'))
+
+
+def buscar_processos(texto, pagina=1, por_pagina=BUSCA_POR_PAGINA):
+    """
+    Processos que casam com `texto`, do mais relevante ao menos relevante.
+    Retorna (resultados, tem_mais); cada resultado traz o trecho com os termos em <mark>.
+    """
+    consulta = consulta_fts(texto)
+    if not consulta:
+        return [], False
+    deslocamento = (pagina - 1) * por_pagina
+    relacionados = ('orgao_responsavel', 'secretaria_responsavel')
+
+    if not busca_disponivel():
+        processos = list(Processo.objects.select_related(*relacionados).filter(filtro_busca(texto))
+                         .order_by('-data_abertura', '-id')[deslocamento:deslocamento + por_pagina + 1])
+        resultados = [ResultadoBusca(processo, escape(processo.objeto), 0.0) for processo in processos]
+        return resultados[:por_pagina], len(resultados) > por_pagina
+
+    pesos = ', '.join(str(peso) for peso in PESOS_BUSCA)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT rowid, bm25({TABELA_BUSCA}, {pesos}) AS relevancia, "
+            f"snippet({TABELA_BUSCA}, -1, '{_INICIO}', '{_FIM}', '…', 16) "
+            f"FROM {TABELA_BUSCA} WHERE {TABELA_BUSCA} MATCH %s ORDER BY relevancia LIMIT %s OFFSET %s",
+            [consulta, por_pagina + 1, deslocamento]
+        )
+        linhas = cursor.fetchall()
+
+    tem_mais = len(linhas) > por_pagina
+    linhas = linhas[:por_pagina]
+    processos = Processo.objects.select_related(*relacionados).in_bulk([linha[0] for linha in linhas])
+    resultados = [
+        # bm25 é negativo (menor = mais relevante); a relevância exposta é positiva
+        ResultadoBusca(processos[pk], _destacar(trecho), round(-relevancia, 6))
+        for pk, relevancia, trecho in linhas if pk in processos
+    ]
+    return resultados, tem_mais
@@ -0,0 +1,63 @@
+# Arquivo: core/cache.py (Cache versionado do dashboard e dos relatórios)
+
+# Cada valor em cache é guardado numa chave que inclui a versão atual dos modelos de
+# que ele depende (ContadorVersao). Os signals de core/signals.py incrementam a
+# versão do modelo a cada save/delete; a chave antiga deixa de ser lida e expira
+# sozinha. Não há TTL a calibrar: o valor vale exatamente até a próxima gravação.
+#
+# Gravações que não disparam signals (bulk_create, queryset.update) devem chamar
+# invalidar() com os modelos afetados.
+import hashlib
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import ContadorVersao, Processo, HistoricoProcesso, Documento, Orgao, Secretaria
+
+# Modelos com contador de versão. Órgão e Secretaria entram porque o dashboard e o
+# relatório exibem seus nomes.
+MODELOS_VERSIONADOS = (Processo, HistoricoProcesso, Documento, Orgao, Secretaria)
+
+
+def _rotulo(modelo):
+    return modelo._meta.label_lower
+
+
+def versoes(modelos):
+    """Versão atual de cada modelo, em uma consulta. Modelo ainda sem contador está na versão 0."""
+    rotulos = [_rotulo(modelo) for modelo in modelos]
+    gravadas = dict(ContadorVersao.objects.filter(modelo__in=rotulos).values_list('modelo', 'versao'))
+    return [gravadas.get(rotulo, 0) for rotulo in rotulos]
+
+
+def invalidar(*modelos):
+    """Incrementa a versão dos modelos: tudo que foi guardado dependendo deles deixa de valer."""
+    for modelo in modelos:
+        contador = ContadorVersao.objects.filter(modelo=_rotulo(modelo))
+        if contador.update(versao=F('versao') + 1):
+            continue
+        try:
+            with transaction.atomic():
+                ContadorVersao.objects.create(modelo=_rotulo(modelo), versao=1)
+        except IntegrityError:
+            # Outra requisição criou o contador entre o UPDATE e o INSERT
+            contador.update(versao=F('versao') + 1)
+
+
+def chave_versionada(nome, modelos, *partes):
+    versao = '.'.join(str(numero) for numero in versoes(modelos))
+    sufixo = hashlib.sha1(repr(partes).encode('utf-8')).hexdigest() if partes else ''
+    return f'{nome}:{versao}:{sufixo}'
+
+
+def obter_ou_calcular(nome, modelos, calcular, *partes):
+    """
+    Valor em cache de `nome` (com os parâmetros `partes`) para as versões atuais de
+    `modelos`; se não houver, chama calcular() e guarda o resultado.
+    """
+    chave = chave_versionada(nome, modelos, *partes)
+    valor = cache.get(chave)
+    if valor is None:
+        valor = calcular()
+        cache.set(chave, valor)
+    return valor
@@ -0,0 +1,198 @@
+# Arquivo: core/consultas.py (Número e tempo das consultas SQL por view)
+
+# RegistroConsultas instala um execute_wrapper na conexão e anota cada consulta
+# executada com o tempo gasto. O "formato" de uma consulta é o SQL com as listas de
+# parâmetros de IN (...) colapsadas: o mesmo formato executado várias vezes numa
+# requisição quase sempre é um N+1 (um __str__ ou um acesso a FK dentro de um laço).
+#
+# ConsultasMiddleware registra cada requisição e escreve no logger `core.consultas`
+# uma linha por view (DEBUG) com o número de consultas e o tempo em SQL; se algum
+# formato se repetir CONSULTAS_LIMITE_REPETICOES vezes ou mais, a linha sai como
+# WARNING, com os formatos repetidos. Os testes de core/tests.py usam o mesmo registro
+# para impor um orçamento de consultas a cada URL.
+#
+# Consultas mais lentas que CONSULTAS_LENTAS_MS vão para o logger
+# `core.consultas_lentas` (logs/consultas_lentas.log, com rotação), uma linha JSON por
+# consulta: view, SQL sem os valores dos parâmetros, linha de core/views.py de onde
+# partiu e o plano de execução (EXPLAIN QUERY PLAN no SQLite). O plano é obtido depois
+# da requisição, fora do registro: não conta nas consultas da view. O comando
+# `consultas_lentas` resume o arquivo.
+#
+# Respostas em streaming (CSV, ZIP) consultam o banco depois que o middleware
+# devolve a resposta; essas consultas não entram na contagem.
+import json
+import logging
+import os
+import re
+import time
+import traceback
+from collections import Counter
+from dataclasses import dataclass
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+logger = logging.getLogger('core.consultas')
+logger_lentas = logging.getLogger('core.consultas_lentas')
+
+_LISTA_PARAMETROS = re.compile(r'\(\s*%s(?:\s*,\s*%s)*\s*\)')
+_ESPACOS = re.compile(r'\s+')
+
+
+def formato_consulta(sql):
+    """SQL sem a variação de tamanho das listas de parâmetros, para agrupar consultas iguais."""
+    return _LISTA_PARAMETROS.sub('(...)', _ESPACOS.sub(' ', sql).strip())
+
+
+# ==============================================================================
+# CONSULTAS LENTAS
+# ==============================================================================
+_PASTA_CORE = os.path.dirname(os.path.abspath(__file__))
+_ARQUIVO_VIEWS = os.path.join(_PASTA_CORE, 'views.py')
+# Middlewares por onde toda consulta passa: não dizem de onde ela partiu
+_ARQUIVOS_IGNORADOS = {os.path.join(_PASTA_CORE, arquivo) for arquivo in ('consultas.py', 'metricas.py')}
+_INSTRUCOES_COM_PLANO = ('SELECT', 'WITH', 'UPDATE', 'DELETE')
+
+
+@dataclass
+class ConsultaLenta:
+    sql: str
+    params: object
+    segundos: float
+    local: str  # Linha de core/views.py na pilha
+    origem: str  # Linha mais interna do app (core/relatorios.py, um __str__ de core/models.py...)
+
+
+def _descrever(frame, linha):
+    arquivo = os.path.relpath(frame.f_code.co_filename, os.path.dirname(_PASTA_CORE))
+    return f'{arquivo}:{linha} {frame.f_code.co_name}'
+
+
+def locais_na_pilha():
+    """(linha de core/views.py, linha mais interna de core/) da pilha atual, sem os middlewares."""
+    origem = None
+    for frame, linha in traceback.walk_stack(None):  # Sem ler o código-fonte: só arquivo e linha
+        arquivo = os.path.abspath(frame.f_code.co_filename)
+        if not arquivo.startswith(_PASTA_CORE) or arquivo in _ARQUIVOS_IGNORADOS:
+            continue
+        origem = origem or _descrever(frame, linha)
+        if arquivo == _ARQUIVO_VIEWS:
+            return _descrever(frame, linha), origem
+    return None, origem
+
+
+def plano_de_execucao(sql, params):
+    """Linhas do plano de execução da consulta; vazio para instruções sem plano (INSERT, SAVEPOINT)."""
+    if not sql.lstrip().upper().startswith(_INSTRUCOES_COM_PLANO):
+        return []
+    try:
+        # Em savepoint: no PostgreSQL um EXPLAIN com erro não invalida a transação da requisição
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+            linhas = cursor.fetchall()
+    except DatabaseError as erro:
+        return [f'(plano indisponível: {erro})']
+    if connection.vendor in ('sqlite', 'postgresql'):
+        return [str(linha[-1]) for linha in linhas]  # SQLite: (id, pai, -, detalhe)
+    return [' | '.join(map(str, linha)) for linha in linhas]
+
+
+def registrar_lentas(request, lentas):
+    """Escreve no logger `core.consultas_lentas` uma linha JSON por consulta lenta, com o plano."""
+    quando = timezone.now().isoformat(timespec='seconds')
+    for consulta in lentas:
+        # Só o SQL com %s: os valores dos parâmetros (CPF, e-mail...) não vão para o log
+        logger_lentas.warning(json.dumps({
+            'quando': quando,
+            'view': nome_da_view(request),
+            'metodo': request.method,
+            'ms': round(consulta.segundos * 1000, 1),
+            'sql': consulta.sql,
+            'local': consulta.local,
+            'origem': consulta.origem,
+            'plano': plano_de_execucao(consulta.sql, consulta.params),
+        }, ensure_ascii=False, default=str))
+
+
+class RegistroConsultas:
+    """
+    Registra as consultas executadas na conexão padrão dentro do bloco `with`:
+
+        with RegistroConsultas() as registro:
+            ...
+        registro.total, registro.tempo, registro.repetidas()
+
+    Com `limite_lentas` (segundos), as consultas que demorarem isso ou mais ficam também
+    em `registro.lentas`, com parâmetros e o ponto da pilha de onde partiram.
+    """
+
+    def __init__(self, limite_lentas=None):
+        self.consultas = []  # [(sql, segundos), ...]
+        self.limite_lentas = limite_lentas
+        self.lentas = []  # [ConsultaLenta, ...]
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            resultado = execute(sql, params, many, context)
+        finally:
+            segundos = time.perf_counter() - inicio
+            self.consultas.append((sql, segundos))
+        if self.limite_lentas is not None and segundos >= self.limite_lentas and not many:
+            self.lentas.append(ConsultaLenta(sql, params, segundos, *locais_na_pilha()))
+        return resultado
+
+    def __enter__(self):
+        self._wrapper = connection.execute_wrapper(self)
+        self._wrapper.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._wrapper.__exit__(*exc_info)
+
+    @property
+    def total(self):
+        return len(self.consultas)
+
+    @property
+    def tempo(self):
+        """Segundos gastos em SQL."""
+        return sum(segundos for _, segundos in self.consultas)
+
+    def repetidas(self, minimo=2):
+        """[(formato, vezes), ...] dos formatos executados `minimo` vezes ou mais, do mais repetido ao menos."""
+        contagem = Counter(formato_consulta(sql) for sql, _ in self.consultas)
+        return [(formato, vezes) for formato, vezes in contagem.most_common() if vezes >= minimo]
+
+    def relatorio(self):
+        """As consultas numeradas, para mensagens de erro dos testes e para o log."""
+        return '\n'.join(f'{numero}. ({segundos * 1000:.1f} ms) {sql}' for numero, (sql, segundos) in enumerate(self.consultas, 1))
+
+
+def nome_da_view(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else request.path
+
+
+class ConsultasMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.limite_repeticoes = getattr(settings, 'CONSULTAS_LIMITE_REPETICOES', 5)
+
+    def __call__(self, request):
+        limite_ms = getattr(settings, 'CONSULTAS_LENTAS_MS', None)
+        with RegistroConsultas(None if limite_ms is None else limite_ms / 1000) as registro:
+            response = self.get_response(request)
+        if registro.lentas:
+            registrar_lentas(request, registro.lentas)
+        request.registro_consultas = registro  # Lido por core.metricas.MetricasMiddleware
+        repetidas = registro.repetidas(self.limite_repeticoes)
+        nivel = logging.WARNING if repetidas else logging.DEBUG
+        if logger.isEnabledFor(nivel):
+            linhas = [f'{vezes}x {formato[:300]}' for formato, vezes in repetidas[:5]]
+            logger.log(
+                nivel, '%s %s: %d consultas, %.1f ms em SQL%s', request.method, nome_da_view(request),
+                registro.total, registro.tempo * 1000, ''.join(f'\n  {linha}' for linha in linhas),
+            )
+        return response
@@ -0,0 +1,277 @@
+# Arquivo: core/documentos.py (Geração dos documentos Word a partir dos templates .docx)
+
+import io, os, json, uuid, hashlib
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from django.conf import settings
+
+from docxtpl import DocxTemplate
+from jinja2 import Environment
+
+from .models import Processo, Documento
+from .metricas import cronometrar
+
+# ==============================================================================
+# TEMPLATES .DOCX (templates_docx/)
+# ==============================================================================
+# Incrementar quando a montagem do contexto mudar. Alterações nos arquivos .docx
+# já invalidam o cache sozinhas, pois o hash do template entra no hash do documento.
+VERSAO_GERADOR = '3'
+
+PASTA_TEMPLATES = settings.BASE_DIR / 'templates_docx'
+
+TEMPLATES_DOCX = {
+    'DFD': 'dfd_template.docx',
+    'ETP': 'etp_template.docx',
+    'TR': 'tr_template.docx',
+}
+
+PREFIXO_ARQUIVO = {'DFD': 'DFD', 'ETP': 'ETP', 'TR': 'TR'}
+
+
+class ModeloDocx:
+    """
+    Template .docx carregado uma única vez por processo: os bytes ficam em memória,
+    junto com o ambiente Jinja e a lista de variáveis usadas. Cada geração abre uma
+    cópia do pacote a partir da memória (sem ler o disco) e preenche pela API
+    pública do docxtpl (DocxTemplate.render).
+    """
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.modificado_em = os.path.getmtime(caminho)
+        with open(caminho, 'rb') as arquivo:
+            self.conteudo = arquivo.read()
+        self.assinatura = hashlib.sha256(self.conteudo).hexdigest()
+        # autoescape: textos com '&' ou '<' não podem quebrar o XML do documento
+        self.ambiente = Environment(autoescape=True)
+        self.variaveis = sorted(DocxTemplate(io.BytesIO(self.conteudo)).get_undeclared_template_variables(self.ambiente))
+
+    def renderizar(self, contexto):
+        doc = DocxTemplate(io.BytesIO(self.conteudo))
+        doc.render(contexto, jinja_env=self.ambiente)
+        return doc
+
+
+_modelos = {}
+
+
+def carregar_modelo(tipo):
+    """Retorna o ModeloDocx do tipo, recarregando só se o arquivo .docx foi alterado em disco."""
+    caminho = PASTA_TEMPLATES / TEMPLATES_DOCX[tipo]
+    modelo = _modelos.get(tipo)
+    if modelo is None or modelo.modificado_em != os.path.getmtime(caminho):
+        modelo = _modelos[tipo] = ModeloDocx(caminho)
+    return modelo
+
+
+# ==============================================================================
+# CONTEXTO DO PROCESSO
+# ==============================================================================
+def formata_moeda(valor):
+    if valor in (None, ""): 
+        return "Não informado"
+    try: 
+        v = Decimal(str(valor))
+    except (InvalidOperation, ValueError, TypeError): 
+        return "Não informado"
+    reais, centavos = int(v), int((v - int(v)) * 100)
+    reais_fmt = f"{reais:,d}".replace(",", ".")
+    return f"R$ {reais_fmt},{centavos:02d}"
+
+
+def _meses(valor):
+    return f'{valor} meses' if valor else ''
+
+
+# Documentos que usam o ETP inteiro (ProcessoETP e seus responsáveis); o DFD só
+# precisa da justificativa da contratação
+TIPOS_COM_ETP = ('ETP', 'TR')
+
+RELACIONADOS_PROCESSO = ('orgao_responsavel', 'secretaria_responsavel', 'responsavel_demanda', 'etp')
+RELACIONADOS_ETP = ('etp__etp_responsavel_elaboracao', 'etp__etp_autoridade_competente')
+
+
+def processos_para_documento(tipo):
+    """Queryset de Processo que já traz, na mesma consulta, tudo o que o documento `tipo` usa."""
+    relacionados = RELACIONADOS_PROCESSO + (RELACIONADOS_ETP if tipo in TIPOS_COM_ETP else ())
+    return Processo.objects.select_related(*relacionados)
+
+
+def carregar_processo(processo_id, tipo):
+    return processos_para_documento(tipo).get(pk=processo_id)
+
+
+def contexto_processo(processo, tipo):
+    """Contexto usado pelos templates de DFD, ETP e TR (as chaves do ETP só para ETP e TR)."""
+    orgao = processo.orgao_responsavel
+    secretaria = processo.secretaria_responsavel
+    demanda = processo.responsavel_demanda
+    secretaria_nome = secretaria.nome if secretaria else ''
+    data_hoje = date.today().strftime('%d/%m/%Y')
+    # Seções vazias no ETP vêm da biblioteca de textos (BlocoTexto) do órgão
+    etp = processo.get_etp()
+
+    contexto = {
+        # Identificação
+        'numero_processo': processo.numero_processo,
+        'orgao_nome': orgao.nome,
+        'cnpj': orgao.cnpj,
+        'secretaria_nome': secretaria_nome,
+        'unidade_requisitante': secretaria_nome,
+        'setor_demandante': secretaria_nome,
+        'area_requisitante': secretaria_nome,
+        'data_hoje': data_hoje,
+        'data_elaboracao': data_hoje,
+        'texto_legal': 'art. 18 da Lei nº 14.133/2021',
+
+        # Responsáveis
+        'responsavel_demanda_informado': demanda is not None,
+        'responsavel_demanda_nome': demanda.nome if demanda else 'A ser definido',
+        'responsavel_demanda_cargo': demanda.cargo if demanda else '',
+        'responsavel_demanda_matricula': demanda.matricula if demanda else '',
+
+        # Objeto e necessidade
+        'objeto': processo.objeto,
+        'objeto_contratacao': processo.descricao_detalhada_objeto or processo.objeto,
+        'descricao_detalhada_objeto': processo.descricao_detalhada_objeto or processo.objeto,
+        'justificativa': processo.justificativa or 'A ser preenchido.',
+        'descricao_necessidade': processo.justificativa or 'A ser preenchido.',
+        'justificativa_contratacao': etp.etp_justificativa_contratacao,
+
+        # Valores, prazos e modalidade
+        'valor_estimado': formata_moeda(processo.valor_estimado),
+        'valor_estimado_informado': processo.valor_estimado is not None,
+        'vigencia_meses': _meses(processo.vigencia_meses),
+        'vigencia_contratual': _meses(processo.vigencia_meses),
+        'modalidade_licitacao': processo.get_modalidade_display(),
+    }
+    if tipo not in TIPOS_COM_ETP:
+        return contexto
+
+    elaboracao = etp.etp_responsavel_elaboracao
+    autoridade = etp.etp_autoridade_competente
+    contexto.update({
+        # Responsáveis
+        'responsavel_elaboracao': elaboracao.nome if elaboracao else '',
+        'cargo_responsavel': elaboracao.cargo if elaboracao else '',
+        'matricula_responsavel': elaboracao.matricula if elaboracao else '',
+        'cargo_matricula': f'{elaboracao.cargo} / {elaboracao.matricula}' if elaboracao else '',
+        'autoridade_competente': autoridade.nome if autoridade else '',
+        'cargo_autoridade': autoridade.cargo if autoridade else '',
+        'gestor_contrato': etp.etp_gestor_contrato,
+        'fiscal_tecnico': etp.etp_fiscal_tecnico,
+        'fiscal_administrativo': etp.etp_fiscal_administrativo,
+
+        # Necessidade, prazos e critério
+        'justificativa_contratacao': etp.etp_justificativa_contratacao or processo.justificativa,
+        'metodologia_estimativa': etp.etp_estimativa_metodologia,
+        'prazo_execucao': _meses(etp.etp_prazo_execucao),
+        'justificativa_prazo': etp.etp_justificativa_prazo,
+        'criterio_julgamento': etp.get_etp_criterio_julgamento_display(),
+        'justificativa_modalidade': etp.etp_justificativa_modalidade_criterio,
+
+        # Seções do ETP
+        'requisitos_tecnicos': etp.etp_requisitos_tecnicos_detalhe,
+        'requisitos_capacitacao': etp.etp_requisitos_capacitacao_detalhe,
+        'analise_fornecedores': etp.etp_analise_fornecedores_detalhe,
+        'estimativa_quantidades': etp.texto('etp_texto_estimativa_quantidades'),
+        'solucao_proposta': etp.etp_solucao_proposta_detalhe or etp.texto('etp_descricao_solucao_texto'),
+        'analise_alternativas': etp.etp_analise_alternativas_detalhe,
+        'contratacoes_correlatas': etp.texto('etp_contratacoes_correlatas_texto'),
+        'alinhamento_estrategico': etp.etp_alinhamento_estrategico_texto or 'A contratação está alinhada com os objetivos estratégicos do órgão.',
+        'resultados_pretendidos': etp.texto('etp_resultados_pretendidos_texto'),
+        'providencias': etp.texto('etp_providencias_texto'),
+        'impactos_ambientais': etp.texto('etp_impactos_ambientais_texto'),
+        'lista_anexos': etp.etp_lista_anexos_texto,
+
+        # Dotação
+        'programa_trabalho': etp.etp_dotacao_programa_trabalho,
+        'natureza_despesa': etp.etp_dotacao_natureza_despesa,
+        'fonte_recursos': etp.etp_dotacao_fonte_recursos,
+    })
+    return contexto
+
+
+# ==============================================================================
+# CACHE DE DOCUMENTOS
+# ==============================================================================
+def hash_documento(processo, tipo, contexto=None):
+    """
+    Hash SHA-256 do que o documento `tipo` realmente usa: as variáveis presentes no
+    template, o próprio template e a versão do gerador.
+    """
+    modelo = carregar_modelo(tipo)
+    contexto = contexto if contexto is not None else contexto_processo(processo, tipo)
+    conteudo = {
+        'versao': VERSAO_GERADOR,
+        'tipo': tipo,
+        'template': modelo.assinatura,
+        'campos': {variavel: contexto.get(variavel) for variavel in modelo.variaveis},
+    }
+    serializado = json.dumps(conteudo, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(serializado.encode('utf-8')).hexdigest()
+
+
+def documento_em_cache(processo, tipo, hash_conteudo):
+    """Retorna o último Documento com o mesmo hash cujo arquivo ainda existe em disco."""
+    candidatos = Documento.objects.filter(processo=processo, tipo=tipo, hash_conteudo=hash_conteudo)
+    for documento in candidatos.order_by('-data_geracao'):
+        if os.path.exists(os.path.join(settings.MEDIA_ROOT, str(documento.arquivo))):
+            return documento
+    return None
+
+
+# ==============================================================================
+# GERAÇÃO
+# ==============================================================================
+def salvar_arquivo(doc, processo, tipo):
+    """Grava o .docx em MEDIA_ROOT/documentos e retorna o caminho relativo."""
+    # O sufixo aleatório impede que duas gerações no mesmo segundo sobrescrevam o
+    # arquivo para o qual um Documento já aponta
+    carimbo = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filename = f'{PREFIXO_ARQUIVO[tipo]}_{processo.numero_processo.replace("/", "-")}_{carimbo}_{uuid.uuid4().hex[:8]}.docx'
+    filepath = os.path.join(settings.MEDIA_ROOT, 'documentos', filename)
+    
+    # Criar diretório se não existir
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    
+    doc.save(filepath)
+    return f'documentos/{filename}'
+
+
+def preparar_arquivo(processo, tipo):
+    """
+    Garante que exista um arquivo para os dados atuais do processo, sem gravar no banco.
+    Retorna (documento_em_cache, arquivo, hash_conteudo); `documento_em_cache` vem None
+    quando o arquivo acabou de ser gerado e ainda precisa de um registro em Documento.
+    """
+    contexto = contexto_processo(processo, tipo)
+    hash_conteudo = hash_documento(processo, tipo, contexto)
+    documento = documento_em_cache(processo, tipo, hash_conteudo)
+    if documento is not None:
+        return documento, str(documento.arquivo), hash_conteudo
+    
+    with cronometrar('sislicit_docx_geracao_segundos', tipo=tipo):
+        doc = carregar_modelo(tipo).renderizar(contexto)
+        arquivo = salvar_arquivo(doc, processo, tipo)
+    return None, arquivo, hash_conteudo
+
+
+def obter_documento(processo, tipo, usuario=''):
+    """
+    Devolve (documento, gerado) para o processo. Se já existe um arquivo gerado a
+    partir dos mesmos dados, ele é reaproveitado e `gerado` vem False.
+    """
+    documento, arquivo, hash_conteudo = preparar_arquivo(processo, tipo)
+    if documento is not None:
+        return documento, False
+    
+    documento = Documento.objects.create(
+        processo=processo,
+        tipo=tipo,
+        arquivo=arquivo,
+        gerado_por=usuario,
+        hash_conteudo=hash_conteudo
+    )
+    return documento, True
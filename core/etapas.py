@@ -0,0 +1,117 @@
+# Arquivo: core/etapas.py (Conclusão de etapas e progresso desnormalizado do Processo)
+
+# HistoricoProcesso continua sendo a fonte da verdade (uma linha por etapa concluída,
+# com a data). Processo guarda um resumo para listas, filtros e relatórios:
+#   etapas_mascara     bit BIT_ETAPA[etapa] ligado para cada etapa concluída
+#   etapas_concluidas  quantidade de etapas concluídas
+#   ultima_etapa(_em)  a etapa concluída mais recentemente e quando
+# O resumo é atualizado no mesmo UPDATE/transação que grava o histórico, com
+# expressões F (sem ler e regravar a linha), e `recalcular_progresso` o refaz a
+# partir do histórico se algo gravar HistoricoProcesso por fora.
+from django.db import transaction
+from django.db.models import F, Q, Sum, Count, Case, When, Value, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import Exact
+
+from .models import Processo, HistoricoProcesso, BIT_ETAPA, mascara_etapas
+from .cache import invalidar
+from .status import aplicar_status
+
+CAMPOS_PROGRESSO = ('etapas_mascara', 'etapas_concluidas', 'ultima_etapa', 'ultima_etapa_em')
+
+
+def concluir_etapa(processo, etapa):
+    """
+    Registra a etapa como concluída e atualiza o resumo e o status do processo na
+    mesma transação. Retorna (historico, criado); etapa já concluída não altera nada.
+    """
+    bit = BIT_ETAPA[etapa]
+    with transaction.atomic():
+        historico, criado = HistoricoProcesso.objects.get_or_create(processo=processo, etapa=etapa)
+        if criado:
+            Processo.objects.filter(pk=processo.pk).update(
+                etapas_mascara=F('etapas_mascara').bitor(bit),
+                etapas_concluidas=F('etapas_concluidas') + 1,
+                ultima_etapa=etapa,
+                ultima_etapa_em=historico.data_conclusao,
+            )
+            aplicar_status(Processo.objects.filter(pk=processo.pk))
+    return historico, criado
+
+
+def concluir_etapas_em_lote(pares):
+    """
+    Conclui várias etapas [(processo_id, etapa), ...] numa transação: um INSERT com
+    bulk_create(ignore_conflicts) para o histórico e um único UPDATE nos processos
+    afetados, que refaz o progresso a partir do histórico; o status avança em
+    seguida (core/status.py). Processos inexistentes são ignorados. Retorna (pares
+    gravados, pares que já estavam concluídos).
+    """
+    pares = list(dict.fromkeys(pares))  # sem repetições, na ordem recebida
+    with transaction.atomic():
+        ids = set(Processo.objects.filter(pk__in={pk for pk, _ in pares}).values_list('pk', flat=True))
+        pares = [par for par in pares if par[0] in ids]
+        ja_concluidos = set(HistoricoProcesso.objects.filter(
+            processo_id__in=ids, etapa__in={etapa for _, etapa in pares}
+        ).values_list('processo_id', 'etapa'))
+        novos = [par for par in pares if par not in ja_concluidos]
+        # Outro usuário pode ter concluído a mesma etapa depois da leitura: ignore_conflicts
+        # descarta a linha repetida e o progresso abaixo é recalculado do histórico
+        HistoricoProcesso.objects.bulk_create(
+            [HistoricoProcesso(processo_id=processo_id, etapa=etapa) for processo_id, etapa in novos],
+            ignore_conflicts=True,
+        )
+
+        alterados = Processo.objects.filter(pk__in={pk for pk, _ in novos})
+        alterados.update(**_progresso_calculado())
+        aplicar_status(alterados)
+        if novos:
+            invalidar(Processo, HistoricoProcesso)
+    return novos, [par for par in pares if par in ja_concluidos]
+
+
+def filtrar_etapas(queryset, com=(), sem=()):
+    """Processos com todas as etapas `com` concluídas e nenhuma das etapas `sem`."""
+    if com:
+        mascara = mascara_etapas(com)
+        queryset = queryset.filter(Exact(F('etapas_mascara').bitand(mascara), mascara))
+    if sem:
+        queryset = queryset.filter(Exact(F('etapas_mascara').bitand(mascara_etapas(sem)), 0))
+    return queryset
+
+
+# ==============================================================================
+# RECÁLCULO A PARTIR DO HISTÓRICO
+# ==============================================================================
+def _progresso_calculado():
+    """Expressões que recalculam cada coluna do resumo a partir de HistoricoProcesso."""
+    historico = HistoricoProcesso.objects.filter(processo=OuterRef('pk')).order_by()
+    # (processo, etapa) é único, então somar os bits equivale a um OR
+    bits = Sum(Case(*[When(etapa=etapa, then=Value(bit)) for etapa, bit in BIT_ETAPA.items()], default=Value(0)))
+    mais_recente = historico.order_by('-data_conclusao', '-pk')
+    return {
+        'etapas_mascara': Coalesce(Subquery(historico.values('processo').annotate(bits=bits).values('bits')), 0),
+        'etapas_concluidas': Coalesce(Subquery(historico.values('processo').annotate(total=Count('pk')).values('total')), 0),
+        'ultima_etapa': Coalesce(Subquery(mais_recente.values('etapa')[:1]), Value('')),
+        'ultima_etapa_em': Subquery(mais_recente.values('data_conclusao')[:1]),
+    }
+
+
+def divergentes(queryset):
+    """Processos cujo resumo não bate com o histórico."""
+    calculado = {f'{campo}_calculado': expressao for campo, expressao in _progresso_calculado().items()}
+    return queryset.annotate(**calculado).exclude(
+        Q(etapas_mascara=F('etapas_mascara_calculado'))
+        & Q(etapas_concluidas=F('etapas_concluidas_calculado'))
+        & Q(ultima_etapa=F('ultima_etapa_calculado'))
+        & (Q(ultima_etapa_em=F('ultima_etapa_em_calculado'))
+           | Q(ultima_etapa_em__isnull=True, ultima_etapa_em_calculado__isnull=True))
+    )
+
+
+def recalcular_progresso(queryset):
+    """Refaz o resumo dos processos do queryset com um único UPDATE. Retorna quantos foram atualizados."""
+    with transaction.atomic():
+        atualizados = queryset.update(**_progresso_calculado())
+        invalidar(Processo)
+    return atualizados
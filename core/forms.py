@@ -2,7 +2,9 @@
 
 from django import forms
 from django.db import models # <-- IMPORTAÇÃO ADICIONADA AQUI
-from .models import Processo, Orgao, Secretaria, Fornecedor, Responsavel # Adicionei Secretaria
+from .models import Processo, ProcessoETP, BlocoTexto, CAMPOS_BIBLIOTECA, ETAPAS_CHOICES, Orgao, Secretaria, Fornecedor, Responsavel # Adicionei Secretaria
+from .etapas import filtrar_etapas
+from .status import status_permitido, MENSAGEM_VERSAO_INVALIDA
 
 class OrgaoForm(forms.ModelForm):
     class Meta:
@@ -33,7 +35,24 @@ class ResponsavelForm(forms.ModelForm):
         for field_name, field in self.fields.items():
             field.widget.attrs['class'] = 'form-control'
 
-class ProcessoForm(forms.ModelForm):
+class VersaoProcessoForm(forms.Form):
+    """Versão do processo exibida no formulário, conferida por core.status.salvar_com_versao."""
+    versao = forms.IntegerField(widget=forms.HiddenInput, min_value=0, required=False)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['versao'].initial = self.instance.versao
+        self.fields['versao'].required = bool(self.instance.pk)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        # O campo é oculto: o erro dele iria para um lugar que a tela não mostra
+        if self.has_error('versao'):
+            del self._errors['versao']
+            self.add_error(None, MENSAGEM_VERSAO_INVALIDA)
+        return cleaned_data
+
+class ProcessoForm(VersaoProcessoForm, forms.ModelForm):
     class Meta:
         model = Processo
         fields = ['numero_processo', 'orgao_responsavel', 'secretaria_responsavel', 'responsavel_demanda', 'modalidade', 'status', 'objeto', 'valor_estimado', 'vigencia_meses', 'justificativa', 'descricao_detalhada_objeto']
@@ -43,24 +62,47 @@ class ProcessoForm(forms.ModelForm):
         for field_name, field in self.fields.items():
             field.widget.attrs['class'] = 'form-control'
 
-class ETPForm(forms.ModelForm):
+    def clean_status(self):
+        # Não deixa o status atrás do que as etapas já concluídas exigem (core/status.py)
+        status = self.cleaned_data['status']
+        if not status_permitido(self.instance.etapas_mascara, status):
+            raise forms.ValidationError('As etapas já concluídas não permitem este status.')
+        return status
+
+def _normalizar_texto(texto):
+    # O navegador devolve quebras de linha como \r\n
+    return (texto or '').replace('\r\n', '\n').strip()
+
+class ETPProcessoForm(VersaoProcessoForm, forms.ModelForm):
+    """Campos de Processo editados na tela do ETP."""
     class Meta:
         model = Processo
+        fields = ['justificativa', 'valor_estimado', 'secretaria_responsavel', 'vigencia_meses', 'modalidade']
+        widgets = {'justificativa': forms.Textarea(attrs={'rows': 5})}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for field_name, field in self.fields.items():
+            field.widget.attrs['class'] = 'form-control'
+
+class ETPForm(forms.ModelForm):
+    class Meta:
+        model = ProcessoETP
         fields = [
-            'etp_responsavel_elaboracao','justificativa','etp_pca_texto',
+            'etp_responsavel_elaboracao','etp_pca_texto',
             'etp_texto_estimativa_quantidades','etp_texto_levantamento_mercado',
             'etp_estimativa_metodologia','etp_analise_fornecedores_detalhe',
             'etp_requisitos_texto_geral','etp_requisitos_marcas_texto',
             'etp_requisitos_amostra_texto','etp_requisitos_tecnicos_detalhe',
-            'etp_requisitos_capacitacao_detalhe','valor_estimado',
+            'etp_requisitos_capacitacao_detalhe',
             'etp_descricao_solucao_texto','etp_solucao_proposta_detalhe',
             'etp_analise_alternativas_detalhe','etp_justificativa_parcelamento_texto',
             'etp_resultados_pretendidos_texto','etp_providencias_texto',
             'etp_contratacoes_correlatas_texto','etp_alinhamento_estrategico_texto',
             'etp_impactos_ambientais_texto','etp_autoridade_competente',
-            'secretaria_responsavel','etp_gestor_contrato','etp_fiscal_tecnico',
-            'etp_fiscal_administrativo','etp_prazo_execucao','vigencia_meses',
-            'etp_justificativa_prazo','modalidade','etp_criterio_julgamento',
+            'etp_gestor_contrato','etp_fiscal_tecnico',
+            'etp_fiscal_administrativo','etp_prazo_execucao',
+            'etp_justificativa_prazo','etp_criterio_julgamento',
             'etp_justificativa_modalidade_criterio','etp_dotacao_programa_trabalho',
             'etp_dotacao_natureza_despesa','etp_dotacao_fonte_recursos',
             'etp_lista_anexos_texto','etp_justificativa_contratacao',
@@ -69,13 +111,99 @@ class ETPForm(forms.ModelForm):
         widgets = {
             field_name: forms.Textarea(attrs={'rows': 3})
             for field_name in fields # Itera sobre os campos definidos acima
-            # Acessa o tipo do campo diretamente pelo modelo Processo
-            if hasattr(Processo, field_name) and isinstance(Processo._meta.get_field(field_name), models.TextField)
+            # Acessa o tipo do campo diretamente pelo modelo ProcessoETP
+            if isinstance(ProcessoETP._meta.get_field(field_name), models.TextField)
         }
-        widgets['justificativa'] = forms.Textarea(attrs={'rows': 5})
-        widgets['descricao_detalhada_objeto'] = forms.Textarea(attrs={'rows': 5})
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         for field_name, field in self.fields.items():
-            field.widget.attrs['class'] = 'form-control'
\ No newline at end of file
+            field.widget.attrs['class'] = 'form-control'
+
+        # Seções sem texto próprio aparecem preenchidas com o bloco da biblioteca
+        orgao_id = self.instance.processo.orgao_responsavel_id
+        self.textos_biblioteca = {campo: BlocoTexto.resolver(campo, orgao_id) for campo in CAMPOS_BIBLIOTECA}
+        for campo, texto in self.textos_biblioteca.items():
+            # Campo nulo no banco, mas em branco no formulário continua sendo texto próprio (vazio)
+            self.fields[campo].empty_value = ''
+            if getattr(self.instance, campo) is None:
+                self.initial[campo] = texto
+                self.fields[campo].help_text = 'Texto padrão da biblioteca. Ao editar, este ETP passa a ter texto próprio.'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        # Texto igual ao da biblioteca não é copiado para o ETP: continua apontando para o bloco
+        for campo, texto in self.textos_biblioteca.items():
+            if _normalizar_texto(cleaned_data.get(campo)) == _normalizar_texto(texto):
+                cleaned_data[campo] = None
+        return cleaned_data
+
+
+class FiltroProcessosForm(forms.Form):
+    """
+    Filtros da tela de relatórios, usados também pelas exportações (PDF, CSV, Excel,
+    ZIP e tarefas em segundo plano). Parâmetros inválidos são ignorados em vez de
+    derrubar a consulta; os erros ficam em `errors` para a tela exibir.
+    """
+    orgao = forms.IntegerField(required=False, min_value=1)
+    secretaria = forms.IntegerField(required=False, min_value=1)
+    modalidade = forms.ChoiceField(required=False, choices=[('', 'Todas')] + Processo.MODALIDADE_CHOICES)
+    status = forms.ChoiceField(required=False, choices=[('', 'Todos')] + Processo.STATUS_CHOICES)
+    data_inicio = forms.DateField(required=False)
+    data_fim = forms.DateField(required=False)
+    com_etapa = forms.ChoiceField(required=False, choices=[('', 'Qualquer')] + ETAPAS_CHOICES)
+    sem_etapa = forms.ChoiceField(required=False, choices=[('', 'Qualquer')] + ETAPAS_CHOICES)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        data_inicio, data_fim = cleaned_data.get('data_inicio'), cleaned_data.get('data_fim')
+        if data_inicio and data_fim and data_fim < data_inicio:
+            self.add_error('data_fim', 'A data final não pode ser anterior à data inicial.')
+        return cleaned_data
+
+    def filtrar(self, resultados):
+        """
+        Aplica os filtros válidos ao queryset. Cada filtro usa uma coluna que inicia
+        um dos índices compostos de Processo (..., data_abertura).
+        """
+        self.is_valid()
+        dados = self.cleaned_data
+        if dados.get('orgao'):
+            resultados = resultados.filter(orgao_responsavel_id=dados['orgao'])
+        if dados.get('secretaria'):
+            resultados = resultados.filter(secretaria_responsavel_id=dados['secretaria'])
+        if dados.get('modalidade'):
+            resultados = resultados.filter(modalidade=dados['modalidade'])
+        if dados.get('status'):
+            resultados = resultados.filter(status=dados['status'])
+        if dados.get('data_inicio'):
+            resultados = resultados.filter(data_abertura__gte=dados['data_inicio'])
+        if dados.get('data_fim'):
+            resultados = resultados.filter(data_abertura__lte=dados['data_fim'])
+        # Etapas pela máscara desnormalizada de Processo, sem join com o histórico
+        com = [dados['com_etapa']] if dados.get('com_etapa') else []
+        sem = [dados['sem_etapa']] if dados.get('sem_etapa') else []
+        return filtrar_etapas(resultados, com=com, sem=sem)
+
+class ImportacaoForm(forms.Form):
+    """Upload da planilha de importação em massa (core/importacao.py)."""
+    TIPO_CHOICES = [
+        ('FORNECEDOR', 'Fornecedores'),
+        ('RESPONSAVEL', 'Responsáveis'),
+        ('PROCESSO', 'Processos'),
+    ]
+    EXTENSOES = ('.csv', '.xlsx')
+
+    tipo = forms.ChoiceField(choices=TIPO_CHOICES, label='Cadastro')
+    arquivo = forms.FileField(label='Planilha (CSV ou XLSX)')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['tipo'].widget.attrs['class'] = 'form-select'
+        self.fields['arquivo'].widget.attrs.update({'class': 'form-control', 'accept': ','.join(self.EXTENSOES)})
+
+    def clean_arquivo(self):
+        arquivo = self.cleaned_data['arquivo']
+        if not arquivo.name.lower().endswith(self.EXTENSOES):
+            raise forms.ValidationError('Envie um arquivo .csv ou .xlsx.')
+        return arquivo
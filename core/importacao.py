@@ -0,0 +1,407 @@
+# Arquivo: core/importacao.py (Importação em massa de fornecedores, responsáveis e processos)
+
+# Lê a planilha (CSV ou XLSX) uma linha por vez, valida cada linha com as regras dos
+# ModelForms do cadastro e grava em lotes com bulk_create, uma transação por lote.
+#
+# Para não fazer consultas por linha:
+#   - chaves estrangeiras (órgão, secretaria, responsável) são resolvidas por mapas
+#     carregados uma vez no início;
+#   - a unicidade (CNPJ, matrícula, número do processo) é conferida em memória, contra
+#     o que já está no banco e o que já foi lido do próprio arquivo.
+#
+# bulk_create não dispara signals nem save(): os campos normalizados, o índice de
+# busca, o resumo do dashboard e as versões do cache são atualizados aqui.
+import csv, io, codecs, zipfile
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime
+
+import openpyxl
+from openpyxl.utils.exceptions import InvalidFileException
+from django.db import IntegrityError, transaction
+from django.core.exceptions import ValidationError
+from django.forms import modelform_factory
+from django.forms.models import construct_instance
+
+from .models import Processo, Fornecedor, Responsavel, Orgao, Secretaria
+from .forms import ProcessoForm, FornecedorForm, ResponsavelForm
+from .normalizacao import somente_digitos, normalizar_nome
+from .busca import indexar_processos
+from .resumo import estado_resumo, mover_em_lote
+from .cache import invalidar
+
+TAMANHO_LOTE_IMPORTACAO = 1000
+
+# O Excel em português salva "CSV" em Windows-1252; UTF-8 (com ou sem BOM) vem primeiro
+CODIFICACOES_CSV = ('utf-8-sig', 'cp1252')
+
+
+class PlanilhaInvalida(Exception):
+    """Arquivo que não dá para ler como CSV ou XLSX; a tela mostra como erro do formulário."""
+
+
+@dataclass
+class ResultadoImportacao:
+    tipo: str
+    linhas: int = 0
+    importados: int = 0
+    erros: list = field(default_factory=list)  # [(linha, campo, mensagem), ...]
+
+    @property
+    def linhas_com_erro(self):
+        return len({linha for linha, _, _ in self.erros})
+
+
+# ==============================================================================
+# LEITURA DA PLANILHA
+# ==============================================================================
+def _nome_coluna(cabecalho):
+    # "Razão Social" -> "razao_social"
+    return normalizar_nome(str(cabecalho or '')).replace(' ', '_')
+
+
+def _texto(valor):
+    """Valor da célula como o texto que o formulário espera."""
+    if valor is None:
+        return ''
+    if isinstance(valor, datetime):
+        return valor.date().isoformat()
+    if isinstance(valor, date):
+        return valor.isoformat()
+    if isinstance(valor, float) and valor.is_integer():
+        return str(int(valor))  # CNPJ/matrícula numéricos no Excel
+    return str(valor).strip()
+
+
+def _linhas_xlsx(arquivo):
+    try:
+        livro = openpyxl.load_workbook(arquivo, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, InvalidFileException, KeyError, ValueError, OSError):
+        raise PlanilhaInvalida('O arquivo não é uma planilha .xlsx válida (está corrompido ou tem outro formato).')
+    try:
+        linhas = livro.active.iter_rows(values_only=True)
+        colunas = [_nome_coluna(cabecalho) for cabecalho in next(linhas, ())]
+        for numero, valores in enumerate(linhas, start=2):
+            yield numero, colunas, valores
+    finally:
+        livro.close()
+
+
+def _codificacao_csv(arquivo):
+    """
+    Primeira codificação de CODIFICACOES_CSV que decodifica o arquivo inteiro. A
+    conferência lê em blocos, antes de gravar qualquer linha: um erro de decodificação
+    no meio da importação deixaria parte dos lotes gravada.
+    """
+    for codificacao in CODIFICACOES_CSV:
+        arquivo.seek(0)
+        decodificador = codecs.getincrementaldecoder(codificacao)()
+        try:
+            for bloco in iter(lambda: arquivo.read(64 * 1024), b''):
+                if b'\x00' in bloco:
+                    raise PlanilhaInvalida('O arquivo não é um CSV (tem conteúdo binário). Envie um .csv ou .xlsx.')
+                decodificador.decode(bloco)
+            decodificador.decode(b'', final=True)
+        except UnicodeDecodeError:
+            continue
+        arquivo.seek(0)
+        return codificacao
+    raise PlanilhaInvalida('Não foi possível ler o CSV: salve-o em UTF-8 ou Windows-1252.')
+
+
+def _linhas_csv(arquivo):
+    texto = io.TextIOWrapper(arquivo, encoding=_codificacao_csv(arquivo), newline='')
+    amostra = texto.read(8192)
+    texto.seek(0)
+    try:
+        dialeto = csv.Sniffer().sniff(amostra, delimiters=';,\t')
+    except csv.Error:
+        dialeto = csv.excel
+    leitor = csv.reader(texto, dialeto)
+    try:
+        colunas = [_nome_coluna(cabecalho) for cabecalho in next(leitor, [])]
+        for numero, valores in enumerate(leitor, start=2):
+            yield numero, colunas, valores
+    except csv.Error as e:
+        raise PlanilhaInvalida(f'CSV malformado perto da linha {leitor.line_num}: {e}')
+
+
+def ler_planilha(arquivo, nome_arquivo):
+    """Gera (número da linha, {coluna: texto}) para cada linha não vazia do CSV ou XLSX."""
+    linhas = _linhas_xlsx(arquivo) if nome_arquivo.lower().endswith('.xlsx') else _linhas_csv(arquivo)
+    for numero, colunas, valores in linhas:
+        dados = {coluna: _texto(valor) for coluna, valor in zip(colunas, valores) if coluna}
+        if any(dados.values()):
+            yield numero, dados
+
+
+def _decimal_brasileiro(texto):
+    # "1.234,56" -> "1234.56"; "1234.56" fica como está
+    return texto.replace('.', '').replace(',', '.') if ',' in texto else texto
+
+
+# ==============================================================================
+# IMPORTADORES
+# ==============================================================================
+class _FormularioImportacao:
+    """
+    Mesmas regras do formulário do cadastro, com duas diferenças: a unicidade é
+    conferida em memória pelo importador (sem consulta por linha), e o formulário é
+    criado uma vez e reaproveitado, pois o __init__ (cópia profunda dos campos) custa
+    mais que a própria validação.
+    """
+
+    def _post_clean(self):
+        # Como o do ModelForm, mas só com a validação dos campos do modelo: o clean() de
+        # Orgao/Fornecedor (CNPJ com e sem máscara), as restrições e o validate_unique
+        # consultam o banco a cada linha, e essa conferência o importador faz em memória
+        try:
+            self.instance = construct_instance(self, self.instance, self._meta.fields, self._meta.exclude)
+            self.instance.clean_fields(exclude=self._get_validation_exclusions())
+        except ValidationError as e:
+            self._update_errors(e)
+
+    def validar_linha(self, dados, instancia):
+        self.data, self.instance, self._errors = dados, instancia, None
+        return self.is_valid()
+
+
+class _Importador:
+    modelo = None
+    formulario = None
+    # Coluna da planilha -> campo do formulário, para os nomes alternativos aceitos
+    apelidos = {}
+
+    def __init__(self):
+        self.vistos = self._chaves_existentes()
+        self.form = self.formulario(data={})
+
+    def _chaves_existentes(self):
+        return set()
+
+    def chave_unica(self, instancia):
+        return None
+
+    def ajustar(self, dados):
+        """Converte os valores da planilha para o formato do formulário (já com os apelidos aplicados)."""
+
+    def resolver(self, dados, instancia, erros):
+        """Preenche as chaves estrangeiras da instância a partir dos mapas; anota os erros."""
+
+    def preparar(self, instancia):
+        """Ajustes antes do bulk_create (campos que o save() preencheria)."""
+
+    def depois_do_lote(self, objetos):
+        """Atualizações que os signals fariam para cada objeto gravado."""
+
+    def validar(self, dados):
+        """Retorna (instância pronta para gravar, None) ou (None, [(campo, mensagem), ...])."""
+        dados = {self.apelidos.get(coluna, coluna): valor for coluna, valor in dados.items()}
+        self.ajustar(dados)
+        erros = []
+        instancia = self.modelo()
+        self.resolver(dados, instancia, erros)
+        if not self.form.validar_linha(dados, instancia):
+            erros += [(campo, mensagem) for campo, mensagens in self.form.errors.items() for mensagem in mensagens]
+        if erros:
+            return None, erros
+
+        self.preparar(instancia)
+        chave = self.chave_unica(instancia)
+        if chave in self.vistos:
+            return None, [self._erro_duplicado()]
+        self.vistos.add(chave)
+        return instancia, []
+
+    def _erro_duplicado(self):
+        return ('__all__', 'Registro duplicado.')
+
+
+class ImportadorFornecedor(_Importador):
+    modelo = Fornecedor
+    formulario = modelform_factory(Fornecedor, form=type('FornecedorImportacaoForm', (_FormularioImportacao, FornecedorForm), {}))
+    apelidos = {'razao': 'razao_social', 'fantasia': 'nome_fantasia', 'e-mail': 'email'}
+
+    def _chaves_existentes(self):
+        return set(Fornecedor.objects.exclude(cnpj_digitos=None).values_list('cnpj_digitos', flat=True))
+
+    def preparar(self, instancia):
+        instancia.normalizar()
+
+    def chave_unica(self, instancia):
+        return instancia.cnpj_digitos
+
+    def _erro_duplicado(self):
+        return ('cnpj', 'Já existe um fornecedor com este CNPJ.')
+
+
+class _MapasCadastro:
+    """Órgãos e secretarias por CNPJ/nome normalizado, carregados uma vez."""
+
+    def __init__(self):
+        self.orgaos = {}
+        nomes = defaultdict(list)
+        for pk, digitos, nome in Orgao.objects.values_list('pk', 'cnpj_digitos', 'nome_busca'):
+            if digitos:
+                self.orgaos[digitos] = pk
+            nomes[nome].append(pk)
+        # Nome só identifica o órgão se não houver outro igual
+        self.orgaos.update({nome: pks[0] for nome, pks in nomes.items() if len(pks) == 1})
+
+        self.secretarias = {}
+        nomes = defaultdict(list)
+        for pk, orgao_id, nome in Secretaria.objects.values_list('pk', 'orgao_id', 'nome'):
+            self.secretarias[orgao_id, normalizar_nome(nome)] = pk
+            nomes[normalizar_nome(nome)].append(pk)
+        self.secretarias.update({(None, nome): pks[0] for nome, pks in nomes.items() if len(pks) == 1})
+
+    def orgao(self, texto):
+        digitos = somente_digitos(texto)
+        return self.orgaos.get(digitos) if len(digitos) == 14 else self.orgaos.get(normalizar_nome(texto))
+
+    def secretaria(self, orgao_id, texto):
+        return self.secretarias.get((orgao_id, normalizar_nome(texto)))
+
+
+class ImportadorResponsavel(_Importador):
+    modelo = Responsavel
+    formulario = modelform_factory(
+        Responsavel, form=type('ResponsavelImportacaoForm', (_FormularioImportacao, ResponsavelForm), {}),
+        fields=['nome', 'matricula', 'cargo']
+    )
+
+    def __init__(self):
+        super().__init__()
+        self.mapas = _MapasCadastro()
+
+    def _chaves_existentes(self):
+        return set(Responsavel.objects.values_list('matricula', flat=True))
+
+    def resolver(self, dados, instancia, erros):
+        # Secretaria pelo nome; o órgão (CNPJ ou nome) só é necessário se o nome se repetir
+        if not dados.get('secretaria'):
+            return
+        orgao_id = None
+        if dados.get('orgao'):
+            orgao_id = self.mapas.orgao(dados['orgao'])
+            if orgao_id is None:
+                erros.append(('orgao', f'Órgão "{dados["orgao"]}" não encontrado.'))
+                return
+        instancia.secretaria_id = self.mapas.secretaria(orgao_id, dados['secretaria'])
+        if instancia.secretaria_id is None:
+            erros.append(('secretaria', f'Secretaria "{dados["secretaria"]}" não encontrada.'))
+
+    def chave_unica(self, instancia):
+        return instancia.matricula
+
+    def _erro_duplicado(self):
+        return ('matricula', 'Já existe um responsável com esta matrícula.')
+
+
+class ImportadorProcesso(_Importador):
+    modelo = Processo
+    formulario = modelform_factory(
+        Processo, form=type('ProcessoImportacaoForm', (_FormularioImportacao, ProcessoForm), {}),
+        fields=['numero_processo', 'modalidade', 'status', 'objeto', 'valor_estimado', 'vigencia_meses',
+                'justificativa', 'descricao_detalhada_objeto']
+    )
+    apelidos = {
+        'numero': 'numero_processo', 'orgao_responsavel': 'orgao', 'secretaria_responsavel': 'secretaria',
+        'responsavel_demanda': 'responsavel', 'valor': 'valor_estimado', 'vigencia': 'vigencia_meses',
+    }
+    status_padrao = Processo._meta.get_field('status').default
+
+    def __init__(self):
+        super().__init__()
+        self.mapas = _MapasCadastro()
+        self.responsaveis = dict(Responsavel.objects.values_list('matricula', 'pk'))
+
+    def _chaves_existentes(self):
+        return set(Processo.objects.values_list('numero_processo', flat=True))
+
+    def ajustar(self, dados):
+        dados['status'] = dados.get('status') or self.status_padrao
+        dados['valor_estimado'] = _decimal_brasileiro(dados.get('valor_estimado', ''))
+
+    def resolver(self, dados, instancia, erros):
+        if not dados.get('orgao'):
+            erros.append(('orgao', 'Informe o órgão responsável (CNPJ ou nome).'))
+            return
+        instancia.orgao_responsavel_id = self.mapas.orgao(dados['orgao'])
+        if instancia.orgao_responsavel_id is None:
+            erros.append(('orgao', f'Órgão "{dados["orgao"]}" não encontrado.'))
+            return
+        if dados.get('secretaria'):
+            instancia.secretaria_responsavel_id = self.mapas.secretaria(instancia.orgao_responsavel_id, dados['secretaria'])
+            if instancia.secretaria_responsavel_id is None:
+                erros.append(('secretaria', f'Secretaria "{dados["secretaria"]}" não encontrada neste órgão.'))
+        if dados.get('responsavel'):
+            instancia.responsavel_demanda_id = self.responsaveis.get(dados['responsavel'])
+            if instancia.responsavel_demanda_id is None:
+                erros.append(('responsavel', f'Responsável com matrícula "{dados["responsavel"]}" não encontrado.'))
+
+    def chave_unica(self, instancia):
+        return instancia.numero_processo
+
+    def _erro_duplicado(self):
+        return ('numero_processo', 'Já existe um processo com este número.')
+
+    def depois_do_lote(self, processos):
+        indexar_processos([processo.pk for processo in processos])
+        mover_em_lote([(None, estado_resumo(processo)) for processo in processos])
+        invalidar(Processo)
+
+
+# Chaves = ImportacaoForm.TIPO_CHOICES
+IMPORTADORES = {
+    'FORNECEDOR': ImportadorFornecedor,
+    'RESPONSAVEL': ImportadorResponsavel,
+    'PROCESSO': ImportadorProcesso,
+}
+
+
+# ==============================================================================
+# EXECUÇÃO
+# ==============================================================================
+def _gravar_lote(importador, lote, resultado):
+    objetos = [objeto for _, objeto in lote]
+    try:
+        with transaction.atomic():
+            importador.modelo.objects.bulk_create(objetos)
+            importador.depois_do_lote(objetos)
+    except IntegrityError as e:
+        # Algo gravado por fora durante a importação (ex.: cadastro manual simultâneo)
+        resultado.erros += [(linha, '__all__', f'Lote não gravado: {e}') for linha, _ in lote]
+        return
+    resultado.importados += len(objetos)
+
+
+def importar(tipo, arquivo, nome_arquivo):
+    """
+    Importa a planilha `arquivo` (binário, CSV ou XLSX) como registros do `tipo`.
+    Levanta PlanilhaInvalida se o arquivo não puder ser lido.
+    """
+    importador = IMPORTADORES[tipo]()
+    resultado = ResultadoImportacao(tipo)
+    lote = []
+    for numero, dados in ler_planilha(arquivo, nome_arquivo):
+        resultado.linhas += 1
+        objeto, erros = importador.validar(dados)
+        if erros:
+            resultado.erros += [(numero, campo, mensagem) for campo, mensagem in erros]
+            continue
+        lote.append((numero, objeto))
+        if len(lote) >= TAMANHO_LOTE_IMPORTACAO:
+            _gravar_lote(importador, lote, resultado)
+            lote = []
+    if lote:
+        _gravar_lote(importador, lote, resultado)
+    return resultado
+
+
+def gravar_relatorio_erros(resultado, destino):
+    """Escreve os erros da importação como CSV (;) no arquivo texto `destino`."""
+    writer = csv.writer(destino, delimiter=';')
+    writer.writerow(['Linha', 'Coluna', 'Erro'])
+    for linha, campo, mensagem in sorted(resultado.erros, key=lambda erro: erro[0]):
+        writer.writerow([linha, '' if campo == '__all__' else campo, mensagem])
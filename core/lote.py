@@ -0,0 +1,170 @@
+# Arquivo: core/lote.py (Geração de documentos em lote, entregue como ZIP)
+
+# Este módulo é importado pelos processos filhos do pool. Eles são iniciados com
+# 'spawn' (não herdam as conexões de banco nem as threads do servidor) e começam sem
+# o Django configurado, por isso os modelos só são importados dentro das funções.
+#
+# Cada worker do gunicorn tem um único pool, criado no primeiro lote e reaproveitado
+# pelos seguintes: downloads simultâneos dividem os mesmos DOCUMENTOS_LOTE_PROCESSOS
+# processos em vez de cada um subir os seus.
+import os, zipfile, atexit, threading
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+
+TIPOS_LOTE = ('DFD', 'ETP', 'TR')
+TAMANHO_LOTE_REGISTROS = 100  # Documentos gravados por bulk_create
+PEDIDOS_POR_PROCESSO = 2  # Documentos enviados ao pool de uma vez, por processo filho
+
+_pool = None
+_trava = threading.Lock()
+
+
+def _inicializar_worker():
+    import django
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
+    django.setup()
+
+
+def _obter_pool():
+    global _pool
+    with _trava:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.DOCUMENTOS_LOTE_PROCESSOS,
+                mp_context=mp.get_context('spawn'),
+                initializer=_inicializar_worker,
+            )
+        return _pool
+
+
+def _descartar_pool(pool):
+    """Um filho morreu (ex.: falta de memória): o próximo lote cria um pool novo."""
+    global _pool
+    with _trava:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+@atexit.register
+def _encerrar_pool():
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _renderizar(processo_id, tipo):
+    """Executado no processo filho: gera (ou reaproveita) o arquivo, sem escrever no banco."""
+    from .documentos import carregar_processo, preparar_arquivo
+
+    processo = carregar_processo(processo_id, tipo)
+    documento, arquivo, hash_conteudo = preparar_arquivo(processo, tipo)
+    return {
+        'processo_id': processo_id,
+        'numero_processo': processo.numero_processo,
+        'tipo': tipo,
+        'arquivo': arquivo,
+        'hash_conteudo': hash_conteudo,
+        'novo': documento is None,
+    }
+
+
+class _SaidaZip:
+    """Destino não posicionável para o ZipFile: acumula bytes até o gerador entregá-los."""
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, dados):
+        self._partes.append(bytes(dados))
+        return len(dados)
+
+    def flush(self):
+        pass
+
+    def consumir(self):
+        dados = b''.join(self._partes)
+        self._partes = []
+        return dados
+
+
+def gerar_zip(processo_ids, tipos, usuario=''):
+    """
+    Gera os documentos dos processos em paralelo e devolve um gerador com os bytes
+    do ZIP. Cada arquivo entra no ZIP assim que fica pronto, então a memória usada
+    não cresce com o tamanho do lote. Os registros em Documento são gravados aqui,
+    no processo principal, em lotes (evita disputa de escrita no SQLite).
+    """
+    from .models import Documento
+    from .cache import invalidar
+
+    saida = _SaidaZip()
+    novos = []
+    erros = []
+
+    def registrar(resultado):
+        if resultado['novo']:
+            novos.append(Documento(
+                processo_id=resultado['processo_id'],
+                tipo=resultado['tipo'],
+                arquivo=resultado['arquivo'],
+                gerado_por=usuario,
+                hash_conteudo=resultado['hash_conteudo']
+            ))
+
+    def gravar_novos():
+        if novos:
+            Documento.objects.bulk_create(novos)
+            invalidar(Documento)
+            novos.clear()
+
+    pool = _obter_pool()
+    pedidos = ((pk, tipo) for pk in processo_ids for tipo in tipos)
+    limite = settings.DOCUMENTOS_LOTE_PROCESSOS * PEDIDOS_POR_PROCESSO
+    pendentes = {}
+    try:
+        with zipfile.ZipFile(saida, 'w', zipfile.ZIP_DEFLATED) as zf:
+            while True:
+                # Só `limite` documentos no pool por vez: o lote pode ter milhares de processos
+                for pk, tipo in pedidos:
+                    pendentes[pool.submit(_renderizar, pk, tipo)] = (pk, tipo)
+                    if len(pendentes) >= limite:
+                        break
+                if not pendentes:
+                    break
+                concluidos, _ = wait(pendentes, return_when=FIRST_COMPLETED)
+                for futuro in concluidos:
+                    pk, tipo = pendentes.pop(futuro)
+                    try:
+                        resultado = futuro.result()
+                    except BrokenProcessPool:
+                        _descartar_pool(pool)
+                        raise
+                    except Exception as e:
+                        erros.append(f'Processo {pk} - {tipo}: {e}')
+                        continue
+
+                    pasta = resultado['numero_processo'].replace('/', '-')
+                    filepath = os.path.join(settings.MEDIA_ROOT, resultado['arquivo'])
+                    zf.write(filepath, arcname=f'{pasta}/{os.path.basename(filepath)}')
+
+                    registrar(resultado)
+                    if len(novos) >= TAMANHO_LOTE_REGISTROS:
+                        gravar_novos()
+                    yield saida.consumir()
+
+            gravar_novos()
+            if erros:
+                zf.writestr('ERROS.txt', '\n'.join(erros))
+        yield saida.consumir()
+    finally:
+        # Download interrompido ou pool quebrado: não gera o restante deste lote, mas todo
+        # arquivo que já está (ou ficará, pois já começou) em MEDIA_ROOT ganha o seu
+        # Documento; sem ele o arquivo ficaria órfão e o cache por hash não o encontraria
+        for futuro in pendentes:
+            futuro.cancel()
+        for futuro in wait(pendentes).done:
+            if not futuro.cancelled() and futuro.exception() is None:
+                registrar(futuro.result())
+        gravar_novos()
@@ -0,0 +1,15 @@
+# Arquivo: core/management/commands/calcular_tempos_etapas.py
+
+# Para rodar todas as noites, por exemplo no cron:
+#   30 2 * * * cd /caminho/do/projeto && python manage.py calcular_tempos_etapas
+from django.core.management.base import BaseCommand
+
+from core.analise import calcular_tempos
+
+
+class Command(BaseCommand):
+    help = 'Recalcula o tempo entre etapas (por modalidade, órgão e secretaria) a partir do histórico dos processos.'
+
+    def handle(self, *args, **options):
+        total = calcular_tempos()
+        self.stdout.write(self.style.SUCCESS(f'{total} linhas de tempo de etapa calculadas.'))
@@ -0,0 +1,70 @@
+# Arquivo: core/management/commands/consultas_lentas.py
+
+import json
+from collections import defaultdict
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.consultas import formato_consulta
+
+
+def _arquivos(caminho):
+    # O arquivo atual e os já rotacionados (consultas_lentas.log.1, .2, ...)
+    caminho = Path(caminho)
+    return [caminho, *sorted(caminho.parent.glob(f'{caminho.name}.*'))]
+
+
+class Command(BaseCommand):
+    help = 'Resume o log de consultas lentas (core/consultas.py): as que mais somaram tempo, com o plano de execução.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=10, help='Quantas consultas mostrar (padrão: 10).')
+        parser.add_argument('--view', help='Só as consultas desta view (nome da URL, ex.: relatorio_processos).')
+        parser.add_argument(
+            '--arquivo', default=settings.LOGGING['handlers']['consultas_lentas']['filename'],
+            help='Log a resumir (padrão: o do handler consultas_lentas em LOGGING).',
+        )
+
+    def handle(self, *args, **options):
+        arquivos = [arquivo for arquivo in _arquivos(options['arquivo']) if arquivo.is_file()]
+        if not arquivos:
+            raise CommandError(f'Nenhum log de consultas lentas em {options["arquivo"]}.')
+
+        # Mesmo formato de SQL partindo da mesma linha de core/views.py: uma entrada
+        grupos = defaultdict(lambda: {'vezes': 0, 'ms': 0.0, 'maximo': 0.0, 'views': set(), 'ultima': None})
+        for arquivo in arquivos:
+            with open(arquivo, encoding='utf-8') as linhas:
+                for linha in linhas:
+                    try:
+                        consulta = json.loads(linha)
+                    except ValueError:
+                        continue
+                    if options['view'] and consulta['view'] != options['view']:
+                        continue
+                    grupo = grupos[formato_consulta(consulta['sql']), consulta['local'] or consulta['origem']]
+                    grupo['vezes'] += 1
+                    grupo['ms'] += consulta['ms']
+                    grupo['maximo'] = max(grupo['maximo'], consulta['ms'])
+                    grupo['views'].add(consulta['view'])
+                    if grupo['ultima'] is None or consulta['quando'] >= grupo['ultima']['quando']:
+                        grupo['ultima'] = consulta
+
+        if not grupos:
+            self.stdout.write('Nenhuma consulta lenta registrada.')
+            return
+        ranking = sorted(grupos.items(), key=lambda item: item[1]['ms'], reverse=True)[:options['top']]
+        for posicao, ((formato, local), grupo) in enumerate(ranking, 1):
+            ultima = grupo['ultima']
+            self.stdout.write(self.style.WARNING(
+                f'{posicao}. {grupo["ms"] / 1000:.2f} s no total em {grupo["vezes"]} execuções '
+                f'(média {grupo["ms"] / grupo["vezes"]:.1f} ms, máximo {grupo["maximo"]:.1f} ms)'
+            ))
+            self.stdout.write(f'   views: {", ".join(sorted(grupo["views"]))}')
+            origem = f' (via {ultima["origem"]})' if ultima['origem'] and ultima['origem'] != local else ''
+            self.stdout.write(f'   em: {local or "fora de core/views.py"}{origem}')
+            self.stdout.write(f'   SQL: {formato[:500]}')
+            self.stdout.write(f'   plano (de {ultima["quando"]}):')
+            for passo in ultima['plano'] or ['(sem plano)']:
+                self.stdout.write(f'     {passo}')
@@ -0,0 +1,35 @@
+# Arquivo: core/management/commands/importar_planilha.py
+
+import time
+from django.core.management.base import BaseCommand, CommandError
+
+from core.forms import ImportacaoForm
+from core.importacao import importar, gravar_relatorio_erros, PlanilhaInvalida
+
+
+class Command(BaseCommand):
+    help = 'Importa fornecedores, responsáveis ou processos de uma planilha CSV/XLSX (mesmas regras da tela de importação).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tipo', choices=[tipo for tipo, _ in ImportacaoForm.TIPO_CHOICES])
+        parser.add_argument('arquivo')
+        parser.add_argument('--erros', help='Arquivo CSV onde gravar o relatório de erros.')
+
+    def handle(self, *args, **options):
+        if not options['arquivo'].lower().endswith(ImportacaoForm.EXTENSOES):
+            raise CommandError('Informe um arquivo .csv ou .xlsx.')
+        inicio = time.monotonic()
+        with open(options['arquivo'], 'rb') as arquivo:
+            try:
+                resultado = importar(options['tipo'], arquivo, options['arquivo'])
+            except PlanilhaInvalida as e:
+                raise CommandError(str(e))
+
+        if resultado.erros and options['erros']:
+            with open(options['erros'], 'w', encoding='utf-8-sig', newline='') as destino:
+                gravar_relatorio_erros(resultado, destino)
+        self.stdout.write(
+            f'{resultado.linhas} linhas lidas, {resultado.linhas_com_erro} com erro '
+            f'({time.monotonic() - inicio:.1f}s).'
+        )
+        self.stdout.write(self.style.SUCCESS(f'{resultado.importados} registros importados.'))
@@ -0,0 +1,66 @@
+# Arquivo: core/management/commands/normalizar_cnpjs.py
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Orgao, Fornecedor
+from core.normalizacao import somente_digitos, formatar_cnpj, cnpj_valido, normalizar_nome
+
+TAMANHO_LOTE = 1000
+
+# Modelo -> campos de nome normalizados (campo de origem, campo de busca)
+MODELOS = (
+    (Orgao, (('nome', 'nome_busca'),)),
+    (Fornecedor, (('razao_social', 'razao_social_busca'), ('nome_fantasia', 'nome_fantasia_busca'))),
+)
+
+
+class Command(BaseCommand):
+    help = 'Preenche cnpj_digitos e os nomes normalizados de Órgãos e Fornecedores já cadastrados.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--simular', action='store_true', help='Só relata os problemas, sem gravar.')
+
+    def handle(self, *args, **options):
+        for modelo, nomes in MODELOS:
+            self._normalizar(modelo, nomes, options['simular'])
+
+    def _normalizar(self, modelo, nomes, simular):
+        rotulo = modelo._meta.verbose_name_plural
+        campos = ['cnpj', 'cnpj_digitos'] + [busca for _, busca in nomes]
+        # CNPJs já normalizados contam como ocupados, para não violar o índice único
+        vistos = dict(modelo.objects.exclude(cnpj_digitos=None).values_list('cnpj_digitos', 'pk'))
+        lote, atualizados, problemas = [], 0, []
+
+        for registro in modelo.objects.order_by('pk').iterator(chunk_size=TAMANHO_LOTE):
+            digitos = somente_digitos(registro.cnpj)
+            if len(digitos) != 14:
+                problemas.append(f'{registro.pk} "{registro}": CNPJ "{registro.cnpj}" não tem 14 dígitos')
+                digitos = None
+            elif vistos.get(digitos, registro.pk) != registro.pk:
+                problemas.append(f'{registro.pk} "{registro}": CNPJ duplicado do registro {vistos[digitos]}')
+                digitos = None
+            else:
+                if not cnpj_valido(digitos):
+                    problemas.append(f'{registro.pk} "{registro}": dígitos verificadores inválidos ({registro.cnpj})')
+                vistos[digitos] = registro.pk
+                registro.cnpj = formatar_cnpj(digitos)
+            registro.cnpj_digitos = digitos
+            for origem, busca in nomes:
+                setattr(registro, busca, normalizar_nome(getattr(registro, origem)))
+            lote.append(registro)
+
+            if len(lote) >= TAMANHO_LOTE:
+                atualizados += self._gravar(modelo, lote, campos, simular)
+                lote = []
+        atualizados += self._gravar(modelo, lote, campos, simular)
+
+        for problema in problemas:
+            self.stdout.write(self.style.WARNING(f'{rotulo} {problema}'))
+        self.stdout.write(self.style.SUCCESS(f'{rotulo}: {atualizados} registros normalizados, {len(problemas)} com problema.'))
+
+    def _gravar(self, modelo, lote, campos, simular):
+        if lote and not simular:
+            with transaction.atomic():
+                modelo.objects.bulk_update(lote, campos)
+        return len(lote)
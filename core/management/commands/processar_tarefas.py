@@ -0,0 +1,31 @@
+# Arquivo: core/management/commands/processar_tarefas.py
+
+import time
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from core import pdf
+from core.tarefas import reservar_proxima, reenfileirar_travadas, executar
+
+
+class Command(BaseCommand):
+    help = 'Worker local que executa as tarefas de geração de documentos e relatórios da fila.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--uma-vez', action='store_true', help='Processa as tarefas pendentes e encerra.')
+        parser.add_argument('--intervalo', type=float, default=2.0, help='Segundos de espera quando a fila está vazia.')
+
+    def handle(self, *args, **options):
+        self.stdout.write('Worker de tarefas iniciado.')
+        pdf.iniciar()  # Renderizadores já aquecidos quando chegar o primeiro PDF
+        while True:
+            close_old_connections()
+            reenfileirar_travadas()
+            tarefa = reservar_proxima()
+            if tarefa is None:
+                if options['uma_vez']:
+                    break
+                time.sleep(options['intervalo'])
+                continue
+            tarefa = executar(tarefa)
+            self.stdout.write(f'{tarefa} - {tarefa.get_status_display()}')
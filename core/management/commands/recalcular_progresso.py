@@ -0,0 +1,30 @@
+# Arquivo: core/management/commands/recalcular_progresso.py
+
+from django.core.management.base import BaseCommand
+
+from core.models import Processo
+from core.etapas import divergentes, recalcular_progresso
+
+TAMANHO_LOTE = 5000
+
+
+class Command(BaseCommand):
+    help = 'Refaz o progresso desnormalizado dos processos (máscara, contagem e última etapa) a partir do histórico.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verificar', action='store_true', help='Só conta os processos divergentes, sem corrigir.')
+
+    def handle(self, *args, **options):
+        total_divergentes = total_atualizados = 0
+        pks = list(Processo.objects.order_by('pk').values_list('pk', flat=True))
+        # Um UPDATE (e uma transação curta) por faixa de ids
+        for inicio in range(0, len(pks), TAMANHO_LOTE):
+            faixa = pks[inicio:inicio + TAMANHO_LOTE]
+            lote = Processo.objects.filter(pk__gte=faixa[0], pk__lte=faixa[-1])
+            total_divergentes += divergentes(lote).count()
+            if not options['verificar']:
+                total_atualizados += recalcular_progresso(lote)
+
+        self.stdout.write(f'{total_divergentes} processos com progresso divergente do histórico.')
+        if not options['verificar']:
+            self.stdout.write(self.style.SUCCESS(f'{total_atualizados} processos recalculados.'))
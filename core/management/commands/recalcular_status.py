@@ -0,0 +1,30 @@
+# Arquivo: core/management/commands/recalcular_status.py
+
+from django.core.management.base import BaseCommand
+
+from core.models import Processo
+from core.status import pendentes, aplicar_status
+
+TAMANHO_LOTE = 5000
+
+
+class Command(BaseCommand):
+    help = 'Avança o status dos processos conforme as etapas concluídas no histórico (core/status.py).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verificar', action='store_true', help='Só conta os processos com status atrasado, sem corrigir.')
+
+    def handle(self, *args, **options):
+        total_pendentes = total_atualizados = 0
+        pks = list(Processo.objects.order_by('pk').values_list('pk', flat=True))
+        # Poucos UPDATEs (e uma transação curta) por faixa de ids
+        for inicio in range(0, len(pks), TAMANHO_LOTE):
+            faixa = pks[inicio:inicio + TAMANHO_LOTE]
+            lote = Processo.objects.filter(pk__gte=faixa[0], pk__lte=faixa[-1])
+            total_pendentes += pendentes(lote).count()
+            if not options['verificar']:
+                total_atualizados += aplicar_status(lote)
+
+        self.stdout.write(f'{total_pendentes} processos com status atrás das etapas concluídas.')
+        if not options['verificar']:
+            self.stdout.write(self.style.SUCCESS(f'{total_atualizados} processos com status atualizado.'))
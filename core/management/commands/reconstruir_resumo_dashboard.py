@@ -0,0 +1,21 @@
+# Arquivo: core/management/commands/reconstruir_resumo_dashboard.py
+
+from django.core.management.base import BaseCommand
+
+from core.resumo import divergencias, reconstruir_resumo
+
+
+class Command(BaseCommand):
+    help = 'Refaz o resumo agregado do dashboard (ResumoDashboard) a partir dos processos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verificar', action='store_true', help='Só lista as linhas divergentes, sem reconstruir.')
+
+    def handle(self, *args, **options):
+        chaves = divergencias()
+        for orgao_id, status, modalidade, mes in chaves[:20]:
+            self.stdout.write(f'  órgão {orgao_id} / {status} / {modalidade} / {mes:%m/%Y}')
+        self.stdout.write(f'{len(chaves)} linhas do resumo divergentes dos processos.')
+        if not options['verificar']:
+            total = reconstruir_resumo()
+            self.stdout.write(self.style.SUCCESS(f'Resumo reconstruído com {total} linhas.'))
@@ -0,0 +1,15 @@
+# Arquivo: core/management/commands/reindexar_busca.py
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.busca import busca_disponivel, reindexar
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói o índice de busca textual dos processos (após restaurar backup ou cargas em massa).'
+
+    def handle(self, *args, **options):
+        if not busca_disponivel():
+            raise CommandError('O índice de busca (FTS5) só existe no SQLite.')
+        total = reindexar()
+        self.stdout.write(self.style.SUCCESS(f'{total} processos indexados.'))
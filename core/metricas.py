@@ -0,0 +1,249 @@
+# Arquivo: core/metricas.py (Métricas no formato texto do Prometheus)
+
+# Cada processo (workers do gunicorn, `processar_tarefas`) acumula contadores,
+# gauges e histogramas em memória e grava um retrato em METRICAS_DIR/<pid>.json, no
+# máximo a cada METRICAS_INTERVALO_GRAVACAO segundos e ao terminar. O endpoint
+# /metrics soma os arquivos de todos os processos: um armazenamento local
+# compartilhado, como o cache em arquivos, sem serviço externo.
+#
+# Contadores e histogramas de processos que já terminaram continuam na soma (o
+# Prometheus espera que contadores só cresçam); os gauges deles são descartados.
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+BUCKETS_BYTES = (1_000, 10_000, 100_000, 1_000_000, 10_000_000, 100_000_000)
+
+# nome: (tipo, descrição, buckets dos histogramas)
+METRICAS = {
+    'sislicit_http_requisicoes_total': ('counter', 'Requisições respondidas, por view, método e status.', None),
+    'sislicit_http_excecoes_total': ('counter', 'Exceções não tratadas nas views, por view e classe da exceção.', None),
+    'sislicit_http_em_andamento': ('gauge', 'Requisições sendo atendidas agora.', None),
+    'sislicit_http_duracao_segundos': ('histogram', 'Tempo de resposta das requisições, por view.', BUCKETS_SEGUNDOS),
+    'sislicit_http_resposta_bytes': ('histogram', 'Tamanho do corpo das respostas, por view.', BUCKETS_BYTES),
+    'sislicit_sql_consultas_total': ('counter', 'Consultas SQL executadas pelas requisições, por view.', None),
+    'sislicit_sql_duracao_segundos': ('histogram', 'Tempo gasto em SQL em cada requisição, por view.', BUCKETS_SEGUNDOS),
+    'sislicit_docx_geracao_segundos': ('histogram', 'Geração dos documentos Word (python-docx), por tipo.', BUCKETS_SEGUNDOS),
+    'sislicit_pdf_renderizacao_segundos': ('histogram', 'Renderização de PDF (WeasyPrint), por estilo.', BUCKETS_SEGUNDOS),
+}
+
+METODOS_HTTP = {'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'}
+
+_trava = threading.Lock()
+_valores = {}  # chave -> número (contador, gauge) ou [contagem por bucket..., +Inf, soma] (histograma)
+_chaves_gauge = set()
+_gauges_gravados = {}
+_ultima_gravacao = 0.0
+
+
+def _chave(nome, rotulos):
+    return json.dumps([nome, sorted((chave, str(valor)) for chave, valor in rotulos.items())], ensure_ascii=False)
+
+
+def incrementar(nome, valor=1, **rotulos):
+    chave = _chave(nome, rotulos)
+    with _trava:
+        _valores[chave] = _valores.get(chave, 0) + valor
+
+
+def ajustar(nome, delta, **rotulos):
+    """Soma `delta` (positivo ou negativo) a um gauge."""
+    chave = _chave(nome, rotulos)
+    with _trava:
+        _valores[chave] = _valores.get(chave, 0) + delta
+        _chaves_gauge.add(chave)
+
+
+def observar(nome, valor, **rotulos):
+    """Registra `valor` no histograma `nome`."""
+    buckets = METRICAS[nome][2]
+    chave = _chave(nome, rotulos)
+    with _trava:
+        serie = _valores.get(chave)
+        if serie is None:
+            serie = _valores[chave] = [0] * (len(buckets) + 2)
+        indice = next((indice for indice, limite in enumerate(buckets) if valor <= limite), len(buckets))
+        serie[indice] += 1
+        serie[-1] += valor
+
+
+@contextmanager
+def cronometrar(nome, **rotulos):
+    """Mede o bloco e registra a duração, em segundos, no histograma `nome`."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        observar(nome, time.perf_counter() - inicio, **rotulos)
+        gravar()
+
+
+# ==============================================================================
+# ARMAZENAMENTO COMPARTILHADO (um arquivo por processo)
+# ==============================================================================
+def _pasta():
+    return Path(settings.METRICAS_DIR)
+
+
+def _gauges():
+    return {chave: _valores[chave] for chave in _chaves_gauge}
+
+
+def gauges_pendentes():
+    """Se algum gauge mudou desde a última gravação."""
+    with _trava:
+        return _gauges() != _gauges_gravados
+
+
+def gravar(forcar=False):
+    """Grava o retrato deste processo, se passou o intervalo mínimo desde a última vez (ou se `forcar`)."""
+    global _ultima_gravacao, _gauges_gravados
+    agora = time.monotonic()
+    with _trava:
+        if not forcar and agora - _ultima_gravacao < settings.METRICAS_INTERVALO_GRAVACAO:
+            return
+        conteudo = json.dumps(_valores, ensure_ascii=False)
+        _ultima_gravacao, _gauges_gravados = agora, _gauges()
+    pasta = _pasta()
+    pasta.mkdir(parents=True, exist_ok=True)
+    temporario = pasta / f'{os.getpid()}.json.tmp'
+    temporario.write_text(conteudo, encoding='utf-8')
+    os.replace(temporario, pasta / f'{os.getpid()}.json')  # Quem lê nunca vê o arquivo pela metade
+
+
+@atexit.register
+def _gravar_ao_sair():
+    # Processos que nada mediram (ex.: os renderizadores de core/pdf.py) não deixam arquivo
+    if _valores:
+        gravar(forcar=True)
+
+
+def _processo_vivo(pid):
+    if os.name == 'nt':
+        return True  # No Windows, os.kill(pid, 0) envia CTRL+C em vez de só testar o processo
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def coletar():
+    """Soma dos valores gravados por todos os processos: {chave: valor}."""
+    gravar(forcar=True)
+    total = {}
+    for arquivo in _pasta().glob('*.json'):
+        try:
+            valores = json.loads(arquivo.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            continue  # Arquivo removido ou de outra versão
+        vivo = not arquivo.stem.isdigit() or _processo_vivo(int(arquivo.stem))
+        for chave, valor in valores.items():
+            nome = json.loads(chave)[0]
+            if nome not in METRICAS or (METRICAS[nome][0] == 'gauge' and not vivo):
+                continue
+            if isinstance(valor, list):
+                acumulado = total.setdefault(chave, [0] * len(valor))
+                if len(acumulado) == len(valor):  # Buckets mudaram desde a gravação: descarta
+                    total[chave] = [a + b for a, b in zip(acumulado, valor)]
+            else:
+                total[chave] = total.get(chave, 0) + valor
+    return total
+
+
+# ==============================================================================
+# FORMATO TEXTO DO PROMETHEUS
+# ==============================================================================
+def _escapar(valor):
+    return valor.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _numero(valor):
+    return str(int(valor)) if float(valor).is_integer() else repr(float(valor))
+
+
+def _serie(nome, rotulos, valor):
+    texto = ','.join(f'{chave}="{_escapar(rotulo)}"' for chave, rotulo in rotulos)
+    return f'{nome}{{{texto}}} {_numero(valor)}' if texto else f'{nome} {_numero(valor)}'
+
+
+def exposicao():
+    """Todas as métricas, somadas entre os processos, no formato texto 0.0.4 do Prometheus."""
+    por_nome = {}
+    for chave, valor in coletar().items():
+        nome, rotulos = json.loads(chave)
+        por_nome.setdefault(nome, []).append((rotulos, valor))
+
+    linhas = []
+    for nome, (tipo, descricao, buckets) in METRICAS.items():
+        linhas += [f'# HELP {nome} {descricao}', f'# TYPE {nome} {tipo}']
+        for rotulos, valor in sorted(por_nome.get(nome, [])):
+            if tipo != 'histogram':
+                linhas.append(_serie(nome, rotulos, valor))
+                continue
+            acumulado = 0
+            for limite, quantidade in zip([*buckets, '+Inf'], valor[:-1]):
+                acumulado += quantidade
+                linhas.append(_serie(f'{nome}_bucket', [*rotulos, ('le', _numero(limite) if limite != '+Inf' else limite)], acumulado))
+            linhas.append(_serie(f'{nome}_sum', rotulos, valor[-1]))
+            linhas.append(_serie(f'{nome}_count', rotulos, acumulado))
+    return '\n'.join(linhas) + '\n'
+
+
+# ==============================================================================
+# MIDDLEWARE
+# ==============================================================================
+def _rotulo_view(request):
+    # Nunca o caminho da URL: cada 404 diferente viraria uma série nova
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else 'sem_rota'
+
+
+def _tamanho_resposta(response):
+    if not response.streaming:
+        return len(response.content)
+    tamanho = response.get('Content-Length')  # FileResponse informa; CSV/ZIP em streaming não
+    return int(tamanho) if tamanho else None
+
+
+class MetricasMiddleware:
+    """Latência, tamanho da resposta, status, requisições em andamento e tempo em SQL por view."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        inicio = time.perf_counter()
+        ajustar('sislicit_http_em_andamento', 1)
+        gravar()
+        try:
+            response = self.get_response(request)
+        finally:
+            ajustar('sislicit_http_em_andamento', -1)
+
+        view = _rotulo_view(request)
+        metodo = request.method if request.method in METODOS_HTTP else 'OUTRO'
+        incrementar('sislicit_http_requisicoes_total', view=view, metodo=metodo, status=response.status_code)
+        observar('sislicit_http_duracao_segundos', time.perf_counter() - inicio, view=view)
+        tamanho = _tamanho_resposta(response)
+        if tamanho is not None:
+            observar('sislicit_http_resposta_bytes', tamanho, view=view)
+        registro = getattr(request, 'registro_consultas', None)  # core.consultas.ConsultasMiddleware
+        if registro is not None:
+            incrementar('sislicit_sql_consultas_total', registro.total, view=view)
+            observar('sislicit_sql_duracao_segundos', registro.tempo, view=view)
+        # Se o "em andamento" desta requisição chegou ao disco, o fim dela também precisa chegar
+        gravar(forcar=gauges_pendentes())
+        return response
+
+    def process_exception(self, request, exception):
+        incrementar('sislicit_http_excecoes_total', view=_rotulo_view(request), excecao=type(exception).__name__)
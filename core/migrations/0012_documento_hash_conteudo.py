@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_documento'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documento',
+            name='hash_conteudo',
+            field=models.CharField(blank=True, db_index=True, max_length=64, verbose_name='Hash do Conteúdo'),
+        ),
+    ]
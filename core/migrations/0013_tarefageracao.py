@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_documento_hash_conteudo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TarefaGeracao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('DFD', 'Documento de Formalização da Demanda'), ('ETP', 'Estudo Técnico Preliminar'), ('TR', 'Termo de Referência'), ('ANDAMENTO_PDF', 'Andamento do Processo (PDF)'), ('RELATORIO_PDF', 'Relatório de Processos (PDF)')], max_length=20, verbose_name='Tipo')),
+                ('status', models.CharField(choices=[('PENDENTE', 'Pendente'), ('EXECUTANDO', 'Em Execução'), ('CONCLUIDA', 'Concluída'), ('ERRO', 'Erro')], default='PENDENTE', max_length=20, verbose_name='Status')),
+                ('progresso', models.PositiveSmallIntegerField(default=0, verbose_name='Progresso (%)')),
+                ('parametros', models.JSONField(blank=True, default=dict, verbose_name='Parâmetros')),
+                ('arquivo', models.CharField(blank=True, max_length=255, verbose_name='Arquivo Gerado')),
+                ('erro', models.TextField(blank=True, verbose_name='Mensagem de Erro')),
+                ('solicitado_por', models.CharField(blank=True, max_length=200, verbose_name='Solicitado por')),
+                ('data_criacao', models.DateTimeField(auto_now_add=True, verbose_name='Data de Criação')),
+                ('data_inicio', models.DateTimeField(blank=True, null=True, verbose_name='Início da Execução')),
+                ('data_conclusao', models.DateTimeField(blank=True, null=True, verbose_name='Fim da Execução')),
+                ('documento', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tarefas', to='core.documento', verbose_name='Documento Gerado')),
+                ('processo', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tarefas', to='core.processo', verbose_name='Processo')),
+            ],
+            options={
+                'verbose_name': 'Tarefa de Geração',
+                'verbose_name_plural': 'Tarefas de Geração',
+                'ordering': ['data_criacao'],
+                'indexes': [models.Index(fields=['status', 'data_criacao'], name='core_tarefa_status_76e6e9_idx')],
+            },
+        ),
+    ]
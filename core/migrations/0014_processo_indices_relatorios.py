@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_tarefageracao'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='processo',
+            index=models.Index(fields=['status', 'data_abertura'], name='core_proces_status_1327da_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='processo',
+            index=models.Index(fields=['orgao_responsavel', 'data_abertura'], name='core_proces_orgao_r_de1958_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='processo',
+            index=models.Index(fields=['modalidade', 'data_abertura'], name='core_proces_modalid_7aa71a_idx'),
+        ),
+    ]
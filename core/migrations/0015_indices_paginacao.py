@@ -0,0 +1,33 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_processo_indices_relatorios'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='documento',
+            index=models.Index(fields=['-data_geracao', '-id'], name='core_docume_data_ge_c715cc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='fornecedor',
+            index=models.Index(fields=['razao_social', 'id'], name='core_fornec_razao_s_d673f2_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orgao',
+            index=models.Index(fields=['nome', 'id'], name='core_orgao_nome_7dc1c7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='processo',
+            index=models.Index(fields=['-data_abertura', '-id'], name='core_proces_data_ab_022df1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='responsavel',
+            index=models.Index(fields=['nome', 'id'], name='core_respon_nome_8430fd_idx'),
+        ),
+    ]
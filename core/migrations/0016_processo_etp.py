@@ -0,0 +1,247 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Campos que saem de Processo e passam a viver em ProcessoETP
+CAMPOS_ETP = [
+    'etp_responsavel_elaboracao', 'etp_pca_texto',
+    'etp_texto_estimativa_quantidades', 'etp_texto_levantamento_mercado',
+    'etp_estimativa_metodologia', 'etp_analise_fornecedores_detalhe',
+    'etp_requisitos_texto_geral', 'etp_requisitos_marcas_texto',
+    'etp_requisitos_amostra_texto', 'etp_requisitos_tecnicos_detalhe',
+    'etp_requisitos_capacitacao_detalhe',
+    'etp_descricao_solucao_texto', 'etp_solucao_proposta_detalhe',
+    'etp_analise_alternativas_detalhe', 'etp_justificativa_parcelamento_texto',
+    'etp_resultados_pretendidos_texto', 'etp_providencias_texto',
+    'etp_contratacoes_correlatas_texto', 'etp_alinhamento_estrategico_texto',
+    'etp_impactos_ambientais_texto', 'etp_autoridade_competente',
+    'etp_gestor_contrato', 'etp_fiscal_tecnico',
+    'etp_fiscal_administrativo', 'etp_prazo_execucao',
+    'etp_justificativa_prazo', 'etp_criterio_julgamento',
+    'etp_justificativa_modalidade_criterio', 'etp_dotacao_programa_trabalho',
+    'etp_dotacao_natureza_despesa', 'etp_dotacao_fonte_recursos',
+    'etp_lista_anexos_texto', 'etp_justificativa_contratacao',
+]
+TAMANHO_LOTE = 500
+
+
+def _coluna(campo):
+    # Chaves estrangeiras são copiadas pelo id, sem carregar o Responsavel
+    return f'{campo}_id' if campo in ('etp_responsavel_elaboracao', 'etp_autoridade_competente') else campo
+
+
+def copiar_para_etp(apps, schema_editor):
+    Processo = apps.get_model('core', 'Processo')
+    ProcessoETP = apps.get_model('core', 'ProcessoETP')
+    colunas = [_coluna(campo) for campo in CAMPOS_ETP]
+    lote = []
+    for valores in Processo.objects.order_by('pk').values('pk', *colunas).iterator(chunk_size=TAMANHO_LOTE):
+        lote.append(ProcessoETP(processo_id=valores.pop('pk'), **valores))
+        if len(lote) >= TAMANHO_LOTE:
+            ProcessoETP.objects.bulk_create(lote)
+            lote = []
+    if lote:
+        ProcessoETP.objects.bulk_create(lote)
+
+
+def copiar_para_processo(apps, schema_editor):
+    Processo = apps.get_model('core', 'Processo')
+    ProcessoETP = apps.get_model('core', 'ProcessoETP')
+    colunas = [_coluna(campo) for campo in CAMPOS_ETP]
+    lote = []
+    for valores in ProcessoETP.objects.order_by('pk').values('processo_id', *colunas).iterator(chunk_size=TAMANHO_LOTE):
+        lote.append(Processo(pk=valores.pop('processo_id'), **valores))
+        if len(lote) >= TAMANHO_LOTE:
+            Processo.objects.bulk_update(lote, colunas)
+            lote = []
+    if lote:
+        Processo.objects.bulk_update(lote, colunas)
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_indices_paginacao'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessoETP',
+            fields=[
+                ('processo', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='etp', serialize=False, to='core.processo', verbose_name='Processo')),
+                ('etp_pca_texto', models.TextField(blank=True, default='Este órgão não elaborou Plano de Contratações Anual para este ano, motivo pelo qual deixo de indicar a previsão desta contratação neste tópico.', verbose_name='2. Previsão no PCA')),
+                ('etp_texto_estimativa_quantidades', models.TextField(blank=True, default='Foi emitido relatório de consumo dos últimos 12 meses de todas as repartições deste órgão público, a fim de identificar os quantitativos de produtos consumidos por esta Administração.\nAlém disso, foi enviado ofício para todas as repartições que utilizam esse produto, a fim de indagar se haverá aumento de consumo em algum item específico, bem como se há algum produto extra a ser considerado para a próxima compra.\nEm que pese os levantamentos acima referidos, mensurar sua quantidade exata para uso durante o período de 12 meses não se mostra possível.\nDiante disso, opta-se por realizar pregão na modalidade registro de preços.', verbose_name='3. Estimativa das Quantidades (Texto)')),
+                ('etp_texto_levantamento_mercado', models.TextField(blank=True, default='Considerando que não há soluções mercadológicas a serem consideradas para a aquisição desse objeto, deixo de fazer este levantamento, especialmente porque se trata de uma compra de baixa complexidade e não há outros meios de adquirir estes itens, a não ser pela compra desses produtos com fornecedores que trabalham neste ramo.', verbose_name='4. Levantamento de Mercado (Texto)')),
+                ('etp_estimativa_metodologia', models.TextField(blank=True, verbose_name='6. Metodologia da Estimativa de Preços')),
+                ('etp_analise_fornecedores_detalhe', models.TextField(blank=True, verbose_name='4.2. Análise de Fornecedores Detalhada (ETP)')),
+                ('etp_requisitos_texto_geral', models.TextField(blank=True, default='Para esta aquisição, serão exigidos os seguintes requisitos para a contratação:', verbose_name='5. Requisitos da Contratação (Texto Introdutório)')),
+                ('etp_requisitos_marcas_texto', models.TextField(blank=True, default='A fim de selecionar um fornecedor que possa atender as especificações mínimas descritas neste estudo e atendam a demanda desta Administração, foram realizadas pesquisas de mercado para verificar quais são as marcas que possuem melhor custo-benefício, com base em critérios técnicos, qualidade comprovada, durabilidade, assistência técnica disponível na região e compatibilidade com as necessidades específicas do objeto licitado.\nA indicação de marcas de referência busca assegurar a aquisição de produtos que atendam aos padrões mínimos de desempenho e eficiência, sem, contudo, restringir a competitividade, uma vez que permite a apresentação de produtos equivalentes que atendam às mesmas especificações técnicas.\nAssim, garante-se a transparência e a objetividade do processo licitatório, resguardando o interesse público e a economicidade.', verbose_name='5. Requisitos: Indicação de Marcas (Texto)')),
+                ('etp_requisitos_amostra_texto', models.TextField(blank=True, default='A exigência de apresentação de amostra no processo licitatório visa garantir que os produtos ofertados atendam integralmente às especificações técnicas e aos padrões de qualidade estabelecidos no termo de referência ou no edital.\nEssa medida é fundamental para assegurar a conformidade dos itens contratados com as necessidades da Administração Pública, minimizando riscos de aquisição de materiais ou bens inadequados.\nA apresentação de amostras permite:\nVerificação da Qualidade: Avaliar se o produto ofertado possui características técnicas, materiais e acabamento compatíveis com os critérios exigidos.\nConformidade com as Especificações: Assegurar que o item atende plenamente aos requisitos estabelecidos, evitando divergências entre o que foi ofertado e o que será entregue.\nRedução de Riscos: Prevenir problemas relacionados à entrega de itens de qualidade inferior ou incompatíveis com o objeto da licitação, promovendo maior eficiência e economicidade.\nDessa forma, a exigência de amostra é um instrumento que contribui para a lisura e eficiência do processo licitatório, resguardando o interesse público e garantindo a qualidade na aquisição dos bens ou materiais necessários.', verbose_name='5. Requisitos: Amostra (Texto)')),
+                ('etp_requisitos_tecnicos_detalhe', models.TextField(blank=True, verbose_name='3.2. Requisitos Técnicos Detalhados (ETP)')),
+                ('etp_requisitos_capacitacao_detalhe', models.TextField(blank=True, verbose_name='3.3. Requisitos de Capacitação Técnica Detalhados (ETP)')),
+                ('etp_justificativa_contratacao', models.TextField(blank=True, verbose_name='5. Justificativa da Contratação (ETP)')),
+                ('etp_descricao_solucao_texto', models.TextField(blank=True, default='Considerando os levantamentos realizados neste Estudo Técnico Preliminar, chegou-se à conclusão de que não há outras soluções mercadológicas a serem consideradas, a não ser a compra desses produtos por intermédio de fornecedores.\nOs quantitativos, em que pese terem sido levantados por intermédio de relatórios e ofícios para as demais secretarias requisitantes, ainda sim podem sofrer alteração no decorrer do ano, razão pela qual optou-se por realizar um pregão na modalidade registro de preços.', verbose_name='7. Descrição da Solução como um Todo (Texto)')),
+                ('etp_solucao_proposta_detalhe', models.TextField(blank=True, verbose_name='6.1. Solução Proposta Detalhada (ETP)')),
+                ('etp_analise_alternativas_detalhe', models.TextField(blank=True, verbose_name='6.2. Análise de Alternativas Detalhada (ETP)')),
+                ('etp_justificativa_parcelamento_texto', models.TextField(blank=True, default='Em se tratando de aquisição de produtos divisíveis, os quais serão comprados por intermédio de um pregão na modalidade registro de preços e que há um rol extenso de materiais diferentes que devem ser fornecidos, opta-se por executar a licitação dividida em itens, uma vez que ampliará a competitividade e não limitará os fornecedores que não possuem determinados itens para fornecimento.', verbose_name='8. Justificativas para Parcelamento (Texto)')),
+                ('etp_resultados_pretendidos_texto', models.TextField(blank=True, default='Como não há soluções comparativas em relação a essa compra, não há como demonstrar os resultados pretendidos em detrimento de outras hipóteses.', verbose_name='9. Demonstrativo dos Resultados Pretendidos (Texto)')),
+                ('etp_providencias_texto', models.TextField(blank=True, default='Não há providências a serem adotadas pela Administração nesta compra.', verbose_name='10. Providências a serem Adotadas (Texto)')),
+                ('etp_contratacoes_correlatas_texto', models.TextField(blank=True, default='Não há contratações correlatas e/ou interdependentes para essa aquisição.', verbose_name='11. Contratações Correlatas/Interdependentes (Texto)')),
+                ('etp_alinhamento_estrategico_texto', models.TextField(blank=True, verbose_name='11. Alinhamento ao Planejamento (Texto)')),
+                ('etp_impactos_ambientais_texto', models.TextField(blank=True, default='Não há medidas sustentáveis ou impactos ambientais a serem considerados nessa contratação.', verbose_name='12. Possíveis Impactos Ambientais (Texto)')),
+                ('etp_gestor_contrato', models.CharField(blank=True, max_length=200, verbose_name='2. Gestor do Contrato (ETP)')),
+                ('etp_fiscal_tecnico', models.CharField(blank=True, max_length=200, verbose_name='2. Fiscal Técnico (ETP)')),
+                ('etp_fiscal_administrativo', models.CharField(blank=True, max_length=200, verbose_name='2. Fiscal Administrativo (ETP)')),
+                ('etp_prazo_execucao', models.IntegerField(blank=True, null=True, verbose_name='8. Prazo de Execução (em meses) (ETP)')),
+                ('etp_justificativa_prazo', models.TextField(blank=True, verbose_name='8. Justificativa do Prazo (ETP)')),
+                ('etp_criterio_julgamento', models.CharField(blank=True, choices=[('MENOR_PRECO', 'Menor Preço'), ('MAIOR_DESCONTO', 'Maior Desconto'), ('MELHOR_TECNICA', 'Melhor Técnica ou Conteúdo Artístico'), ('TECNICA_PRECO', 'Técnica e Preço'), ('MAIOR_RETORNO', 'Maior Retorno Econômico')], max_length=30, verbose_name='9. Critério de Julgamento (ETP)')),
+                ('etp_justificativa_modalidade_criterio', models.TextField(blank=True, verbose_name='9. Justificativa da Modalidade e Critério (ETP)')),
+                ('etp_dotacao_programa_trabalho', models.CharField(blank=True, max_length=100, verbose_name='16. Dotação: Programa de Trabalho')),
+                ('etp_dotacao_natureza_despesa', models.CharField(blank=True, max_length=100, verbose_name='16. Dotação: Natureza da Despesa')),
+                ('etp_dotacao_fonte_recursos', models.CharField(blank=True, max_length=100, verbose_name='16. Dotação: Fonte de Recursos')),
+                ('etp_lista_anexos_texto', models.TextField(blank=True, verbose_name='17. Anexos (Texto)')),
+                ('etp_autoridade_competente', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='processos_aprovados_etp', to='core.responsavel', verbose_name='Autoridade Competente (Aprovação ETP)')),
+                ('etp_responsavel_elaboracao', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='processos_elaborados_etp', to='core.responsavel', verbose_name='Responsável pela Elaboração (ETP)')),
+            ],
+            options={
+                'verbose_name': 'ETP do Processo',
+                'verbose_name_plural': 'ETPs dos Processos',
+            },
+        ),
+        migrations.RunPython(copiar_para_etp, copiar_para_processo),
+        migrations.RemoveField(
+            model_name='processo',
+            name='etp_alinhamento_estrategico_texto',
+        ),
+        migrations.RemoveField(
+            model_name='processo',
+            name='etp_analise_alternativas_detalhe',
+        ),
+        migrations.RemoveField(
+            model_name='processo',
+            name='etp_analise_fornecedores_detalhe',
+        ),
+        migrations.RemoveField(
+            model_name='processo',
+            name='etp_autoridade_competente',
+        ),
+        migrations.RemoveField(
+            model_name='processo',
+            name='etp_contratacoes_correlatas_texto',
+        ),
+        migrations.RemoveField(
+            model_name='processo',
+            name='etp_criterio_julgamento',
+        ),
+        migrations.RemoveField(
+            model_name='processo',
+            name='etp_descricao_solucao_texto',
+        ),
+        migrations.RemoveField(
+            model_name='processo',
+            name='etp_dotacao_fonte_recursos',
+        ),
+        migrations.RemoveField(
+            model_name='processo',
+            name='etp_dotacao_natureza_despesa',
+        ),
+        migrations.RemoveField(
+            model_name='processo',
+            name='etp_dotacao_programa_trabalho',
+        ),
+        migrations.RemoveField(
+            model_name='processo',
+            name='etp_estimativa_metodologia',
+        ),
+        migrations.RemoveField(
+            model_name='processo',
+            name='etp_fiscal_administrativo',
+        ),
+        migrations.RemoveField(
+            model_name='processo',
+            name='etp_fiscal_tecnico',
+        ),
+        migrations.RemoveField(
+            model_name='processo',
+            name='etp_gestor_contrato',
+        ),
+        migrations.RemoveField(
+            model_name='processo',
+            name='etp_impactos_ambientais_texto',
+        ),
+        migrations.RemoveField(
+            model_name='processo',
+            name='etp_justificativa_contratacao',
+        ),
+        migrations.RemoveField(
+            model_name='processo',
+            name='etp_justificativa_modalidade_criterio',
+        ),
+        migrations.RemoveField(
+            model_name='processo',
+            name='etp_justificativa_parcelamento_texto',
+        ),
+        migrations.RemoveField(
+            model_name='processo',
+            name='etp_justificativa_prazo',
+        ),
+        migrations.RemoveField(
+            model_name='processo',
+            name='etp_lista_anexos_texto',
+        ),
+        migrations.RemoveField(
+            model_name='processo',
+            name='etp_pca_texto',
+        ),
+        migrations.RemoveField(
+            model_name='processo',
+            name='etp_prazo_execucao',
+        ),
+        migrations.RemoveField(
+            model_name='processo',
+            name='etp_providencias_texto',
+        ),
+        migrations.RemoveField(
+            model_name='processo',
+            name='etp_requisitos_amostra_texto',
+        ),
+        migrations.RemoveField(
+            model_name='processo',
+            name='etp_requisitos_capacitacao_detalhe',
+        ),
+        migrations.RemoveField(
+            model_name='processo',
+            name='etp_requisitos_marcas_texto',
+        ),
+        migrations.RemoveField(
+            model_name='processo',
+            name='etp_requisitos_tecnicos_detalhe',
+        ),
+        migrations.RemoveField(
+            model_name='processo',
+            name='etp_requisitos_texto_geral',
+        ),
+        migrations.RemoveField(
+            model_name='processo',
+            name='etp_responsavel_elaboracao',
+        ),
+        migrations.RemoveField(
+            model_name='processo',
+            name='etp_resultados_pretendidos_texto',
+        ),
+        migrations.RemoveField(
+            model_name='processo',
+            name='etp_solucao_proposta_detalhe',
+        ),
+        migrations.RemoveField(
+            model_name='processo',
+            name='etp_texto_estimativa_quantidades',
+        ),
+        migrations.RemoveField(
+            model_name='processo',
+            name='etp_texto_levantamento_mercado',
+        ),
+    ]
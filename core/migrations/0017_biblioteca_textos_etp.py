@@ -0,0 +1,128 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F, Value
+from django.db.models.functions import Replace
+
+
+CAMPOS_BIBLIOTECA = (
+    'etp_pca_texto', 'etp_texto_estimativa_quantidades', 'etp_texto_levantamento_mercado',
+    'etp_requisitos_texto_geral', 'etp_requisitos_marcas_texto', 'etp_requisitos_amostra_texto',
+    'etp_descricao_solucao_texto', 'etp_justificativa_parcelamento_texto',
+    'etp_resultados_pretendidos_texto', 'etp_providencias_texto',
+    'etp_contratacoes_correlatas_texto', 'etp_impactos_ambientais_texto',
+)
+
+
+def criar_biblioteca(apps, schema_editor):
+    """Os antigos defaults viram os blocos padrão; ETPs com o texto intacto passam a apontar para eles."""
+    ProcessoETP = apps.get_model('core', 'ProcessoETP')
+    BlocoTexto = apps.get_model('core', 'BlocoTexto')
+    for campo in CAMPOS_BIBLIOTECA:
+        # Neste ponto o estado histórico ainda tem o default antigo do campo
+        texto = ProcessoETP._meta.get_field(campo).default
+        BlocoTexto.objects.create(campo=campo, orgao=None, texto=texto)
+        # Textos salvos pelo navegador têm quebras \r\n: comparados já normalizados
+        normalizado = Replace(F(campo), Value('\r\n'), Value('\n'), output_field=models.TextField())
+        ProcessoETP.objects.alias(normalizado=normalizado).filter(
+            normalizado=texto.replace('\r\n', '\n')
+        ).update(**{campo: ''})
+
+
+def restaurar_textos(apps, schema_editor):
+    ProcessoETP = apps.get_model('core', 'ProcessoETP')
+    BlocoTexto = apps.get_model('core', 'BlocoTexto')
+    # Variantes por órgão primeiro; o que sobrar vazio recebe o texto padrão
+    for bloco in BlocoTexto.objects.order_by('orgao_id').exclude(orgao=None):
+        ProcessoETP.objects.filter(processo__orgao_responsavel_id=bloco.orgao_id, **{bloco.campo: ''}).update(**{bloco.campo: bloco.texto})
+    for bloco in BlocoTexto.objects.filter(orgao=None):
+        ProcessoETP.objects.filter(**{bloco.campo: ''}).update(**{bloco.campo: bloco.texto})
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_processo_etp'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BlocoTexto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('campo', models.CharField(choices=[('etp_pca_texto', '2. Previsão no PCA'), ('etp_texto_estimativa_quantidades', '3. Estimativa das Quantidades (Texto)'), ('etp_texto_levantamento_mercado', '4. Levantamento de Mercado (Texto)'), ('etp_requisitos_texto_geral', '5. Requisitos da Contratação (Texto Introdutório)'), ('etp_requisitos_marcas_texto', '5. Requisitos: Indicação de Marcas (Texto)'), ('etp_requisitos_amostra_texto', '5. Requisitos: Amostra (Texto)'), ('etp_descricao_solucao_texto', '7. Descrição da Solução como um Todo (Texto)'), ('etp_justificativa_parcelamento_texto', '8. Justificativas para Parcelamento (Texto)'), ('etp_resultados_pretendidos_texto', '9. Demonstrativo dos Resultados Pretendidos (Texto)'), ('etp_providencias_texto', '10. Providências a serem Adotadas (Texto)'), ('etp_contratacoes_correlatas_texto', '11. Contratações Correlatas/Interdependentes (Texto)'), ('etp_impactos_ambientais_texto', '12. Possíveis Impactos Ambientais (Texto)')], max_length=60, verbose_name='Seção do ETP')),
+                ('texto', models.TextField(verbose_name='Texto')),
+                ('data_atualizacao', models.DateTimeField(auto_now=True, verbose_name='Última Atualização')),
+                ('orgao', models.ForeignKey(blank=True, help_text='Deixe em branco para o texto padrão de todos os órgãos.', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='blocos_texto', to='core.orgao', verbose_name='Órgão')),
+            ],
+            options={
+                'verbose_name': 'Bloco de Texto do ETP',
+                'verbose_name_plural': 'Biblioteca de Textos do ETP',
+                'ordering': ['campo', 'orgao'],
+                'constraints': [models.UniqueConstraint(fields=('campo', 'orgao'), name='bloco_texto_unico_por_orgao'), models.UniqueConstraint(condition=models.Q(('orgao__isnull', True)), fields=('campo',), name='bloco_texto_unico_padrao')],
+            },
+        ),
+        migrations.RunPython(criar_biblioteca, restaurar_textos),
+        migrations.AlterField(
+            model_name='processoetp',
+            name='etp_contratacoes_correlatas_texto',
+            field=models.TextField(blank=True, verbose_name='11. Contratações Correlatas/Interdependentes (Texto)'),
+        ),
+        migrations.AlterField(
+            model_name='processoetp',
+            name='etp_descricao_solucao_texto',
+            field=models.TextField(blank=True, verbose_name='7. Descrição da Solução como um Todo (Texto)'),
+        ),
+        migrations.AlterField(
+            model_name='processoetp',
+            name='etp_impactos_ambientais_texto',
+            field=models.TextField(blank=True, verbose_name='12. Possíveis Impactos Ambientais (Texto)'),
+        ),
+        migrations.AlterField(
+            model_name='processoetp',
+            name='etp_justificativa_parcelamento_texto',
+            field=models.TextField(blank=True, verbose_name='8. Justificativas para Parcelamento (Texto)'),
+        ),
+        migrations.AlterField(
+            model_name='processoetp',
+            name='etp_pca_texto',
+            field=models.TextField(blank=True, verbose_name='2. Previsão no PCA'),
+        ),
+        migrations.AlterField(
+            model_name='processoetp',
+            name='etp_providencias_texto',
+            field=models.TextField(blank=True, verbose_name='10. Providências a serem Adotadas (Texto)'),
+        ),
+        migrations.AlterField(
+            model_name='processoetp',
+            name='etp_requisitos_amostra_texto',
+            field=models.TextField(blank=True, verbose_name='5. Requisitos: Amostra (Texto)'),
+        ),
+        migrations.AlterField(
+            model_name='processoetp',
+            name='etp_requisitos_marcas_texto',
+            field=models.TextField(blank=True, verbose_name='5. Requisitos: Indicação de Marcas (Texto)'),
+        ),
+        migrations.AlterField(
+            model_name='processoetp',
+            name='etp_requisitos_texto_geral',
+            field=models.TextField(blank=True, verbose_name='5. Requisitos da Contratação (Texto Introdutório)'),
+        ),
+        migrations.AlterField(
+            model_name='processoetp',
+            name='etp_resultados_pretendidos_texto',
+            field=models.TextField(blank=True, verbose_name='9. Demonstrativo dos Resultados Pretendidos (Texto)'),
+        ),
+        migrations.AlterField(
+            model_name='processoetp',
+            name='etp_texto_estimativa_quantidades',
+            field=models.TextField(blank=True, verbose_name='3. Estimativa das Quantidades (Texto)'),
+        ),
+        migrations.AlterField(
+            model_name='processoetp',
+            name='etp_texto_levantamento_mercado',
+            field=models.TextField(blank=True, verbose_name='4. Levantamento de Mercado (Texto)'),
+        ),
+    ]
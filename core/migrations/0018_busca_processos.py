@@ -0,0 +1,49 @@
+# Índice de busca textual dos processos (SQLite FTS5). Em outros bancos não faz nada
+# e core/busca.py usa icontains.
+
+from django.db import migrations
+
+
+COLUNAS_ETP = [
+    'etp_pca_texto', 'etp_texto_estimativa_quantidades', 'etp_texto_levantamento_mercado',
+    'etp_estimativa_metodologia', 'etp_analise_fornecedores_detalhe', 'etp_requisitos_texto_geral',
+    'etp_requisitos_marcas_texto', 'etp_requisitos_amostra_texto', 'etp_requisitos_tecnicos_detalhe',
+    'etp_requisitos_capacitacao_detalhe', 'etp_justificativa_contratacao', 'etp_descricao_solucao_texto',
+    'etp_solucao_proposta_detalhe', 'etp_analise_alternativas_detalhe', 'etp_justificativa_parcelamento_texto',
+    'etp_resultados_pretendidos_texto', 'etp_providencias_texto', 'etp_contratacoes_correlatas_texto',
+    'etp_alinhamento_estrategico_texto', 'etp_impactos_ambientais_texto', 'etp_justificativa_prazo',
+    'etp_justificativa_modalidade_criterio', 'etp_lista_anexos_texto',
+]
+
+
+def criar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    etp = " || ' ' || ".join(f"COALESCE(e.{coluna}, '')" for coluna in COLUNAS_ETP)
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE core_processo_busca USING fts5("
+        "numero_processo, objeto, justificativa, descricao_detalhada_objeto, etp, "
+        "tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        "INSERT INTO core_processo_busca (rowid, numero_processo, objeto, justificativa, descricao_detalhada_objeto, etp) "
+        f"SELECT p.id, p.numero_processo, p.objeto, p.justificativa, p.descricao_detalhada_objeto, {etp} "
+        "FROM core_processo p LEFT JOIN core_processoetp e ON e.processo_id = p.id"
+    )
+
+
+def remover_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS core_processo_busca')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_biblioteca_textos_etp'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indice, remover_indice),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:37
+
+import core.normalizacao
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_busca_processos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fornecedor',
+            name='cnpj_digitos',
+            field=models.CharField(editable=False, max_length=14, null=True, unique=True, verbose_name='CNPJ (somente dígitos)'),
+        ),
+        migrations.AddField(
+            model_name='fornecedor',
+            name='nome_fantasia_busca',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='fornecedor',
+            name='razao_social_busca',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='orgao',
+            name='cnpj_digitos',
+            field=models.CharField(editable=False, max_length=14, null=True, unique=True, verbose_name='CNPJ (somente dígitos)'),
+        ),
+        migrations.AddField(
+            model_name='orgao',
+            name='nome_busca',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=200),
+        ),
+        migrations.AlterField(
+            model_name='fornecedor',
+            name='cnpj',
+            field=models.CharField(max_length=18, unique=True, validators=[core.normalizacao.validar_cnpj], verbose_name='CNPJ'),
+        ),
+        migrations.AlterField(
+            model_name='orgao',
+            name='cnpj',
+            field=models.CharField(max_length=18, unique=True, validators=[core.normalizacao.validar_cnpj], verbose_name='CNPJ'),
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:39
+
+from django.db import migrations, models
+from django.db.models import Sum, Count, Case, When, Value, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+# Ordem das etapas no momento desta migração (bit = posição na lista)
+ETAPAS = [
+    'DFD', 'ETP', 'PESQUISA_PRECOS', 'DOTACAO', 'MAPA_RISCOS', 'TERMO_REF', 'JUSTIFICATIVA',
+    'PARECER_TECNICO_JURIDICO', 'PARECER_CONTROLE_INTERNO', 'PEDIDO_RATIFICACAO', 'RATIFICACAO',
+    'AUTORIZACAO', 'EDITAL', 'PUBLICACAO_AVISO', 'RECEBIMENTO_PROPOSTAS', 'ATA_SESSAO',
+    'PLANILHA_CLASSIFICACAO', 'DOCS_HABILITACAO', 'PARECERES_FASE_EXTERNA', 'RECURSOS',
+    'JULGAMENTO_RECURSOS', 'ADJUDICACAO', 'HOMOLOGACAO',
+]
+
+
+def preencher_progresso(apps, schema_editor):
+    Processo = apps.get_model('core', 'Processo')
+    HistoricoProcesso = apps.get_model('core', 'HistoricoProcesso')
+    historico = HistoricoProcesso.objects.filter(processo=OuterRef('pk')).order_by()
+    bits = Sum(Case(*[When(etapa=etapa, then=Value(1 << ordem)) for ordem, etapa in enumerate(ETAPAS)], default=Value(0)))
+    mais_recente = historico.order_by('-data_conclusao', '-pk')
+    Processo.objects.update(
+        etapas_mascara=Coalesce(Subquery(historico.values('processo').annotate(bits=bits).values('bits')), 0),
+        etapas_concluidas=Coalesce(Subquery(historico.values('processo').annotate(total=Count('pk')).values('total')), 0),
+        ultima_etapa=Coalesce(Subquery(mais_recente.values('etapa')[:1]), Value('')),
+        ultima_etapa_em=Subquery(mais_recente.values('data_conclusao')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_cnpj_normalizado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processo',
+            name='etapas_concluidas',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='Nº de Etapas Concluídas'),
+        ),
+        migrations.AddField(
+            model_name='processo',
+            name='etapas_mascara',
+            field=models.PositiveBigIntegerField(default=0, editable=False, verbose_name='Etapas Concluídas (bits)'),
+        ),
+        migrations.AddField(
+            model_name='processo',
+            name='ultima_etapa',
+            field=models.CharField(blank=True, choices=[('DFD', 'Documento de formalização da demanda'), ('ETP', 'Estudo Técnico Preliminar (ETP)'), ('PESQUISA_PRECOS', 'Pesquisa de preços do mercado'), ('DOTACAO', 'Dotação orçamentária'), ('MAPA_RISCOS', 'Mapa de riscos, quando exigido'), ('TERMO_REF', 'Termo de referência ou projeto básico'), ('JUSTIFICATIVA', 'Justificativa'), ('PARECER_TECNICO_JURIDICO', 'Parecer da área técnica e/ou jurídica'), ('PARECER_CONTROLE_INTERNO', 'Parecer Controle Interno'), ('PEDIDO_RATIFICACAO', 'Pedido de Ratificação'), ('RATIFICACAO', 'Ratificação'), ('AUTORIZACAO', 'Autorização da autoridade competente para o início'), ('EDITAL', 'Edital de licitação, incluindo anexos'), ('PUBLICACAO_AVISO', 'Publicação do aviso de licitação'), ('RECEBIMENTO_PROPOSTAS', 'Recebimento das propostas e documentos de habilitação'), ('ATA_SESSAO', 'Ata/súmula de sessão pública'), ('PLANILHA_CLASSIFICACAO', 'Planilha de classificação das propostas'), ('DOCS_HABILITACAO', 'Documentos apresentados para habilitação'), ('PARECERES_FASE_EXTERNA', 'Pareceres técnicos e jurídicos sobre propostas/habilitação'), ('RECURSOS', 'Registros de recursos administrativos'), ('JULGAMENTO_RECURSOS', 'Ata(s) de julgamento dos recursos'), ('ADJUDICACAO', 'Adjudicação do objeto ao licitante vencedor'), ('HOMOLOGACAO', 'Homologação final do resultado')], editable=False, max_length=50, verbose_name='Última Etapa Concluída'),
+        ),
+        migrations.AddField(
+            model_name='processo',
+            name='ultima_etapa_em',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Conclusão da Última Etapa'),
+        ),
+        migrations.RunPython(preencher_progresso, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='processo',
+            index=models.Index(fields=['-etapas_concluidas', '-id'], name='core_proces_etapas__4b87ca_idx'),
+        ),
+    ]
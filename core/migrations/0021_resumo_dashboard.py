@@ -0,0 +1,49 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:43
+
+import django.db.models.deletion
+from decimal import Decimal
+
+from django.db import migrations, models
+from django.db.models import Sum, Count
+from django.db.models.functions import TruncMonth, Coalesce
+
+
+def preencher_resumo(apps, schema_editor):
+    Processo = apps.get_model('core', 'Processo')
+    ResumoDashboard = apps.get_model('core', 'ResumoDashboard')
+    agregado = (Processo.objects.order_by()
+                .values('orgao_responsavel', 'status', 'modalidade', mes=TruncMonth('data_abertura'))
+                .annotate(quantidade=Count('pk'), valor_total=Coalesce(Sum('valor_estimado'), Decimal('0'))))
+    ResumoDashboard.objects.bulk_create([
+        ResumoDashboard(orgao_id=item['orgao_responsavel'], status=item['status'], modalidade=item['modalidade'],
+                        mes=item['mes'], quantidade=item['quantidade'], valor_total=item['valor_total'])
+        for item in agregado
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_progresso_etapas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoDashboard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('FASE_INTERNA', 'Fase Interna'), ('PUBLICADO', 'Publicado'), ('AGUARDANDO_PROPOSTAS', 'Aguardando Propostas'), ('EM_ANALISE', 'Em Análise'), ('HOMOLOGADO', 'Homologado'), ('CANCELADO', 'Cancelado')], max_length=30, verbose_name='Status')),
+                ('modalidade', models.CharField(choices=[('PREGAO', 'Pregão'), ('CONCORRENCIA', 'Concorrência'), ('CONCURSO', 'Concurso'), ('LEILAO', 'Leilão'), ('DIALOGO_COMPETITIVO', 'Diálogo Competitivo'), ('DISPENSA', 'Dispensa de Licitação'), ('INEXIGIBILIDADE', 'Inexigibilidade de Licitação')], max_length=30, verbose_name='Modalidade')),
+                ('mes', models.DateField(verbose_name='Mês de Abertura')),
+                ('quantidade', models.IntegerField(default=0, verbose_name='Quantidade de Processos')),
+                ('valor_total', models.DecimalField(decimal_places=2, default=0, max_digits=16, verbose_name='Valor Estimado Total')),
+                ('orgao', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumos', to='core.orgao', verbose_name='Órgão')),
+            ],
+            options={
+                'verbose_name': 'Resumo do Dashboard',
+                'verbose_name_plural': 'Resumos do Dashboard',
+                'constraints': [models.UniqueConstraint(fields=('orgao', 'status', 'modalidade', 'mes'), name='resumo_dashboard_unico')],
+            },
+        ),
+        migrations.RunPython(preencher_resumo, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_resumo_dashboard'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorVersao',
+            fields=[
+                ('modelo', models.CharField(max_length=100, primary_key=True, serialize=False, verbose_name='Modelo')),
+                ('versao', models.PositiveBigIntegerField(default=0, verbose_name='Versão')),
+            ],
+            options={
+                'verbose_name': 'Contador de Versão',
+                'verbose_name_plural': 'Contadores de Versão',
+            },
+        ),
+    ]
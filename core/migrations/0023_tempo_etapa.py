@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_contador_versao'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TempoEtapa',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimensao', models.CharField(choices=[('GERAL', 'Todos os Processos'), ('MODALIDADE', 'Modalidade'), ('ORGAO', 'Órgão'), ('SECRETARIA', 'Secretaria')], max_length=20, verbose_name='Recorte')),
+                ('valor', models.CharField(blank=True, max_length=50, verbose_name='Valor do Recorte')),
+                ('rotulo', models.CharField(blank=True, max_length=200, verbose_name='Nome do Recorte')),
+                ('etapa', models.CharField(choices=[('DFD', 'Documento de formalização da demanda'), ('ETP', 'Estudo Técnico Preliminar (ETP)'), ('PESQUISA_PRECOS', 'Pesquisa de preços do mercado'), ('DOTACAO', 'Dotação orçamentária'), ('MAPA_RISCOS', 'Mapa de riscos, quando exigido'), ('TERMO_REF', 'Termo de referência ou projeto básico'), ('JUSTIFICATIVA', 'Justificativa'), ('PARECER_TECNICO_JURIDICO', 'Parecer da área técnica e/ou jurídica'), ('PARECER_CONTROLE_INTERNO', 'Parecer Controle Interno'), ('PEDIDO_RATIFICACAO', 'Pedido de Ratificação'), ('RATIFICACAO', 'Ratificação'), ('AUTORIZACAO', 'Autorização da autoridade competente para o início'), ('EDITAL', 'Edital de licitação, incluindo anexos'), ('PUBLICACAO_AVISO', 'Publicação do aviso de licitação'), ('RECEBIMENTO_PROPOSTAS', 'Recebimento das propostas e documentos de habilitação'), ('ATA_SESSAO', 'Ata/súmula de sessão pública'), ('PLANILHA_CLASSIFICACAO', 'Planilha de classificação das propostas'), ('DOCS_HABILITACAO', 'Documentos apresentados para habilitação'), ('PARECERES_FASE_EXTERNA', 'Pareceres técnicos e jurídicos sobre propostas/habilitação'), ('RECURSOS', 'Registros de recursos administrativos'), ('JULGAMENTO_RECURSOS', 'Ata(s) de julgamento dos recursos'), ('ADJUDICACAO', 'Adjudicação do objeto ao licitante vencedor'), ('HOMOLOGACAO', 'Homologação final do resultado'), ('TOTAL', 'Abertura até a Homologação')], max_length=50, verbose_name='Etapa')),
+                ('quantidade', models.PositiveIntegerField(verbose_name='Processos Medidos')),
+                ('media_dias', models.FloatField(verbose_name='Média (dias)')),
+                ('mediana_dias', models.FloatField(verbose_name='Mediana (dias)')),
+                ('p90_dias', models.FloatField(verbose_name='90º Percentil (dias)')),
+                ('maximo_dias', models.FloatField(verbose_name='Máximo (dias)')),
+                ('calculado_em', models.DateTimeField(verbose_name='Calculado em')),
+            ],
+            options={
+                'verbose_name': 'Tempo de Etapa',
+                'verbose_name_plural': 'Tempos de Etapas',
+                'constraints': [models.UniqueConstraint(fields=('dimensao', 'valor', 'etapa'), name='tempo_etapa_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 08:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_tempo_etapa'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='processo',
+            name='versao',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Versão'),
+        ),
+    ]
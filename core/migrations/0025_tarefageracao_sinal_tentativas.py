@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_processo_versao'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tarefageracao',
+            name='tentativas',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Tentativas'),
+        ),
+        migrations.AddField(
+            model_name='tarefageracao',
+            name='ultimo_sinal',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Último Sinal do Worker'),
+        ),
+    ]
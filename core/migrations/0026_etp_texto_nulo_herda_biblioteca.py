@@ -0,0 +1,114 @@
+# Generated by Django 5.2.7 on 2026-10-18 09:31
+
+from django.db import migrations, models
+from django.db.models import F, Value
+from django.db.models.functions import Replace
+
+
+CAMPOS_BIBLIOTECA = (
+    'etp_pca_texto', 'etp_texto_estimativa_quantidades', 'etp_texto_levantamento_mercado',
+    'etp_requisitos_texto_geral', 'etp_requisitos_marcas_texto', 'etp_requisitos_amostra_texto',
+    'etp_descricao_solucao_texto', 'etp_justificativa_parcelamento_texto',
+    'etp_resultados_pretendidos_texto', 'etp_providencias_texto',
+    'etp_contratacoes_correlatas_texto', 'etp_impactos_ambientais_texto',
+)
+
+
+def vazio_para_nulo(apps, schema_editor):
+    """
+    Até aqui vazio significava "usar o bloco da biblioteca"; passa a ser nulo. Também
+    voltam para a biblioteca as seções com o texto do bloco salvo com quebras \\r\\n,
+    que a 0017 não reconhecia (uma UPDATE por bloco).
+    """
+    ProcessoETP = apps.get_model('core', 'ProcessoETP')
+    BlocoTexto = apps.get_model('core', 'BlocoTexto')
+    for campo in CAMPOS_BIBLIOTECA:
+        ProcessoETP.objects.filter(**{campo: ''}).update(**{campo: None})
+    for bloco in BlocoTexto.objects.all():
+        etps = ProcessoETP.objects.alias(
+            normalizado=Replace(F(bloco.campo), Value('\r\n'), Value('\n'), output_field=models.TextField())
+        ).filter(normalizado=bloco.texto.replace('\r\n', '\n'))
+        if bloco.orgao_id is None:
+            # O bloco padrão não vale para órgãos com variante própria desta seção
+            variantes = BlocoTexto.objects.filter(campo=bloco.campo, orgao__isnull=False).values('orgao_id')
+            etps = etps.exclude(processo__orgao_responsavel_id__in=variantes)
+        else:
+            etps = etps.filter(processo__orgao_responsavel_id=bloco.orgao_id)
+        etps.update(**{bloco.campo: None})
+
+
+def nulo_para_vazio(apps, schema_editor):
+    ProcessoETP = apps.get_model('core', 'ProcessoETP')
+    for campo in CAMPOS_BIBLIOTECA:
+        ProcessoETP.objects.filter(**{f'{campo}__isnull': True}).update(**{campo: ''})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_tarefageracao_sinal_tentativas'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='processoetp',
+            name='etp_contratacoes_correlatas_texto',
+            field=models.TextField(blank=True, null=True, verbose_name='11. Contratações Correlatas/Interdependentes (Texto)'),
+        ),
+        migrations.AlterField(
+            model_name='processoetp',
+            name='etp_descricao_solucao_texto',
+            field=models.TextField(blank=True, null=True, verbose_name='7. Descrição da Solução como um Todo (Texto)'),
+        ),
+        migrations.AlterField(
+            model_name='processoetp',
+            name='etp_impactos_ambientais_texto',
+            field=models.TextField(blank=True, null=True, verbose_name='12. Possíveis Impactos Ambientais (Texto)'),
+        ),
+        migrations.AlterField(
+            model_name='processoetp',
+            name='etp_justificativa_parcelamento_texto',
+            field=models.TextField(blank=True, null=True, verbose_name='8. Justificativas para Parcelamento (Texto)'),
+        ),
+        migrations.AlterField(
+            model_name='processoetp',
+            name='etp_pca_texto',
+            field=models.TextField(blank=True, null=True, verbose_name='2. Previsão no PCA'),
+        ),
+        migrations.AlterField(
+            model_name='processoetp',
+            name='etp_providencias_texto',
+            field=models.TextField(blank=True, null=True, verbose_name='10. Providências a serem Adotadas (Texto)'),
+        ),
+        migrations.AlterField(
+            model_name='processoetp',
+            name='etp_requisitos_amostra_texto',
+            field=models.TextField(blank=True, null=True, verbose_name='5. Requisitos: Amostra (Texto)'),
+        ),
+        migrations.AlterField(
+            model_name='processoetp',
+            name='etp_requisitos_marcas_texto',
+            field=models.TextField(blank=True, null=True, verbose_name='5. Requisitos: Indicação de Marcas (Texto)'),
+        ),
+        migrations.AlterField(
+            model_name='processoetp',
+            name='etp_requisitos_texto_geral',
+            field=models.TextField(blank=True, null=True, verbose_name='5. Requisitos da Contratação (Texto Introdutório)'),
+        ),
+        migrations.AlterField(
+            model_name='processoetp',
+            name='etp_resultados_pretendidos_texto',
+            field=models.TextField(blank=True, null=True, verbose_name='9. Demonstrativo dos Resultados Pretendidos (Texto)'),
+        ),
+        migrations.AlterField(
+            model_name='processoetp',
+            name='etp_texto_estimativa_quantidades',
+            field=models.TextField(blank=True, null=True, verbose_name='3. Estimativa das Quantidades (Texto)'),
+        ),
+        migrations.AlterField(
+            model_name='processoetp',
+            name='etp_texto_levantamento_mercado',
+            field=models.TextField(blank=True, null=True, verbose_name='4. Levantamento de Mercado (Texto)'),
+        ),
+        migrations.RunPython(vazio_para_nulo, nulo_para_vazio),
+    ]
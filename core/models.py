@@ -1,26 +1,71 @@
 # Arquivo: core/models.py (COMPLETO COM MODELO DE DOCUMENTOS)
 
+import time
+from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.db import models
 
+from .normalizacao import somente_digitos, formatar_cnpj, validar_cnpj, normalizar_nome
+
+# ==== CNPJ NORMALIZADO (Orgao e Fornecedor) ====
+def _normalizar_cnpj(instancia):
+    """Grava os 14 dígitos em cnpj_digitos e padroniza a máscara de `cnpj`."""
+    digitos = somente_digitos(instancia.cnpj)
+    if len(digitos) == 14:
+        instancia.cnpj = formatar_cnpj(digitos)
+        instancia.cnpj_digitos = digitos
+    else:
+        instancia.cnpj_digitos = None
+
+
+def _validar_cnpj_unico(instancia):
+    # A unicidade de `cnpj` não pega o mesmo CNPJ gravado com e sem máscara
+    digitos = somente_digitos(instancia.cnpj)
+    if len(digitos) == 14 and type(instancia).objects.filter(cnpj_digitos=digitos).exclude(pk=instancia.pk).exists():
+        raise ValidationError({'cnpj': f'Já existe um cadastro com o CNPJ {formatar_cnpj(digitos)}.'})
+
+
 class Orgao(models.Model):
     nome = models.CharField(max_length=200, verbose_name="Nome do Órgão")
     logo = models.ImageField(upload_to='logos/', null=True, blank=True, verbose_name="Logotipo")
-    cnpj = models.CharField(max_length=18, unique=True, verbose_name="CNPJ")
+    cnpj = models.CharField(max_length=18, unique=True, validators=[validar_cnpj], verbose_name="CNPJ")
     endereco = models.CharField(max_length=255, verbose_name="Endereço")
     telefone = models.CharField(max_length=20, blank=True, null=True, verbose_name="Telefone")
     email = models.EmailField(verbose_name="E-mail de Contato")
-    
+
+    # Preenchidos no save() (core/normalizacao.py); `normalizar_cnpjs` preenche os registros antigos
+    cnpj_digitos = models.CharField(max_length=14, unique=True, null=True, editable=False, verbose_name="CNPJ (somente dígitos)")
+    nome_busca = models.CharField(max_length=200, blank=True, editable=False, db_index=True)
+
+    def clean(self):
+        _validar_cnpj_unico(self)
+
+    def save(self, *args, **kwargs):
+        _normalizar_cnpj(self)
+        self.nome_busca = normalizar_nome(self.nome)
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.nome
     
     class Meta:
         verbose_name = "Órgão"
         verbose_name_plural = "Órgãos Públicos"
+        indexes = [models.Index(fields=['nome', 'id'])]  # Paginação por cursor (core/paginacao.py)
+
+
+class SecretariaManager(models.Manager):
+    # __str__ mostra o órgão: selects dos formulários e filtros do admin trazem o
+    # órgão no mesmo SELECT em vez de uma consulta por secretaria
+    def get_queryset(self):
+        return super().get_queryset().select_related('orgao')
 
 
 class Secretaria(models.Model):
     orgao = models.ForeignKey(Orgao, on_delete=models.CASCADE, related_name='secretarias', verbose_name="Órgão")
     nome = models.CharField(max_length=200, verbose_name="Nome da Secretaria")
+
+    objects = SecretariaManager()
     
     def __str__(self):
         return f"{self.nome} ({self.orgao.nome})"
@@ -43,21 +88,80 @@ class Responsavel(models.Model):
     class Meta:
         verbose_name = "Responsável"
         verbose_name_plural = "Responsáveis"
+        indexes = [models.Index(fields=['nome', 'id'])]  # Paginação por cursor
 
 
 class Fornecedor(models.Model):
     razao_social = models.CharField(max_length=200, verbose_name="Razão Social")
     nome_fantasia = models.CharField(max_length=200, blank=True, null=True, verbose_name="Nome Fantasia")
-    cnpj = models.CharField(max_length=18, unique=True, verbose_name="CNPJ")
+    cnpj = models.CharField(max_length=18, unique=True, validators=[validar_cnpj], verbose_name="CNPJ")
     telefone = models.CharField(max_length=20, blank=True, null=True, verbose_name="Telefone")
     email = models.EmailField(verbose_name="E-mail")
-    
+
+    # Preenchidos no save() (core/normalizacao.py); `normalizar_cnpjs` preenche os registros antigos
+    cnpj_digitos = models.CharField(max_length=14, unique=True, null=True, editable=False, verbose_name="CNPJ (somente dígitos)")
+    razao_social_busca = models.CharField(max_length=200, blank=True, editable=False, db_index=True)
+    nome_fantasia_busca = models.CharField(max_length=200, blank=True, editable=False, db_index=True)
+
+    def clean(self):
+        _validar_cnpj_unico(self)
+
+    def normalizar(self):
+        """Preenche os campos derivados; chamado pelo save() e antes de bulk_create (importação)."""
+        _normalizar_cnpj(self)
+        self.razao_social_busca = normalizar_nome(self.razao_social)
+        self.nome_fantasia_busca = normalizar_nome(self.nome_fantasia)
+
+    def save(self, *args, **kwargs):
+        self.normalizar()
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return self.razao_social
     
     class Meta:
         verbose_name = "Fornecedor"
         verbose_name_plural = "Fornecedores"
+        indexes = [models.Index(fields=['razao_social', 'id'])]  # Paginação por cursor
+
+
+# ==== ETAPAS DO PROCESSO ====
+ETAPAS_CHOICES = [
+    ('DFD', 'Documento de formalização da demanda'),
+    ('ETP', 'Estudo Técnico Preliminar (ETP)'),
+    ('PESQUISA_PRECOS', 'Pesquisa de preços do mercado'),
+    ('DOTACAO', 'Dotação orçamentária'),
+    ('MAPA_RISCOS', 'Mapa de riscos, quando exigido'),
+    ('TERMO_REF', 'Termo de referência ou projeto básico'),
+    ('JUSTIFICATIVA', 'Justificativa'),
+    ('PARECER_TECNICO_JURIDICO', 'Parecer da área técnica e/ou jurídica'),
+    ('PARECER_CONTROLE_INTERNO', 'Parecer Controle Interno'),
+    ('PEDIDO_RATIFICACAO', 'Pedido de Ratificação'),
+    ('RATIFICACAO', 'Ratificação'),
+    ('AUTORIZACAO', 'Autorização da autoridade competente para o início'),
+    ('EDITAL', 'Edital de licitação, incluindo anexos'),
+    ('PUBLICACAO_AVISO', 'Publicação do aviso de licitação'),
+    ('RECEBIMENTO_PROPOSTAS', 'Recebimento das propostas e documentos de habilitação'),
+    ('ATA_SESSAO', 'Ata/súmula de sessão pública'),
+    ('PLANILHA_CLASSIFICACAO', 'Planilha de classificação das propostas'),
+    ('DOCS_HABILITACAO', 'Documentos apresentados para habilitação'),
+    ('PARECERES_FASE_EXTERNA', 'Pareceres técnicos e jurídicos sobre propostas/habilitação'),
+    ('RECURSOS', 'Registros de recursos administrativos'),
+    ('JULGAMENTO_RECURSOS', 'Ata(s) de julgamento dos recursos'),
+    ('ADJUDICACAO', 'Adjudicação do objeto ao licitante vencedor'),
+    ('HOMOLOGACAO', 'Homologação final do resultado'),
+]
+
+# Bit de cada etapa em Processo.etapas_mascara: a posição na lista acima.
+# Etapas novas entram no fim da lista; reordenar exige `recalcular_progresso`.
+BIT_ETAPA = {etapa: 1 << ordem for ordem, (etapa, _) in enumerate(ETAPAS_CHOICES)}
+
+
+def mascara_etapas(etapas):
+    mascara = 0
+    for etapa in etapas:
+        mascara |= BIT_ETAPA[etapa]
+    return mascara
 
 
 class Processo(models.Model):
@@ -80,14 +184,6 @@ class Processo(models.Model):
         ('INEXIGIBILIDADE', 'Inexigibilidade de Licitação')
     ]
     
-    CRITERIO_JULGAMENTO_CHOICES = [
-        ('MENOR_PRECO', 'Menor Preço'),
-        ('MAIOR_DESCONTO', 'Maior Desconto'),
-        ('MELHOR_TECNICA', 'Melhor Técnica ou Conteúdo Artístico'),
-        ('TECNICA_PRECO', 'Técnica e Preço'),
-        ('MAIOR_RETORNO', 'Maior Retorno Econômico')
-    ]
-
     # Campos Gerais / DFD
     numero_processo = models.CharField(max_length=50, unique=True, verbose_name="Número do Processo")
     orgao_responsavel = models.ForeignKey(Orgao, on_delete=models.PROTECT, verbose_name="Órgão Responsável")
@@ -102,25 +198,89 @@ class Processo(models.Model):
     descricao_detalhada_objeto = models.TextField(verbose_name="3.1. Objeto da Contratação Detalhado (DFD/ETP)", blank=True)
     vigencia_meses = models.IntegerField(verbose_name="8. Vigência Contratual (em meses)", null=True, blank=True)
 
-    # ==== CAMPOS ESPECÍFICOS DO ETP ====
+    # Progresso desnormalizado, mantido por core/etapas.py: listas e relatórios não
+    # precisam consultar HistoricoProcesso para saber quais etapas foram concluídas
+    etapas_mascara = models.PositiveBigIntegerField(default=0, editable=False, verbose_name="Etapas Concluídas (bits)")
+    etapas_concluidas = models.PositiveSmallIntegerField(default=0, editable=False, verbose_name="Nº de Etapas Concluídas")
+    ultima_etapa = models.CharField(max_length=50, choices=ETAPAS_CHOICES, blank=True, editable=False, verbose_name="Última Etapa Concluída")
+    ultima_etapa_em = models.DateTimeField(null=True, blank=True, editable=False, verbose_name="Conclusão da Última Etapa")
+    # Incrementada a cada edição pelas telas e a cada mudança de status (core/status.py)
+    versao = models.PositiveIntegerField(default=0, editable=False, verbose_name="Versão")
+
+    def get_etp(self):
+        """ETP do processo; se ainda não foi preenchido, um ProcessoETP novo (não salvo) com os textos padrão."""
+        try:
+            return self.etp
+        except ProcessoETP.DoesNotExist:
+            return ProcessoETP(processo=self)
+
+    def etapas_da_mascara(self):
+        """Etapas concluídas [(chave, nome), ...] na ordem do processo, sem consultar o histórico."""
+        return [(etapa, nome) for etapa, nome in ETAPAS_CHOICES if self.etapas_mascara & BIT_ETAPA[etapa]]
+
+    @property
+    def percentual_etapas(self):
+        return round(100 * self.etapas_concluidas / len(ETAPAS_CHOICES))
+
+    def __str__(self):
+        return f"{self.numero_processo} - {self.get_modalidade_display()}"
+
+    class Meta:
+        verbose_name = "Processo"
+        verbose_name_plural = "Processos"
+        # Filtros dos relatórios (FiltroProcessosForm) + ordenação por data de abertura
+        indexes = [
+            models.Index(fields=['status', 'data_abertura']),
+            models.Index(fields=['orgao_responsavel', 'data_abertura']),
+            models.Index(fields=['modalidade', 'data_abertura']),
+            models.Index(fields=['-data_abertura', '-id']),  # Paginação por cursor
+            models.Index(fields=['-etapas_concluidas', '-id']),  # Listagem ordenada por progresso
+        ]
+
+
+def _numero_do_processo(objeto):
+    """
+    Número do processo para o __str__ de um modelo com FK `processo`, sem consulta
+    extra: se o processo não veio junto (select_related), mostra o id.
+    """
+    if type(objeto).processo.is_cached(objeto):
+        return objeto.processo.numero_processo
+    return f"Processo #{objeto.processo_id}"
+
+
+# ==== ETP DO PROCESSO ====
+# Os textos longos do ETP ficam fora de Processo para que listagens, dashboard e
+# relatórios não carreguem esse conteúdo. Só o formulário do ETP e a geração de
+# documentos (ETP/TR) leem esta tabela.
+class ProcessoETP(models.Model):
+    CRITERIO_JULGAMENTO_CHOICES = [
+        ('MENOR_PRECO', 'Menor Preço'),
+        ('MAIOR_DESCONTO', 'Maior Desconto'),
+        ('MELHOR_TECNICA', 'Melhor Técnica ou Conteúdo Artístico'),
+        ('TECNICA_PRECO', 'Técnica e Preço'),
+        ('MAIOR_RETORNO', 'Maior Retorno Econômico')
+    ]
+
+    processo = models.OneToOneField(Processo, on_delete=models.CASCADE, primary_key=True, related_name='etp', verbose_name="Processo")
+
     # IDENTIFICAÇÃO
     etp_responsavel_elaboracao = models.ForeignKey(Responsavel, on_delete=models.SET_NULL, null=True, blank=True, related_name='processos_elaborados_etp', verbose_name="Responsável pela Elaboração (ETP)")
     
     # 2. PCA
-    etp_pca_texto = models.TextField(verbose_name="2. Previsão no PCA", blank=True, default="Este órgão não elaborou Plano de Contratações Anual para este ano, motivo pelo qual deixo de indicar a previsão desta contratação neste tópico.")
+    etp_pca_texto = models.TextField(verbose_name="2. Previsão no PCA", null=True, blank=True)
     
     # 3. ESTIMATIVA QUANTIDADES
-    etp_texto_estimativa_quantidades = models.TextField(verbose_name="3. Estimativa das Quantidades (Texto)", blank=True, default="Foi emitido relatório de consumo dos últimos 12 meses de todas as repartições deste órgão público, a fim de identificar os quantitativos de produtos consumidos por esta Administração.\nAlém disso, foi enviado ofício para todas as repartições que utilizam esse produto, a fim de indagar se haverá aumento de consumo em algum item específico, bem como se há algum produto extra a ser considerado para a próxima compra.\nEm que pese os levantamentos acima referidos, mensurar sua quantidade exata para uso durante o período de 12 meses não se mostra possível.\nDiante disso, opta-se por realizar pregão na modalidade registro de preços.")
+    etp_texto_estimativa_quantidades = models.TextField(verbose_name="3. Estimativa das Quantidades (Texto)", null=True, blank=True)
     
     # 4. LEVANTAMENTO MERCADO
-    etp_texto_levantamento_mercado = models.TextField(verbose_name="4. Levantamento de Mercado (Texto)", blank=True, default="Considerando que não há soluções mercadológicas a serem consideradas para a aquisição desse objeto, deixo de fazer este levantamento, especialmente porque se trata de uma compra de baixa complexidade e não há outros meios de adquirir estes itens, a não ser pela compra desses produtos com fornecedores que trabalham neste ramo.")
+    etp_texto_levantamento_mercado = models.TextField(verbose_name="4. Levantamento de Mercado (Texto)", null=True, blank=True)
     etp_estimativa_metodologia = models.TextField(verbose_name="6. Metodologia da Estimativa de Preços", blank=True)
     etp_analise_fornecedores_detalhe = models.TextField(verbose_name="4.2. Análise de Fornecedores Detalhada (ETP)", blank=True)
     
     # 5. REQUISITOS
-    etp_requisitos_texto_geral = models.TextField(verbose_name="5. Requisitos da Contratação (Texto Introdutório)", blank=True, default="Para esta aquisição, serão exigidos os seguintes requisitos para a contratação:")
-    etp_requisitos_marcas_texto = models.TextField(verbose_name="5. Requisitos: Indicação de Marcas (Texto)", blank=True, default="A fim de selecionar um fornecedor que possa atender as especificações mínimas descritas neste estudo e atendam a demanda desta Administração, foram realizadas pesquisas de mercado para verificar quais são as marcas que possuem melhor custo-benefício, com base em critérios técnicos, qualidade comprovada, durabilidade, assistência técnica disponível na região e compatibilidade com as necessidades específicas do objeto licitado.\nA indicação de marcas de referência busca assegurar a aquisição de produtos que atendam aos padrões mínimos de desempenho e eficiência, sem, contudo, restringir a competitividade, uma vez que permite a apresentação de produtos equivalentes que atendam às mesmas especificações técnicas.\nAssim, garante-se a transparência e a objetividade do processo licitatório, resguardando o interesse público e a economicidade.")
-    etp_requisitos_amostra_texto = models.TextField(verbose_name="5. Requisitos: Amostra (Texto)", blank=True, default="A exigência de apresentação de amostra no processo licitatório visa garantir que os produtos ofertados atendam integralmente às especificações técnicas e aos padrões de qualidade estabelecidos no termo de referência ou no edital.\nEssa medida é fundamental para assegurar a conformidade dos itens contratados com as necessidades da Administração Pública, minimizando riscos de aquisição de materiais ou bens inadequados.\nA apresentação de amostras permite:\nVerificação da Qualidade: Avaliar se o produto ofertado possui características técnicas, materiais e acabamento compatíveis com os critérios exigidos.\nConformidade com as Especificações: Assegurar que o item atende plenamente aos requisitos estabelecidos, evitando divergências entre o que foi ofertado e o que será entregue.\nRedução de Riscos: Prevenir problemas relacionados à entrega de itens de qualidade inferior ou incompatíveis com o objeto da licitação, promovendo maior eficiência e economicidade.\nDessa forma, a exigência de amostra é um instrumento que contribui para a lisura e eficiência do processo licitatório, resguardando o interesse público e garantindo a qualidade na aquisição dos bens ou materiais necessários.")
+    etp_requisitos_texto_geral = models.TextField(verbose_name="5. Requisitos da Contratação (Texto Introdutório)", null=True, blank=True)
+    etp_requisitos_marcas_texto = models.TextField(verbose_name="5. Requisitos: Indicação de Marcas (Texto)", null=True, blank=True)
+    etp_requisitos_amostra_texto = models.TextField(verbose_name="5. Requisitos: Amostra (Texto)", null=True, blank=True)
     etp_requisitos_tecnicos_detalhe = models.TextField(verbose_name="3.2. Requisitos Técnicos Detalhados (ETP)", blank=True)
     etp_requisitos_capacitacao_detalhe = models.TextField(verbose_name="3.3. Requisitos de Capacitação Técnica Detalhados (ETP)", blank=True)
     
@@ -128,25 +288,25 @@ class Processo(models.Model):
     etp_justificativa_contratacao = models.TextField(verbose_name="5. Justificativa da Contratação (ETP)", blank=True)
     
     # 7. DESCRIÇÃO SOLUÇÃO
-    etp_descricao_solucao_texto = models.TextField(verbose_name="7. Descrição da Solução como um Todo (Texto)", blank=True, default="Considerando os levantamentos realizados neste Estudo Técnico Preliminar, chegou-se à conclusão de que não há outras soluções mercadológicas a serem consideradas, a não ser a compra desses produtos por intermédio de fornecedores.\nOs quantitativos, em que pese terem sido levantados por intermédio de relatórios e ofícios para as demais secretarias requisitantes, ainda sim podem sofrer alteração no decorrer do ano, razão pela qual optou-se por realizar um pregão na modalidade registro de preços.")
+    etp_descricao_solucao_texto = models.TextField(verbose_name="7. Descrição da Solução como um Todo (Texto)", null=True, blank=True)
     etp_solucao_proposta_detalhe = models.TextField(verbose_name="6.1. Solução Proposta Detalhada (ETP)", blank=True)
     etp_analise_alternativas_detalhe = models.TextField(verbose_name="6.2. Análise de Alternativas Detalhada (ETP)", blank=True)
     
     # 8. JUSTIFICATIVA PARCELAMENTO
-    etp_justificativa_parcelamento_texto = models.TextField(verbose_name="8. Justificativas para Parcelamento (Texto)", blank=True, default="Em se tratando de aquisição de produtos divisíveis, os quais serão comprados por intermédio de um pregão na modalidade registro de preços e que há um rol extenso de materiais diferentes que devem ser fornecidos, opta-se por executar a licitação dividida em itens, uma vez que ampliará a competitividade e não limitará os fornecedores que não possuem determinados itens para fornecimento.")
+    etp_justificativa_parcelamento_texto = models.TextField(verbose_name="8. Justificativas para Parcelamento (Texto)", null=True, blank=True)
     
     # 9. RESULTADOS PRETENDIDOS
-    etp_resultados_pretendidos_texto = models.TextField(verbose_name="9. Demonstrativo dos Resultados Pretendidos (Texto)", blank=True, default="Como não há soluções comparativas em relação a essa compra, não há como demonstrar os resultados pretendidos em detrimento de outras hipóteses.")
+    etp_resultados_pretendidos_texto = models.TextField(verbose_name="9. Demonstrativo dos Resultados Pretendidos (Texto)", null=True, blank=True)
     
     # 10. PROVIDÊNCIAS
-    etp_providencias_texto = models.TextField(verbose_name="10. Providências a serem Adotadas (Texto)", blank=True, default="Não há providências a serem adotadas pela Administração nesta compra.")
+    etp_providencias_texto = models.TextField(verbose_name="10. Providências a serem Adotadas (Texto)", null=True, blank=True)
     
     # 11. CONTRATAÇÕES CORRELATAS
-    etp_contratacoes_correlatas_texto = models.TextField(verbose_name="11. Contratações Correlatas/Interdependentes (Texto)", blank=True, default="Não há contratações correlatas e/ou interdependentes para essa aquisição.")
+    etp_contratacoes_correlatas_texto = models.TextField(verbose_name="11. Contratações Correlatas/Interdependentes (Texto)", null=True, blank=True)
     etp_alinhamento_estrategico_texto = models.TextField(verbose_name="11. Alinhamento ao Planejamento (Texto)", blank=True)
     
     # 12. IMPACTOS AMBIENTAIS
-    etp_impactos_ambientais_texto = models.TextField(verbose_name="12. Possíveis Impactos Ambientais (Texto)", blank=True, default="Não há medidas sustentáveis ou impactos ambientais a serem considerados nessa contratação.")
+    etp_impactos_ambientais_texto = models.TextField(verbose_name="12. Possíveis Impactos Ambientais (Texto)", null=True, blank=True)
     
     # 14. APROVAÇÃO E ASSINATURA
     etp_autoridade_competente = models.ForeignKey(Responsavel, on_delete=models.SET_NULL, null=True, blank=True, related_name='processos_aprovados_etp', verbose_name="Autoridade Competente (Aprovação ETP)")
@@ -172,40 +332,91 @@ class Processo(models.Model):
     # 17. ANEXOS
     etp_lista_anexos_texto = models.TextField(verbose_name="17. Anexos (Texto)", blank=True)
 
+    def texto(self, campo):
+        """Texto da seção `campo`: o deste ETP (mesmo vazio) ou, se nulo, o da biblioteca (BlocoTexto)."""
+        valor = getattr(self, campo)
+        return valor if valor is not None else BlocoTexto.resolver(campo, self.processo.orgao_responsavel_id)
+
     def __str__(self):
-        return f"{self.numero_processo} - {self.get_modalidade_display()}"
+        return f"ETP - {_numero_do_processo(self)}"
 
     class Meta:
-        verbose_name = "Processo"
-        verbose_name_plural = "Processos"
+        verbose_name = "ETP do Processo"
+        verbose_name_plural = "ETPs dos Processos"
+
+
+# ==== BIBLIOTECA DE TEXTOS PADRÃO DO ETP ====
+# Seções do ETP que costumam repetir o mesmo texto em todos os processos. O texto
+# fica uma única vez em BlocoTexto (com variantes por órgão) e o ProcessoETP só
+# guarda conteúdo próprio quando o texto é editado; nulo significa "usar o bloco"
+# (uma seção deixada em branco de propósito fica vazia, não volta ao texto padrão).
+CAMPOS_BIBLIOTECA = (
+    'etp_pca_texto', 'etp_texto_estimativa_quantidades', 'etp_texto_levantamento_mercado',
+    'etp_requisitos_texto_geral', 'etp_requisitos_marcas_texto', 'etp_requisitos_amostra_texto',
+    'etp_descricao_solucao_texto', 'etp_justificativa_parcelamento_texto',
+    'etp_resultados_pretendidos_texto', 'etp_providencias_texto',
+    'etp_contratacoes_correlatas_texto', 'etp_impactos_ambientais_texto',
+)
+
+_cache_blocos = {'carregado_em': 0.0, 'blocos': {}}
+
+
+class BlocoTexto(models.Model):
+    CAMPO_CHOICES = [(campo, ProcessoETP._meta.get_field(campo).verbose_name) for campo in CAMPOS_BIBLIOTECA]
+
+    campo = models.CharField(max_length=60, choices=CAMPO_CHOICES, verbose_name="Seção do ETP")
+    orgao = models.ForeignKey(Orgao, on_delete=models.CASCADE, null=True, blank=True, related_name='blocos_texto', verbose_name="Órgão", help_text="Deixe em branco para o texto padrão de todos os órgãos.")
+    texto = models.TextField(verbose_name="Texto")
+    data_atualizacao = models.DateTimeField(auto_now=True, verbose_name="Última Atualização")
+
+    def __str__(self):
+        return f"{self.get_campo_display()} - {self.orgao or 'Padrão'}"
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        BlocoTexto.limpar_cache()
+
+    def delete(self, *args, **kwargs):
+        resultado = super().delete(*args, **kwargs)
+        BlocoTexto.limpar_cache()
+        return resultado
+
+    @staticmethod
+    def limpar_cache():
+        _cache_blocos['carregado_em'] = 0.0
+
+    @staticmethod
+    def _blocos():
+        # A biblioteca é pequena: carrega inteira e guarda em memória por BLOCOS_TEXTO_TTL
+        # segundos. Quem salva um bloco limpa o cache do próprio processo; os demais
+        # processos passam a ver a alteração quando o prazo expira.
+        agora = time.monotonic()
+        if agora - _cache_blocos['carregado_em'] > settings.BLOCOS_TEXTO_TTL:
+            _cache_blocos['blocos'] = {
+                (campo, orgao_id): texto
+                for campo, orgao_id, texto in BlocoTexto.objects.values_list('campo', 'orgao_id', 'texto')
+            }
+            _cache_blocos['carregado_em'] = agora
+        return _cache_blocos['blocos']
+
+    @staticmethod
+    def resolver(campo, orgao_id=None):
+        """Texto da biblioteca para `campo`: a variante do órgão, senão o padrão geral."""
+        blocos = BlocoTexto._blocos()
+        return blocos.get((campo, orgao_id)) or blocos.get((campo, None), '')
+
+    class Meta:
+        verbose_name = "Bloco de Texto do ETP"
+        verbose_name_plural = "Biblioteca de Textos do ETP"
+        ordering = ['campo', 'orgao']
+        constraints = [
+            models.UniqueConstraint(fields=['campo', 'orgao'], name='bloco_texto_unico_por_orgao'),
+            models.UniqueConstraint(fields=['campo'], condition=models.Q(orgao__isnull=True), name='bloco_texto_unico_padrao'),
+        ]
 
 
 class HistoricoProcesso(models.Model):
-    ETAPAS_CHOICES = [
-        ('DFD', 'Documento de formalização da demanda'),
-        ('ETP', 'Estudo Técnico Preliminar (ETP)'),
-        ('PESQUISA_PRECOS', 'Pesquisa de preços do mercado'),
-        ('DOTACAO', 'Dotação orçamentária'),
-        ('MAPA_RISCOS', 'Mapa de riscos, quando exigido'),
-        ('TERMO_REF', 'Termo de referência ou projeto básico'),
-        ('JUSTIFICATIVA', 'Justificativa'),
-        ('PARECER_TECNICO_JURIDICO', 'Parecer da área técnica e/ou jurídica'),
-        ('PARECER_CONTROLE_INTERNO', 'Parecer Controle Interno'),
-        ('PEDIDO_RATIFICACAO', 'Pedido de Ratificação'),
-        ('RATIFICACAO', 'Ratificação'),
-        ('AUTORIZACAO', 'Autorização da autoridade competente para o início'),
-        ('EDITAL', 'Edital de licitação, incluindo anexos'),
-        ('PUBLICACAO_AVISO', 'Publicação do aviso de licitação'),
-        ('RECEBIMENTO_PROPOSTAS', 'Recebimento das propostas e documentos de habilitação'),
-        ('ATA_SESSAO', 'Ata/súmula de sessão pública'),
-        ('PLANILHA_CLASSIFICACAO', 'Planilha de classificação das propostas'),
-        ('DOCS_HABILITACAO', 'Documentos apresentados para habilitação'),
-        ('PARECERES_FASE_EXTERNA', 'Pareceres técnicos e jurídicos sobre propostas/habilitação'),
-        ('RECURSOS', 'Registros de recursos administrativos'),
-        ('JULGAMENTO_RECURSOS', 'Ata(s) de julgamento dos recursos'),
-        ('ADJUDICACAO', 'Adjudicação do objeto ao licitante vencedor'),
-        ('HOMOLOGACAO', 'Homologação final do resultado'),
-    ]
+    ETAPAS_CHOICES = ETAPAS_CHOICES
     
     processo = models.ForeignKey(Processo, on_delete=models.CASCADE, related_name='historico')
     etapa = models.CharField(max_length=50, choices=ETAPAS_CHOICES)
@@ -217,7 +428,82 @@ class HistoricoProcesso(models.Model):
         unique_together = ('processo', 'etapa')
     
     def __str__(self):
-        return f"{self.processo.numero_processo} - {self.get_etapa_display()}"
+        return f"{_numero_do_processo(self)} - {self.get_etapa_display()}"
+
+
+# ==== RESUMO DO DASHBOARD ====
+# Quantidade e valor estimado dos processos agregados por (órgão, status, modalidade,
+# mês de abertura). Mantido incrementalmente pelos signals de Processo (core/resumo.py);
+# o dashboard lê estas poucas linhas em vez de agregar a tabela de processos.
+class ResumoDashboard(models.Model):
+    orgao = models.ForeignKey(Orgao, on_delete=models.CASCADE, related_name='resumos', verbose_name="Órgão")
+    status = models.CharField(max_length=30, choices=Processo.STATUS_CHOICES, verbose_name="Status")
+    modalidade = models.CharField(max_length=30, choices=Processo.MODALIDADE_CHOICES, verbose_name="Modalidade")
+    mes = models.DateField(verbose_name="Mês de Abertura")  # Sempre o dia 1º do mês
+    quantidade = models.IntegerField(default=0, verbose_name="Quantidade de Processos")
+    valor_total = models.DecimalField(max_digits=16, decimal_places=2, default=0, verbose_name="Valor Estimado Total")
+
+    def __str__(self):
+        return f"{self.orgao_id} / {self.status} / {self.modalidade} / {self.mes:%m/%Y}: {self.quantidade}"
+
+    class Meta:
+        verbose_name = "Resumo do Dashboard"
+        verbose_name_plural = "Resumos do Dashboard"
+        constraints = [
+            models.UniqueConstraint(fields=['orgao', 'status', 'modalidade', 'mes'], name='resumo_dashboard_unico'),
+        ]
+
+
+# ==== TEMPOS ENTRE ETAPAS (ANÁLISE) ====
+# Resumo pré-calculado por core/analise.py (comando `calcular_tempos_etapas`, rodado
+# à noite): para cada recorte (modalidade, órgão ou secretaria) e etapa, a
+# distribuição dos dias desde a etapa concluída antes dela (ou desde a abertura).
+# A linha com etapa TOTAL mede da abertura até a homologação.
+class TempoEtapa(models.Model):
+    DIMENSAO_CHOICES = [
+        ('GERAL', 'Todos os Processos'),
+        ('MODALIDADE', 'Modalidade'),
+        ('ORGAO', 'Órgão'),
+        ('SECRETARIA', 'Secretaria'),
+    ]
+    ETAPA_TOTAL = 'TOTAL'
+
+    dimensao = models.CharField(max_length=20, choices=DIMENSAO_CHOICES, verbose_name="Recorte")
+    valor = models.CharField(max_length=50, blank=True, verbose_name="Valor do Recorte")  # Modalidade ou id do órgão/secretaria
+    rotulo = models.CharField(max_length=200, blank=True, verbose_name="Nome do Recorte")
+    etapa = models.CharField(max_length=50, choices=ETAPAS_CHOICES + [(ETAPA_TOTAL, 'Abertura até a Homologação')], verbose_name="Etapa")
+    quantidade = models.PositiveIntegerField(verbose_name="Processos Medidos")
+    media_dias = models.FloatField(verbose_name="Média (dias)")
+    mediana_dias = models.FloatField(verbose_name="Mediana (dias)")
+    p90_dias = models.FloatField(verbose_name="90º Percentil (dias)")
+    maximo_dias = models.FloatField(verbose_name="Máximo (dias)")
+    calculado_em = models.DateTimeField(verbose_name="Calculado em")
+
+    def __str__(self):
+        return f"{self.get_dimensao_display()} {self.rotulo} - {self.get_etapa_display()}: {self.mediana_dias:.1f} dias"
+
+    class Meta:
+        verbose_name = "Tempo de Etapa"
+        verbose_name_plural = "Tempos de Etapas"
+        constraints = [
+            models.UniqueConstraint(fields=['dimensao', 'valor', 'etapa'], name='tempo_etapa_unico'),
+        ]
+
+
+# ==== VERSÕES PARA O CACHE ====
+# Um contador por modelo, incrementado a cada gravação (core/cache.py). As chaves do
+# cache levam as versões dos modelos de que o valor depende, então uma gravação
+# invalida exatamente o que foi calculado antes dela, em todos os workers.
+class ContadorVersao(models.Model):
+    modelo = models.CharField(max_length=100, primary_key=True, verbose_name="Modelo")
+    versao = models.PositiveBigIntegerField(default=0, verbose_name="Versão")
+
+    def __str__(self):
+        return f"{self.modelo} v{self.versao}"
+
+    class Meta:
+        verbose_name = "Contador de Versão"
+        verbose_name_plural = "Contadores de Versão"
 
 
 # ==== NOVO MODELO: DOCUMENTOS ====
@@ -233,11 +519,55 @@ class Documento(models.Model):
     arquivo = models.FileField(upload_to='documentos/%Y/%m/', verbose_name="Arquivo Gerado")
     data_geracao = models.DateTimeField(auto_now_add=True, verbose_name="Data de Geração")
     gerado_por = models.CharField(max_length=200, verbose_name="Gerado por", blank=True)
+    hash_conteudo = models.CharField(max_length=64, blank=True, db_index=True, verbose_name="Hash do Conteúdo")
     
     def __str__(self):
-        return f"{self.get_tipo_display()} - {self.processo.numero_processo}"
+        return f"{self.get_tipo_display()} - {_numero_do_processo(self)}"
     
     class Meta:
         verbose_name = "Documento"
         verbose_name_plural = "Documentos"
-        ordering = ['-data_geracao']
\ No newline at end of file
+        ordering = ['-data_geracao']
+        indexes = [models.Index(fields=['-data_geracao', '-id'])]  # Paginação por cursor
+
+# ==== FILA DE TAREFAS (GERAÇÃO EM SEGUNDO PLANO) ====
+class TarefaGeracao(models.Model):
+    TIPO_CHOICES = [
+        ('DFD', 'Documento de Formalização da Demanda'),
+        ('ETP', 'Estudo Técnico Preliminar'),
+        ('TR', 'Termo de Referência'),
+        ('ANDAMENTO_PDF', 'Andamento do Processo (PDF)'),
+        ('RELATORIO_PDF', 'Relatório de Processos (PDF)'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('PENDENTE', 'Pendente'),
+        ('EXECUTANDO', 'Em Execução'),
+        ('CONCLUIDA', 'Concluída'),
+        ('ERRO', 'Erro'),
+    ]
+    
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES, verbose_name="Tipo")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDENTE', verbose_name="Status")
+    progresso = models.PositiveSmallIntegerField(default=0, verbose_name="Progresso (%)")
+    processo = models.ForeignKey(Processo, on_delete=models.CASCADE, null=True, blank=True, related_name='tarefas', verbose_name="Processo")
+    parametros = models.JSONField(default=dict, blank=True, verbose_name="Parâmetros")
+    documento = models.ForeignKey(Documento, on_delete=models.SET_NULL, null=True, blank=True, related_name='tarefas', verbose_name="Documento Gerado")
+    arquivo = models.CharField(max_length=255, blank=True, verbose_name="Arquivo Gerado")
+    erro = models.TextField(blank=True, verbose_name="Mensagem de Erro")
+    solicitado_por = models.CharField(max_length=200, blank=True, verbose_name="Solicitado por")
+    data_criacao = models.DateTimeField(auto_now_add=True, verbose_name="Data de Criação")
+    data_inicio = models.DateTimeField(null=True, blank=True, verbose_name="Início da Execução")
+    data_conclusao = models.DateTimeField(null=True, blank=True, verbose_name="Fim da Execução")
+    # O worker renova ultimo_sinal enquanto executa; sem sinal, a tarefa volta à fila (core/tarefas.py)
+    ultimo_sinal = models.DateTimeField(null=True, blank=True, verbose_name="Último Sinal do Worker")
+    tentativas = models.PositiveSmallIntegerField(default=0, verbose_name="Tentativas")
+    
+    def __str__(self):
+        return f"{self.get_tipo_display()} #{self.pk} ({self.get_status_display()})"
+    
+    class Meta:
+        verbose_name = "Tarefa de Geração"
+        verbose_name_plural = "Tarefas de Geração"
+        ordering = ['data_criacao']
+        indexes = [models.Index(fields=['status', 'data_criacao'])]
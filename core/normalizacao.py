@@ -0,0 +1,52 @@
+# Arquivo: core/normalizacao.py (CNPJ e nomes normalizados para busca)
+
+# O CNPJ digitado pode vir com ou sem máscara; o que identifica a empresa são os
+# 14 dígitos, guardados à parte em `cnpj_digitos` (único). Nomes ganham uma coluna
+# em minúsculas e sem acentos, indexada, para as buscas por prefixo (typeahead).
+import re
+import unicodedata
+
+from django.core.exceptions import ValidationError
+
+
+def somente_digitos(valor):
+    return re.sub(r'\D', '', valor or '')
+
+
+def _digito_verificador(digitos, pesos):
+    resto = sum(int(d) * p for d, p in zip(digitos, pesos)) % 11
+    return '0' if resto < 2 else str(11 - resto)
+
+
+def cnpj_valido(digitos):
+    if len(digitos) != 14 or not digitos.isdigit() or digitos == digitos[0] * 14:
+        return False
+    primeiro = _digito_verificador(digitos[:12], (5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2))
+    segundo = _digito_verificador(digitos[:12] + primeiro, (6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2))
+    return digitos[12:] == primeiro + segundo
+
+
+def formatar_cnpj(digitos):
+    return f'{digitos[:2]}.{digitos[2:5]}.{digitos[5:8]}/{digitos[8:12]}-{digitos[12:]}'
+
+
+def validar_cnpj(valor):
+    """Validador dos campos `cnpj`: aceita com ou sem máscara e confere os dígitos verificadores."""
+    if not cnpj_valido(somente_digitos(valor)):
+        raise ValidationError('CNPJ inválido.', code='cnpj_invalido')
+
+
+def normalizar_nome(texto):
+    """'Comércio de Combustíveis  LTDA' -> 'comercio de combustiveis ltda'."""
+    sem_acentos = unicodedata.normalize('NFKD', texto or '').encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(sem_acentos.lower().split())
+
+
+def filtro_prefixo(campo, prefixo):
+    """
+    Condição `campo` começa com `prefixo` como intervalo (>= prefixo e < prefixo
+    seguinte), que qualquer índice B-tree atende. O LIKE 'x%' do SQLite não usa o
+    índice, pois compara sem diferenciar maiúsculas.
+    """
+    limite = prefixo[:-1] + chr(ord(prefixo[-1]) + 1)
+    return {f'{campo}__gte': prefixo, f'{campo}__lt': limite}
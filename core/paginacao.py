@@ -0,0 +1,87 @@
+# Arquivo: core/paginacao.py (Paginação por cursor / keyset)
+
+# Em vez de OFFSET (que obriga o banco a percorrer todas as linhas anteriores),
+# cada página começa logo depois da última linha da página anterior:
+#   WHERE (data_abertura, id) < (:ultima_data, :ultimo_id) ORDER BY data_abertura DESC, id DESC
+# Com um índice na mesma ordenação, a página 500 custa o mesmo que a página 1.
+# A ordenação precisa terminar em um campo único (o id) e não ter valores nulos.
+import json, base64
+from dataclasses import dataclass
+from datetime import date, datetime
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+@dataclass
+class PaginaKeyset:
+    itens: list
+    proximo_cursor: str
+    tem_mais: bool
+
+
+def _serializar(valor):
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    return valor
+
+
+def codificar_cursor(valores):
+    texto = json.dumps([_serializar(valor) for valor in valores], separators=(',', ':'))
+    return base64.urlsafe_b64encode(texto.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor, modelo, ordenacao):
+    """
+    Devolve a lista de valores do cursor, já convertidos pelo campo correspondente de
+    `modelo` (to_python), ou None se ele for inválido. O cursor vem da URL: um valor
+    adulterado (texto num campo de data, lista no lugar do id) não pode chegar ao filtro.
+    """
+    try:
+        texto = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+        valores = json.loads(texto)
+        if not isinstance(valores, list) or len(valores) != len(ordenacao):
+            return None
+        campos = [modelo._meta.get_field(campo.lstrip('-')) for campo in ordenacao]
+        valores = [campo.to_python(valor) for campo, valor in zip(campos, valores)]
+    except (ValidationError, ValueError, TypeError):
+        return None
+    # A ordenação não tem nulos (ver o início do arquivo); um nulo no cursor é adulteração
+    if any(valor is None for valor in valores):
+        return None
+    return valores
+
+
+def _depois_do_cursor(ordenacao, valores):
+    """Monta (a > x) OR (a = x AND b > y) OR ... respeitando a direção de cada campo."""
+    condicao = Q()
+    iguais = {}
+    for campo, valor in zip(ordenacao, valores):
+        nome = campo.lstrip('-')
+        operador = 'lt' if campo.startswith('-') else 'gt'
+        condicao |= Q(**iguais, **{f'{nome}__{operador}': valor})
+        iguais[nome] = valor
+    return condicao
+
+
+def paginar_keyset(queryset, ordenacao, cursor=None, por_pagina=None):
+    """
+    Retorna a página de `queryset` que começa depois de `cursor`, na ordem
+    `ordenacao` (ex.: ('-data_abertura', '-id')). Cursor inválido volta à primeira página.
+    """
+    por_pagina = por_pagina or settings.PAGINATION_PER_PAGE
+    queryset = queryset.order_by(*ordenacao)
+    valores = decodificar_cursor(cursor, queryset.model, ordenacao) if cursor else None
+    if valores is not None:
+        queryset = queryset.filter(_depois_do_cursor(ordenacao, valores))
+
+    # Uma linha a mais só para saber se existe próxima página
+    itens = list(queryset[:por_pagina + 1])
+    tem_mais = len(itens) > por_pagina
+    itens = itens[:por_pagina]
+
+    proximo_cursor = ''
+    if tem_mais:
+        ultimo = itens[-1]
+        proximo_cursor = codificar_cursor([getattr(ultimo, campo.lstrip('-')) for campo in ordenacao])
+    return PaginaKeyset(itens=itens, proximo_cursor=proximo_cursor, tem_mais=tem_mais)
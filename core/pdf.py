@@ -0,0 +1,234 @@
+# Arquivo: core/pdf.py (Renderizadores WeasyPrint pré-aquecidos)
+
+# O custo de um PDF pequeno está quase todo na preparação: carregar o fontconfig/pango,
+# interpretar o CSS e decodificar o logotipo. Aqui essa preparação é feita uma única
+# vez por processo renderizador, que depois atende vários pedidos seguidos.
+#
+# Os renderizadores são iniciados com 'spawn' (não herdam conexões de banco nem
+# threads do servidor) e recebem apenas o HTML já montado, então não precisam do Django.
+import io, os, atexit, queue, tempfile, threading
+import multiprocessing as mp
+from pathlib import Path
+from django.conf import settings
+
+from weasyprint import HTML, CSS
+from weasyprint.text.fonts import FontConfiguration
+from pypdf import PdfReader, PdfWriter
+
+from .metricas import cronometrar
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PASTA_ESTILOS = Path(__file__).resolve().parent / 'static' / 'core' / 'css' / 'pdf'
+
+ESTILOS_PDF = {
+    'andamento': 'andamento.css',
+    'relatorio': 'relatorio.css',
+    'fases': 'fases.css',
+    'numeracao_paisagem': 'numeracao_paisagem.css',
+    'numeracao_retrato': 'numeracao_retrato.css',
+}
+
+
+def _carregar_estilos():
+    return {nome: (PASTA_ESTILOS / arquivo).read_text(encoding='utf-8') for nome, arquivo in ESTILOS_PDF.items()}
+
+
+class _Motor:
+    """Fontes, folhas de estilo já interpretadas e cache de imagens, reaproveitados entre PDFs."""
+
+    def __init__(self, estilos):
+        self.fontes = FontConfiguration()
+        self.folhas = {nome: CSS(string=texto, font_config=self.fontes) for nome, texto in estilos.items()}
+        self.imagens = {}  # logotipos dos órgãos ficam decodificados aqui
+
+    def aquecer(self):
+        # A primeira renderização carrega as bibliotecas de texto e resolve as fontes
+        HTML(string='<p>Syslicit</p>').write_pdf(font_config=self.fontes)
+
+    def renderizar(self, html_string, estilo):
+        return HTML(string=html_string).write_pdf(
+            stylesheets=[self.folhas[estilo]], font_config=self.fontes, cache=self.imagens
+        )
+
+
+def _memoria_kb():
+    # ru_maxrss é o pico de memória residente do processo (KB no Linux)
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss if resource else 0
+
+
+def _trabalhar(conexao, estilos, memoria_maxima_kb, tarefas_maximas):
+    """Laço do processo renderizador: recebe (estilo, html) e responde (situação, conteúdo, reciclar)."""
+    motor = _Motor(estilos)
+    motor.aquecer()
+    atendidas = 0
+    while True:
+        try:
+            pedido = conexao.recv()
+        except EOFError:
+            break
+        if pedido is None:
+            break
+        estilo, html_string = pedido
+        try:
+            resposta = ('ok', motor.renderizar(html_string, estilo))
+        except Exception as e:
+            resposta = ('erro', f'{type(e).__name__}: {e}')
+        atendidas += 1
+        # Avisa o processo principal e sai, em vez de ser morto no meio de um pedido
+        reciclar = atendidas >= tarefas_maximas or (memoria_maxima_kb and _memoria_kb() > memoria_maxima_kb)
+        conexao.send((*resposta, reciclar))
+        if reciclar:
+            break
+    conexao.close()
+
+
+class _Renderizador:
+    """Um processo renderizador e a ponta do Pipe usada para conversar com ele."""
+
+    def __init__(self):
+        contexto = mp.get_context('spawn')
+        self.conexao, conexao_filho = contexto.Pipe()
+        self.processo = contexto.Process(
+            target=_trabalhar,
+            args=(conexao_filho, _carregar_estilos(), settings.PDF_MEMORIA_MAXIMA_MB * 1024, settings.PDF_TAREFAS_POR_RENDERIZADOR),
+            daemon=True
+        )
+        self.processo.start()
+        conexao_filho.close()
+
+    def renderizar(self, html_string, estilo, tempo_maximo):
+        self.conexao.send((estilo, html_string))
+        if not self.conexao.poll(tempo_maximo):
+            raise TimeoutError(f'A geração do PDF excedeu {tempo_maximo} segundos.')
+        return self.conexao.recv()
+
+    def encerrar(self, espera=0):
+        self.processo.join(timeout=espera)
+        if self.processo.is_alive():
+            self.processo.terminate()
+        self.processo.join(timeout=5)
+        self.conexao.close()
+
+
+# ==============================================================================
+# POOL
+# ==============================================================================
+_ociosos = queue.Queue()
+_renderizadores = []
+_trava = threading.Lock()
+_dono = os.getpid()  # Processo que criou o pool: um filho de fork não pode usá-lo
+_motor_local = None
+_trava_local = threading.Lock()  # O motor local não pode ser usado por duas threads ao mesmo tempo
+
+
+def iniciar():
+    """
+    Sobe os renderizadores (chamado no primeiro PDF ou antecipadamente pelo worker de
+    tarefas e por config/wsgi.py).
+    """
+    global _ociosos, _dono
+    with _trava:
+        if _dono != os.getpid():
+            # Pool herdado por fork (ex.: gunicorn --preload): os Pipes pertencem ao pai
+            _renderizadores.clear()
+            _ociosos, _dono = queue.Queue(), os.getpid()
+        if _renderizadores or settings.PDF_RENDERIZADORES <= 0:
+            return
+        for _ in range(settings.PDF_RENDERIZADORES):
+            renderizador = _Renderizador()
+            _renderizadores.append(renderizador)
+            _ociosos.put(renderizador)
+        atexit.register(encerrar)
+
+
+def encerrar():
+    with _trava:
+        for renderizador in _renderizadores:
+            try:
+                renderizador.conexao.send(None)
+            except (BrokenPipeError, OSError):
+                pass
+            renderizador.encerrar(espera=2)
+        _renderizadores.clear()
+        while not _ociosos.empty():
+            _ociosos.get_nowait()
+
+
+def _substituir(renderizador):
+    renderizador.encerrar()
+    novo = _Renderizador()
+    with _trava:
+        _renderizadores[_renderizadores.index(renderizador)] = novo
+    return novo
+
+
+def _renderizar_local(html_string, estilo):
+    global _motor_local
+    # Threads do gunicorn e as partes dos relatórios entram aqui uma de cada vez
+    with _trava_local:
+        if _motor_local is None:
+            _motor_local = _Motor(_carregar_estilos())
+        return _motor_local.renderizar(html_string, estilo)
+
+
+def renderizar_pdf(html_string, estilo):
+    """Converte o HTML em PDF com a folha de estilo `estilo` (chave de ESTILOS_PDF)."""
+    with cronometrar('sislicit_pdf_renderizacao_segundos', estilo=estilo):
+        return _renderizar(html_string, estilo)
+
+
+def _renderizar(html_string, estilo):
+    if settings.PDF_RENDERIZADORES <= 0:
+        return _renderizar_local(html_string, estilo)
+
+    iniciar()
+    renderizador = _ociosos.get()
+    try:
+        situacao, conteudo, reciclar = renderizador.renderizar(html_string, estilo, settings.PDF_TEMPO_MAXIMO)
+    except (TimeoutError, EOFError, BrokenPipeError, OSError):
+        # Renderizador travado ou morto: troca por um novo e repassa o erro
+        _ociosos.put(_substituir(renderizador))
+        raise
+    _ociosos.put(_substituir(renderizador) if reciclar else renderizador)
+
+    if situacao != 'ok':
+        raise RuntimeError(conteudo)
+    return conteudo
+
+
+# ==============================================================================
+# JUNÇÃO DE PARTES
+# ==============================================================================
+def juntar_pdfs(partes, estilo_numeracao=None):
+    """
+    Concatena, na ordem, os PDFs gerados em partes (arquivos abertos no início) e
+    devolve um arquivo temporário com o resultado, posicionado no início. Cada parte
+    é fechada assim que entra no documento, e `partes` pode ser um gerador: não é
+    preciso ter todas prontas (nem em memória) para começar. Com `estilo_numeracao`,
+    carimba "Página X de N" em todas as páginas, contínuo entre as partes: como cada
+    parte foi renderizada isoladamente, a numeração vem de um PDF à parte, só com os
+    rodapés, sobreposto página a página.
+    """
+    escritor = PdfWriter()
+    for parte in partes:
+        with parte:
+            escritor.append(PdfReader(parte))
+
+    if estilo_numeracao:
+        paginas = '<section></section>' * len(escritor.pages)
+        numeracao = PdfReader(io.BytesIO(renderizar_pdf(paginas, estilo_numeracao)))
+        for pagina, rodape in zip(escritor.pages, numeracao.pages):
+            pagina.merge_page(rodape)
+
+    saida = tempfile.TemporaryFile(suffix='.pdf')
+    try:
+        escritor.write(saida)
+    except BaseException:
+        saida.close()
+        raise
+    saida.seek(0)
+    return saida
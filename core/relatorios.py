@@ -0,0 +1,320 @@
+# Arquivo: core/relatorios.py (Relatórios: filtros, PDF, CSV e Excel)
+
+import csv, tempfile
+from datetime import date
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connection
+from django.db.models import Max, Case, When, Count, Q
+from django.utils import timezone
+from django.template.loader import render_to_string
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+
+from .pdf import renderizar_pdf, juntar_pdfs
+from .models import Processo, HistoricoProcesso, BIT_ETAPA
+from .forms import FiltroProcessosForm
+
+# Rótulos das choices, para as consultas com values() que não trazem get_*_display
+ROTULOS_STATUS = dict(Processo.STATUS_CHOICES)
+ROTULOS_MODALIDADE = dict(Processo.MODALIDADE_CHOICES)
+
+
+# ==============================================================================
+# ANDAMENTO DO PROCESSO
+# ==============================================================================
+def etapas_por_fase(processo):
+    """Retorna as listas (fase interna, fase externa) com a data de conclusão de cada etapa."""
+    # As datas só existem no histórico; sem etapas concluídas nem consulta
+    etapas_concluidas_dict = dict(
+        HistoricoProcesso.objects.filter(processo=processo).values_list('etapa', 'data_conclusao')
+    ) if processo.etapas_concluidas else {}
+    todas_etapas = HistoricoProcesso.ETAPAS_CHOICES
+    fase_interna_etapas = [{'key': key, 'name': name, 'date': etapas_concluidas_dict.get(key)} for key, name in todas_etapas[:12]]
+    fase_externa_etapas = [{'key': key, 'name': name, 'date': etapas_concluidas_dict.get(key)} for key, name in todas_etapas[12:]]
+    return fase_interna_etapas, fase_externa_etapas
+
+
+def nome_arquivo_andamento(processo):
+    return f'andamento_processo_{processo.numero_processo}.pdf'
+
+
+def _logo_uri(orgao):
+    """URI file:// do logotipo do órgão; o renderizador mantém a imagem decodificada em cache."""
+    if not orgao.logo:
+        return None
+    caminho = Path(orgao.logo.path)
+    return caminho.as_uri() if caminho.exists() else None
+
+
+def renderizar_andamento_pdf(processo):
+    """Gera o PDF de andamento do processo e devolve os bytes."""
+    fase_interna_etapas, fase_externa_etapas = etapas_por_fase(processo)
+    context = {
+        'processo': processo,
+        'logo_uri': _logo_uri(processo.orgao_responsavel),
+        'fase_interna_etapas': fase_interna_etapas,
+        'fase_externa_etapas': fase_externa_etapas,
+        'data_hoje': date.today().strftime("%d/%m/%Y")
+    }
+    html_string = render_to_string('core/processo_andamento_pdf.html', context)
+    return renderizar_pdf(html_string, 'andamento')
+
+
+# ==============================================================================
+# RELATÓRIO DE PROCESSOS
+# ==============================================================================
+def nome_arquivo_relatorio():
+    return f'relatorio_processos_{date.today().strftime("%Y-%m-%d")}.pdf'
+
+
+def _renderizar_em_partes(pks, renderizar_parte, estilo_numeracao, progresso=None):
+    """
+    Divide os pks em lotes de REPORT_CHUNK_SIZE, renderiza cada lote com
+    `renderizar_parte(pks_do_lote, indice, total_de_lotes)` (em paralelo, um lote
+    por renderizador) e concatena as partes com numeração de páginas contínua.
+    Assim a memória usada pelo WeasyPrint depende do tamanho do lote, não do
+    total de registros. `progresso`, se informado, recebe a fração concluída.
+    Devolve o arquivo temporário de juntar_pdfs.
+    """
+    tamanho = settings.REPORT_CHUNK_SIZE
+    lotes = [pks[i:i + tamanho] for i in range(0, len(pks), tamanho)] or [[]]
+
+    def executar(indice):
+        # Cada thread abre a própria conexão com o banco; fecha ao terminar. A parte
+        # vai para um arquivo temporário, não fica em memória esperando a sua vez
+        try:
+            arquivo = tempfile.TemporaryFile(suffix='.pdf')
+            arquivo.write(renderizar_parte(lotes[indice], indice, len(lotes)))
+            arquivo.seek(0)
+            return arquivo
+        finally:
+            connection.close()
+
+    def partes_em_ordem(futuros):
+        # Entrega as partes na ordem do relatório, à medida que ficam prontas
+        for concluidos, futuro in enumerate(futuros, start=1):
+            yield futuro.result()
+            if progresso:
+                progresso(concluidos / len(lotes))
+
+    # Com o motor local (PDF_RENDERIZADORES = 0) as partes passam uma a uma pela trava de core/pdf.py
+    with ThreadPoolExecutor(max_workers=max(1, settings.PDF_RENDERIZADORES)) as executor:
+        futuros = [executor.submit(executar, indice) for indice in range(len(lotes))]
+        try:
+            return juntar_pdfs(partes_em_ordem(futuros), estilo_numeracao=estilo_numeracao)
+        finally:
+            # Se a junção falhar no meio, fecha as partes que não chegaram a entrar
+            for futuro in futuros:
+                if not futuro.cancel() and futuro.exception() is None:
+                    futuro.result().close()
+
+
+def renderizar_relatorio_processos_pdf(params, progresso=None):
+    """Gera o PDF do relatório de processos para os filtros informados."""
+    pks = list(
+        FiltroProcessosForm(params).filtrar(Processo.objects.order_by('-data_abertura', '-pk'))
+        .values_list('pk', flat=True)[:settings.REPORT_MAX_RECORDS]
+    )
+    data_hoje = date.today().strftime("%d/%m/%Y")
+
+    def renderizar_parte(lote, indice, total):
+        resultados = Processo.objects.filter(pk__in=lote).select_related(
+            'orgao_responsavel', 'secretaria_responsavel'
+        ).order_by('-data_abertura', '-pk')
+        context = {
+            'resultados': resultados,
+            'data_hoje': data_hoje,
+            'filtros_aplicados': params,
+            'primeira_parte': indice == 0,
+        }
+        return renderizar_pdf(render_to_string('core/relatorio_pdf_template.html', context), 'relatorio')
+
+    return _renderizar_em_partes(pks, renderizar_parte, 'numeracao_paisagem', progresso)
+
+
+# ==============================================================================
+# RELATÓRIO DE FASES
+# ==============================================================================
+# Agrupamento dos status nas quatro situações do relatório (classe CSS status-<grupo>)
+GRUPOS_STATUS = {
+    'FASE_INTERNA': 'planejamento',
+    'PUBLICADO': 'andamento',
+    'AGUARDANDO_PROPOSTAS': 'andamento',
+    'EM_ANALISE': 'andamento',
+    'HOMOLOGADO': 'concluida',
+    'CANCELADO': 'cancelada',
+}
+
+
+def nome_arquivo_fases_pdf():
+    return f'relatorio_fases_{date.today().strftime("%Y-%m-%d")}.pdf'
+
+
+def estatisticas_fases(resultados):
+    """Totais por situação em uma única consulta (COUNT ... FILTER / CASE)."""
+    contagens = {'total': Count('pk')}
+    for grupo in sorted(set(GRUPOS_STATUS.values())):
+        status = [chave for chave, valor in GRUPOS_STATUS.items() if valor == grupo]
+        contagens[grupo] = Count('pk', filter=Q(status__in=status))
+    return resultados.aggregate(**contagens)
+
+
+def renderizar_relatorio_fases_pdf(params, progresso=None):
+    """Gera o PDF do relatório de fases para os filtros da tela de relatórios."""
+    resultados = FiltroProcessosForm(params).filtrar(Processo.objects.all())
+    stats = estatisticas_fases(resultados)
+    pks = list(resultados.order_by('-data_abertura', '-pk').values_list('pk', flat=True)[:settings.REPORT_MAX_RECORDS])
+    data_geracao = timezone.localtime()
+    filtro_status = ROTULOS_STATUS.get(params.get('status'), '')
+
+    def renderizar_parte(lote, indice, total):
+        # Só as colunas exibidas, em vez da linha inteira de Processo (que inclui os textos do ETP)
+        linhas = Processo.objects.filter(pk__in=lote).order_by('-data_abertura', '-pk').values(
+            'numero_processo', 'objeto', 'modalidade', 'valor_estimado', 'data_abertura',
+            'responsavel_demanda__nome', 'status'
+        )
+        fases = [{
+            'numero': linha['numero_processo'],
+            'objeto': linha['objeto'],
+            'get_modalidade_display': ROTULOS_MODALIDADE.get(linha['modalidade'], linha['modalidade']),
+            'valor_estimado': linha['valor_estimado'] or 0,
+            'data_abertura': linha['data_abertura'],
+            'responsavel': linha['responsavel_demanda__nome'],
+            'status': GRUPOS_STATUS.get(linha['status'], 'planejamento'),
+            'get_status_display': ROTULOS_STATUS.get(linha['status'], linha['status']),
+        } for linha in linhas]
+        context = {
+            'fases': fases,
+            'total_fases': stats['total'],
+            'stats': stats,
+            'filtro_status': filtro_status,
+            'data_geracao': data_geracao,
+            'primeira_parte': indice == 0,
+            'ultima_parte': indice == total - 1,
+        }
+        return renderizar_pdf(render_to_string('core/relatorio_fases_pdf.html', context), 'fases')
+
+    return _renderizar_em_partes(pks, renderizar_parte, 'numeracao_retrato', progresso)
+
+
+# ==============================================================================
+# EXPORTAÇÃO CSV
+# ==============================================================================
+CSV_TAMANHO_LOTE = 2000  # Linhas lidas do banco por vez
+
+
+class _Eco:
+    """Destino do csv.writer que só devolve a linha escrita, para o StreamingHttpResponse."""
+
+    def write(self, valor):
+        return valor
+
+
+def _andamento_csv(mascara):
+    if not mascara:
+        return "Nenhuma etapa iniciada"
+    return " | ".join(nome for etapa, nome in HistoricoProcesso.ETAPAS_CHOICES if mascara & BIT_ETAPA[etapa])
+
+
+def linhas_csv_processos(params):
+    """
+    Gera as linhas do CSV de processos já formatadas. As etapas concluídas vêm da
+    máscara desnormalizada de Processo (sem join com o histórico) e o queryset é lido
+    em lotes, então a memória não cresce com o número de processos exportados.
+    """
+    resultados = Processo.objects.order_by('-data_abertura', '-pk')
+    resultados = FiltroProcessosForm(params).filtrar(resultados).values(
+        'pk', 'numero_processo', 'objeto', 'orgao_responsavel__nome', 'status', 'data_abertura', 'valor_estimado',
+        'etapas_mascara'
+    )
+
+    writer = csv.writer(_Eco(), delimiter=';')
+    yield '\ufeff' + writer.writerow(['Nº Processo', 'Objeto', 'Órgão', 'Status', 'Data de Abertura', 'Valor Estimado', 'Etapas Concluídas (Andamento)'])
+    for processo in resultados.iterator(chunk_size=CSV_TAMANHO_LOTE):
+        yield writer.writerow([
+            processo['numero_processo'],
+            processo['objeto'],
+            processo['orgao_responsavel__nome'],
+            ROTULOS_STATUS.get(processo['status'], processo['status']),
+            processo['data_abertura'].strftime("%d/%m/%Y"),
+            str(processo['valor_estimado']).replace('.', ',') if processo['valor_estimado'] else '0,00',
+            _andamento_csv(processo['etapas_mascara'])
+        ])
+
+
+# ==============================================================================
+# EXCEL DE FASES (uma coluna por etapa)
+# ==============================================================================
+EXCEL_TAMANHO_LOTE = 2000
+
+
+def nome_arquivo_fases_excel():
+    return f'relatorio_fases_{date.today().strftime("%Y-%m-%d")}.xlsx'
+
+
+def _data_local(valor):
+    # O Excel não guarda fuso: grava a data/hora já convertida para TIME_ZONE
+    return timezone.localtime(valor).replace(tzinfo=None) if timezone.is_aware(valor) else valor
+
+
+def gravar_excel_fases(params, destino):
+    """
+    Grava em `destino` (caminho ou arquivo) o XLSX com um processo por linha e a
+    data de conclusão de cada etapa em colunas. O banco já devolve a tabela
+    "pivotada" (um MAX(CASE ...) por etapa) e o openpyxl em modo write-only
+    descarrega as linhas em disco à medida que são adicionadas.
+    """
+    colunas_etapas = {
+        f'etapa_{ordem}': Max(Case(When(historico__etapa=etapa, then='historico__data_conclusao')))
+        for ordem, (etapa, _) in enumerate(HistoricoProcesso.ETAPAS_CHOICES)
+    }
+    resultados = Processo.objects.order_by('-data_abertura', '-pk')
+    resultados = FiltroProcessosForm(params).filtrar(resultados).values(
+        'pk', 'numero_processo', 'objeto', 'orgao_responsavel__nome', 'secretaria_responsavel__nome',
+        'modalidade', 'status', 'data_abertura', 'valor_estimado'
+    ).annotate(**colunas_etapas)
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet('Fases')
+    ws.freeze_panes = 'B2'
+    negrito = Font(bold=True)
+
+    cabecalho = ['Nº Processo', 'Objeto', 'Órgão', 'Secretaria', 'Modalidade', 'Status', 'Data de Abertura', 'Valor Estimado']
+    cabecalho += [nome for _, nome in HistoricoProcesso.ETAPAS_CHOICES]
+    linha = []
+    for titulo in cabecalho:
+        celula = WriteOnlyCell(ws, value=titulo)
+        celula.font = negrito
+        linha.append(celula)
+    ws.append(linha)
+
+    for processo in resultados.iterator(chunk_size=EXCEL_TAMANHO_LOTE):
+        abertura = WriteOnlyCell(ws, value=processo['data_abertura'])
+        abertura.number_format = 'DD/MM/YYYY'
+        valor = WriteOnlyCell(ws, value=processo['valor_estimado'])
+        valor.number_format = '#,##0.00'
+        linha = [
+            processo['numero_processo'],
+            processo['objeto'],
+            processo['orgao_responsavel__nome'],
+            processo['secretaria_responsavel__nome'],
+            ROTULOS_MODALIDADE.get(processo['modalidade'], processo['modalidade']),
+            ROTULOS_STATUS.get(processo['status'], processo['status']),
+            abertura,
+            valor,
+        ]
+        for coluna in colunas_etapas:
+            conclusao = processo[coluna]
+            if conclusao is None:
+                linha.append(None)
+                continue
+            celula = WriteOnlyCell(ws, value=_data_local(conclusao))
+            celula.number_format = 'DD/MM/YYYY HH:MM'
+            linha.append(celula)
+        ws.append(linha)
+
+    wb.save(destino)
@@ -0,0 +1,166 @@
+# Arquivo: core/resumo.py (Resumo agregado do dashboard)
+
+# ResumoDashboard guarda, para cada (órgão, status, modalidade, mês de abertura), a
+# quantidade de processos e a soma do valor estimado. Os signals de Processo aplicam
+# a diferença de cada save/delete (-1 na chave antiga, +1 na nova) com expressões F,
+# sem reagregar nada. Gravações que não disparam signals (bulk_create,
+# queryset.update nos campos do resumo) devem chamar `mover_em_lote` com os estados
+# anterior e atual dos processos ou rodar `reconstruir_resumo_dashboard`.
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum, Count
+from django.db.models.functions import TruncMonth, Coalesce
+
+from .models import Processo, ResumoDashboard
+from .cache import invalidar
+
+# Campos de Processo que definem a linha do resumo ou o valor somado nela
+CAMPOS_RESUMO = frozenset(['orgao_responsavel', 'orgao_responsavel_id', 'status', 'modalidade', 'data_abertura', 'valor_estimado'])
+
+
+def chave_resumo(orgao_id, status, modalidade, data_abertura):
+    return (orgao_id, status, modalidade, data_abertura.replace(day=1))
+
+
+def estado_resumo(processo):
+    """(chave, valor) com que o processo entra no resumo."""
+    chave = chave_resumo(processo.orgao_responsavel_id, processo.status, processo.modalidade,
+                         processo.data_abertura or date.today())
+    return chave, processo.valor_estimado or Decimal('0')
+
+
+def atualizar_resumo(chave, quantidade, valor):
+    """Soma `quantidade` e `valor` à linha `chave` do resumo, criando-a se preciso."""
+    orgao_id, status, modalidade, mes = chave
+    linha = ResumoDashboard.objects.filter(orgao_id=orgao_id, status=status, modalidade=modalidade, mes=mes)
+    with transaction.atomic():
+        if linha.update(quantidade=F('quantidade') + quantidade, valor_total=F('valor_total') + valor):
+            linha.filter(quantidade__lte=0).delete()
+            return
+        try:
+            with transaction.atomic():
+                ResumoDashboard.objects.create(orgao_id=orgao_id, status=status, modalidade=modalidade, mes=mes,
+                                               quantidade=quantidade, valor_total=valor)
+        except IntegrityError:
+            # Outra requisição criou a linha entre o UPDATE e o INSERT
+            linha.update(quantidade=F('quantidade') + quantidade, valor_total=F('valor_total') + valor)
+
+
+def mover_no_resumo(anterior, atual):
+    """Tira o processo do estado `anterior` e o coloca no `atual` ((chave, valor) ou None)."""
+    if anterior == atual:
+        return
+    if anterior and atual and anterior[0] == atual[0]:
+        atualizar_resumo(atual[0], 0, atual[1] - anterior[1])
+        return
+    if anterior:
+        atualizar_resumo(anterior[0], -1, -anterior[1])
+    if atual:
+        atualizar_resumo(atual[0], 1, atual[1])
+
+
+def mover_em_lote(mudancas):
+    """
+    mover_no_resumo para vários processos de uma vez: [(anterior, atual), ...]. As
+    diferenças são somadas por chave, então o custo é um UPDATE por linha do resumo
+    afetada, não por processo (usado por bulk_create e queryset.update).
+    """
+    deltas = defaultdict(lambda: [0, Decimal('0')])
+    for anterior, atual in mudancas:
+        if anterior == atual:
+            continue
+        if anterior:
+            deltas[anterior[0]][0] -= 1
+            deltas[anterior[0]][1] -= anterior[1]
+        if atual:
+            deltas[atual[0]][0] += 1
+            deltas[atual[0]][1] += atual[1]
+    for chave, (quantidade, valor) in deltas.items():
+        if quantidade or valor:
+            atualizar_resumo(chave, quantidade, valor)
+
+
+def _agregado_processos():
+    return (Processo.objects.order_by()
+            .values('orgao_responsavel', 'status', 'modalidade', mes=TruncMonth('data_abertura'))
+            .annotate(quantidade=Count('pk'), valor_total=Coalesce(Sum('valor_estimado'), Decimal('0'))))
+
+
+def reconstruir_resumo():
+    """Refaz o resumo inteiro a partir dos processos. Retorna o número de linhas geradas."""
+    linhas = [
+        ResumoDashboard(orgao_id=item['orgao_responsavel'], status=item['status'], modalidade=item['modalidade'],
+                        mes=item['mes'], quantidade=item['quantidade'], valor_total=item['valor_total'])
+        for item in _agregado_processos()
+    ]
+    with transaction.atomic():
+        ResumoDashboard.objects.all().delete()
+        ResumoDashboard.objects.bulk_create(linhas, batch_size=500)
+        invalidar(Processo)  # O dashboard em cache foi calculado com o resumo anterior
+    return len(linhas)
+
+
+def divergencias():
+    """Chaves cujo resumo gravado difere do calculado a partir dos processos."""
+    calculado = {
+        (item['orgao_responsavel'], item['status'], item['modalidade'], item['mes']): (item['quantidade'], item['valor_total'])
+        for item in _agregado_processos()
+    }
+    gravado = {
+        (linha.orgao_id, linha.status, linha.modalidade, linha.mes): (linha.quantidade, linha.valor_total)
+        for linha in ResumoDashboard.objects.all()
+    }
+    return sorted((chave for chave in calculado.keys() | gravado.keys() if calculado.get(chave) != gravado.get(chave)),
+                  key=str)
+
+
+# ==============================================================================
+# LEITURA PARA O DASHBOARD
+# ==============================================================================
+STATUS_ATIVOS = ('FASE_INTERNA', 'PUBLICADO', 'AGUARDANDO_PROPOSTAS', 'EM_ANALISE')
+MESES_LINHA_DO_TEMPO = 12
+ORGAOS_NO_GRAFICO = 5
+
+
+def _meses_ate(hoje, quantidade):
+    ano, mes = hoje.year, hoje.month
+    meses = []
+    for _ in range(quantidade):
+        meses.append(date(ano, mes, 1))
+        ano, mes = (ano, mes - 1) if mes > 1 else (ano - 1, 12)
+    return meses[::-1]
+
+
+def _grafico(totais, rotulos):
+    return {'labels': [rotulos.get(chave, chave) for chave in totais], 'dados': list(totais.values())}
+
+
+def dados_dashboard(hoje=None):
+    """Totais e séries dos gráficos do dashboard, calculados a partir das linhas do resumo (uma consulta)."""
+    linhas = ResumoDashboard.objects.values_list('orgao__nome', 'status', 'modalidade', 'mes', 'quantidade')
+    por_status = dict.fromkeys(dict(Processo.STATUS_CHOICES), 0)
+    por_modalidade = dict.fromkeys(dict(Processo.MODALIDADE_CHOICES), 0)
+    por_mes = dict.fromkeys(_meses_ate(hoje or date.today(), MESES_LINHA_DO_TEMPO), 0)
+    por_orgao = {}
+    for orgao, status, modalidade, mes, quantidade in linhas:
+        por_status[status] = por_status.get(status, 0) + quantidade
+        por_modalidade[modalidade] = por_modalidade.get(modalidade, 0) + quantidade
+        por_orgao[orgao] = por_orgao.get(orgao, 0) + quantidade
+        if mes in por_mes:
+            por_mes[mes] += quantidade
+
+    top_orgaos = dict(sorted(por_orgao.items(), key=lambda item: -item[1])[:ORGAOS_NO_GRAFICO])
+    return {
+        'total_processos': sum(por_status.values()),
+        'processos_ativos': sum(por_status[status] for status in STATUS_ATIVOS),
+        'processos_homologados': por_status['HOMOLOGADO'],
+        'graficos': {
+            'status': _grafico({chave: total for chave, total in por_status.items() if total}, dict(Processo.STATUS_CHOICES)),
+            'modalidade': _grafico({chave: total for chave, total in por_modalidade.items() if total}, dict(Processo.MODALIDADE_CHOICES)),
+            'linha_do_tempo': _grafico(por_mes, {mes: f'{mes:%m/%Y}' for mes in por_mes}),
+            'orgaos': _grafico(top_orgaos, {}),
+        },
+    }
@@ -0,0 +1,70 @@
+# Arquivo: core/signals.py (Sinais dos modelos)
+
+# Registrados em CoreConfig.ready(). Lembrete: bulk_create e queryset.update()
+# não disparam estes sinais; quem usa esses caminhos atualiza o que for preciso.
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Processo, ProcessoETP
+from .busca import CAMPOS_PROCESSO_BUSCA, indexar_processos, remover_processos
+from .resumo import CAMPOS_RESUMO, estado_resumo, mover_no_resumo
+from .cache import MODELOS_VERSIONADOS, invalidar
+
+
+# ==============================================================================
+# ÍNDICE DE BUSCA (core/busca.py)
+# ==============================================================================
+@receiver(post_save, sender=Processo)
+def indexar_processo(sender, instance, update_fields=None, **kwargs):
+    # save(update_fields=[...]) que não toca nos campos buscáveis não mexe no índice
+    if update_fields and not CAMPOS_PROCESSO_BUSCA.intersection(update_fields):
+        return
+    indexar_processos([instance.pk])
+
+
+@receiver(post_delete, sender=Processo)
+def remover_processo_do_indice(sender, instance, **kwargs):
+    remover_processos([instance.pk])
+
+
+@receiver(post_save, sender=ProcessoETP)
+@receiver(post_delete, sender=ProcessoETP)
+def indexar_etp(sender, instance, **kwargs):
+    indexar_processos([instance.processo_id])
+
+
+# ==============================================================================
+# RESUMO DO DASHBOARD (core/resumo.py)
+# ==============================================================================
+@receiver(pre_save, sender=Processo)
+def guardar_estado_resumo(sender, instance, update_fields=None, **kwargs):
+    # Estado gravado antes deste save, para descontar da linha antiga do resumo
+    if instance._state.adding or (update_fields and not CAMPOS_RESUMO.intersection(update_fields)):
+        return
+    anterior = Processo.objects.filter(pk=instance.pk).only(*CAMPOS_RESUMO - {'orgao_responsavel_id'}).first()
+    instance._resumo_anterior = estado_resumo(anterior) if anterior else None
+
+
+@receiver(post_save, sender=Processo)
+def atualizar_resumo_processo(sender, instance, created, **kwargs):
+    if created:
+        mover_no_resumo(None, estado_resumo(instance))
+    elif '_resumo_anterior' in instance.__dict__:
+        mover_no_resumo(instance.__dict__.pop('_resumo_anterior'), estado_resumo(instance))
+
+
+@receiver(post_delete, sender=Processo)
+def remover_processo_do_resumo(sender, instance, **kwargs):
+    mover_no_resumo(estado_resumo(instance), None)
+
+
+# ==============================================================================
+# VERSÕES DO CACHE (core/cache.py)
+# ==============================================================================
+def invalidar_cache_do_modelo(sender, **kwargs):
+    invalidar(sender)
+
+
+for _modelo in MODELOS_VERSIONADOS:
+    post_save.connect(invalidar_cache_do_modelo, sender=_modelo, dispatch_uid=f'invalidar_cache_{_modelo._meta.label_lower}')
+    post_delete.connect(invalidar_cache_do_modelo, sender=_modelo, dispatch_uid=f'invalidar_cache_{_modelo._meta.label_lower}')
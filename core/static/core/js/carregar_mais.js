@@ -0,0 +1,43 @@
+// Arquivo: core/static/core/js/carregar_mais.js
+
+// Botões "Carregar mais" das listagens (paginação por cursor, ver core/paginacao.py).
+// O clique busca só as próximas linhas (?fragmento=1) e as acrescenta à tabela;
+// o próximo cursor vem no cabeçalho X-Proximo-Cursor. Sem JavaScript o link abre a próxima página.
+document.addEventListener('DOMContentLoaded', function() {
+
+    document.addEventListener('click', function(event) {
+        const botao = event.target.closest('[data-carregar-mais]');
+        if (!botao || botao.classList.contains('disabled')) {
+            return;
+        }
+        event.preventDefault();
+
+        const alvo = document.querySelector(botao.dataset.carregarMais);
+        const textoOriginal = botao.innerHTML;
+        botao.classList.add('disabled');
+        botao.innerHTML = 'Carregando...';
+
+        const url = new URL(botao.href, window.location.href);
+        url.searchParams.set('fragmento', '1');
+
+        fetch(url)
+            .then(response => {
+                if (!response.ok) { throw new Error('Falha ao carregar'); }
+                const proximoCursor = response.headers.get('X-Proximo-Cursor');
+                return response.text().then(html => ({ html, proximoCursor }));
+            })
+            .then(({ html, proximoCursor }) => {
+                alvo.insertAdjacentHTML('beforeend', html);
+                if (proximoCursor) {
+                    url.searchParams.delete('fragmento');
+                    url.searchParams.set('cursor', proximoCursor);
+                    botao.href = url.toString();
+                    botao.innerHTML = textoOriginal;
+                    botao.classList.remove('disabled');
+                } else {
+                    botao.parentElement.remove();
+                }
+            })
+            .catch(() => { window.location.href = botao.href; });
+    });
+});
@@ -0,0 +1,88 @@
+// Arquivo: core/static/core/js/tarefas.js
+
+// Links com o atributo data-tarefa-url são gerados em segundo plano: o clique
+// enfileira a tarefa, acompanha o progresso e só baixa o arquivo quando estiver pronto.
+// Se algo falhar, o navegador segue o href normal (geração direta).
+document.addEventListener('DOMContentLoaded', function() {
+
+    function getCookie(name) {
+        let cookieValue = null;
+        if (document.cookie && document.cookie !== '') {
+            const cookies = document.cookie.split(';');
+            for (let i = 0; i < cookies.length; i++) {
+                const cookie = cookies[i].trim();
+                if (cookie.substring(0, name.length + 1) === (name + '=')) {
+                    cookieValue = decodeURIComponent(cookie.substring(name.length + 1));
+                    break;
+                }
+            }
+        }
+        return cookieValue;
+    }
+
+    // Sem worker rodando a tarefa nunca sai da fila: depois destes limites o
+    // acompanhamento avisa o usuário e para de consultar o servidor.
+    const AVISO_FILA_MS = 30 * 1000;
+    const LIMITE_ACOMPANHAMENTO_MS = 10 * 60 * 1000;
+
+    function restaurarLink(link, textoOriginal) {
+        link.innerHTML = textoOriginal;
+        link.classList.remove('disabled');
+    }
+
+    function acompanharTarefa(statusUrl, link, textoOriginal, inicio) {
+        const decorrido = Date.now() - inicio;
+        if (decorrido > LIMITE_ACOMPANHAMENTO_MS) {
+            restaurarLink(link, textoOriginal);
+            alert('O arquivo ainda não ficou pronto. A geração continua em segundo plano; tente novamente em alguns minutos ou avise o suporte se o problema persistir.');
+            return;
+        }
+        const proxima = (espera) => setTimeout(() => acompanharTarefa(statusUrl, link, textoOriginal, inicio), espera);
+        fetch(statusUrl)
+            .then(response => response.json())
+            .then(data => {
+                if (data.status === 'CONCLUIDA') {
+                    restaurarLink(link, textoOriginal);
+                    window.location.href = data.download_url;
+                } else if (data.status === 'ERRO') {
+                    restaurarLink(link, textoOriginal);
+                    alert('Erro ao gerar o arquivo: ' + data.erro);
+                } else {
+                    if (data.status === 'PENDENTE') {
+                        link.innerHTML = decorrido > AVISO_FILA_MS ? 'Na fila (aguardando o processamento)...' : 'Na fila...';
+                    } else {
+                        link.innerHTML = 'Gerando... ' + data.progresso + '%';
+                    }
+                    proxima(1500);
+                }
+            })
+            .catch(() => proxima(3000));
+    }
+
+    document.addEventListener('click', function(event) {
+        const link = event.target.closest('[data-tarefa-url]');
+        if (!link || !link.dataset.tarefaUrl || link.classList.contains('disabled')) {
+            return;
+        }
+        event.preventDefault();
+
+        const textoOriginal = link.innerHTML;
+        link.classList.add('disabled');
+        link.innerHTML = 'Na fila...';
+
+        fetch(link.dataset.tarefaUrl, {
+            method: 'POST',
+            headers: { 'X-CSRFToken': getCookie('csrftoken') }
+        })
+            .then(response => {
+                if (!response.ok) { throw new Error('Falha ao enfileirar a tarefa'); }
+                return response.json();
+            })
+            .then(data => acompanharTarefa(data.status_url, link, textoOriginal, Date.now()))
+            .catch(() => {
+                link.innerHTML = textoOriginal;
+                link.classList.remove('disabled');
+                window.location.href = link.href;
+            });
+    });
+});
@@ -0,0 +1,114 @@
+# Arquivo: core/status.py (Máquina de estados do status do Processo)
+
+# O status acompanha as etapas concluídas (HistoricoProcesso, resumido em
+# etapas_mascara): a etapa mais adiantada de ETAPA_DO_STATUS define o status mínimo
+# do processo. A máquina só anda para frente na ordem de ORDEM_STATUS; um status
+# posto à mão mais adiante (ex.: EM_ANALISE) é mantido, e CANCELADO é final.
+#
+# Cada transição é um UPDATE de uma coluna condicionado ao status de origem
+# (WHERE status IN (...)): duas gravações simultâneas não se desfazem, e a que chega
+# depois não volta o status para trás nem tira o processo de CANCELADO.
+#
+# Processo.versao conta as gravações das telas de edição e as transições. O
+# formulário devolve a versão que exibiu e salvar_com_versao recusa a gravação se o
+# processo mudou desde então (concorrência otimista).
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.lookups import Exact
+
+from .models import Processo, BIT_ETAPA
+from .cache import invalidar
+from .resumo import CAMPOS_RESUMO, estado_resumo, mover_em_lote
+
+ORDEM_STATUS = ['FASE_INTERNA', 'PUBLICADO', 'AGUARDANDO_PROPOSTAS', 'EM_ANALISE', 'HOMOLOGADO']
+STATUS_FINAL = 'CANCELADO'
+
+# Etapa cuja conclusão leva o processo ao status, da mais adiantada para a menos
+ETAPA_DO_STATUS = [
+    ('HOMOLOGACAO', 'HOMOLOGADO'),
+    ('PUBLICACAO_AVISO', 'PUBLICADO'),
+]
+STATUS_POR_ETAPA = dict(ETAPA_DO_STATUS)
+
+MENSAGEM_CONFLITO = 'Este processo foi alterado por outra pessoa enquanto você editava. Recarregue a página e refaça as alterações.'
+MENSAGEM_VERSAO_INVALIDA = 'Não foi possível conferir a versão do processo exibida no formulário. Recarregue a página e refaça as alterações.'
+
+
+def status_de_origem(destino):
+    """Status a partir dos quais o processo pode avançar para `destino`."""
+    return ORDEM_STATUS[:ORDEM_STATUS.index(destino)]
+
+
+def status_minimo(mascara):
+    """Status que as etapas concluídas da máscara exigem (FASE_INTERNA se nenhuma)."""
+    for etapa, destino in ETAPA_DO_STATUS:
+        if mascara & BIT_ETAPA[etapa]:
+            return destino
+    return ORDEM_STATUS[0]
+
+
+def status_permitido(mascara, status):
+    """Se um processo com essas etapas concluídas pode ficar no status (edição manual)."""
+    return status == STATUS_FINAL or ORDEM_STATUS.index(status) >= ORDEM_STATUS.index(status_minimo(mascara))
+
+
+def _transicao(etapa, destino):
+    bit = BIT_ETAPA[etapa]
+    return Q(Exact(F('etapas_mascara').bitand(bit), bit), status__in=status_de_origem(destino))
+
+
+def pendentes(queryset):
+    """Processos cujo status está atrás do que as etapas concluídas indicam."""
+    condicao = Q()
+    for etapa, destino in ETAPA_DO_STATUS:
+        condicao |= _transicao(etapa, destino)
+    return queryset.filter(condicao)
+
+
+def aplicar_status(queryset):
+    """
+    Avança o status dos processos do queryset conforme as etapas concluídas: um UPDATE
+    condicional por status de destino, do mais adiantado para o menos. Como
+    queryset.update não dispara signals, resumo do dashboard e cache são atualizados
+    aqui. Retorna quantos processos mudaram de status.
+    """
+    campos = CAMPOS_RESUMO - {'orgao_responsavel_id'}
+    mudancas = []
+    with transaction.atomic():
+        for etapa, destino in ETAPA_DO_STATUS:
+            candidatos = queryset.filter(_transicao(etapa, destino))
+            # Nos bancos com SELECT FOR UPDATE, ninguém muda estes processos até o commit
+            anteriores = list(candidatos.select_for_update().only(*campos))
+            if not anteriores:
+                continue
+            candidatos.filter(pk__in=[processo.pk for processo in anteriores]).update(
+                status=destino, versao=F('versao') + 1,
+            )
+            for processo in anteriores:
+                anterior = estado_resumo(processo)
+                processo.status = destino
+                mudancas.append((anterior, estado_resumo(processo)))
+        if mudancas:
+            mover_em_lote(mudancas)
+            invalidar(Processo)
+    return len(mudancas)
+
+
+# ==============================================================================
+# CONCORRÊNCIA OTIMISTA NAS TELAS DE EDIÇÃO
+# ==============================================================================
+def salvar_com_versao(form, versao):
+    """
+    Salva o ModelForm de Processo se o processo ainda estiver na `versao` exibida no
+    formulário. A versão é reservada com um UPDATE condicional e só os campos do
+    formulário são gravados (progresso e status mudados por outras requisições ficam
+    como estão). Retorna False, sem gravar nada, se houve gravação concorrente.
+    """
+    with transaction.atomic():
+        reservada = Processo.objects.filter(pk=form.instance.pk, versao=versao).update(versao=F('versao') + 1)
+        if not reservada:
+            return False
+        processo = form.save(commit=False)
+        processo.versao = versao + 1
+        processo.save(update_fields=[*form._meta.fields, 'versao'])
+    return True
@@ -0,0 +1,178 @@
+# Arquivo: core/tarefas.py (Fila de geração de documentos e relatórios em segundo plano)
+
+import os, io, shutil, logging, threading, traceback
+from contextlib import contextmanager
+from datetime import timedelta
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Processo, TarefaGeracao
+from .documentos import carregar_processo, obter_documento
+from .relatorios import (
+    renderizar_andamento_pdf, renderizar_relatorio_processos_pdf,
+    nome_arquivo_andamento, nome_arquivo_relatorio
+)
+
+logger = logging.getLogger(__name__)
+
+
+# ==============================================================================
+# ENFILEIRAMENTO E RESERVA
+# ==============================================================================
+def enfileirar(tipo, usuario='', processo=None, parametros=None):
+    """Cria uma tarefa pendente; quem executa é o comando `processar_tarefas`."""
+    return TarefaGeracao.objects.create(
+        tipo=tipo,
+        processo=processo,
+        parametros=parametros or {},
+        solicitado_por=usuario
+    )
+
+
+def reservar_proxima():
+    """
+    Marca a tarefa pendente mais antiga como EXECUTANDO e a devolve. O UPDATE é
+    condicional ao status, então dois workers nunca pegam a mesma tarefa.
+    """
+    while True:
+        pk = TarefaGeracao.objects.filter(status='PENDENTE').order_by('data_criacao').values_list('pk', flat=True).first()
+        if pk is None:
+            return None
+        agora = timezone.now()
+        reservada = TarefaGeracao.objects.filter(pk=pk, status='PENDENTE').update(
+            status='EXECUTANDO', data_inicio=agora, ultimo_sinal=agora, progresso=0, tentativas=F('tentativas') + 1
+        )
+        if reservada:
+            return TarefaGeracao.objects.get(pk=pk)
+
+
+def reenfileirar_travadas():
+    """
+    Devolve à fila as tarefas EXECUTANDO cujo worker parou de dar sinal de vida (morto
+    por falta de memória, reiniciado...). Uma tarefa que derrubou o worker
+    TAREFAS_MAX_TENTATIVAS vezes fica com ERRO em vez de voltar à fila para sempre.
+    Tarefas longas com o worker vivo nunca são reenfileiradas: o sinal continua chegando.
+    """
+    limite = timezone.now() - timedelta(seconds=settings.TAREFAS_TEMPO_MAXIMO)
+    travadas = TarefaGeracao.objects.filter(
+        Q(ultimo_sinal__lt=limite) | Q(ultimo_sinal__isnull=True, data_inicio__lt=limite), status='EXECUTANDO'
+    )
+    esgotadas = travadas.filter(tentativas__gte=settings.TAREFAS_MAX_TENTATIVAS).update(
+        status='ERRO', data_conclusao=timezone.now(),
+        erro=f'O worker parou durante a execução {settings.TAREFAS_MAX_TENTATIVAS} vezes; tarefa abandonada.',
+    )
+    if esgotadas:
+        logger.error('%s tarefa(s) abandonada(s) após %s tentativas.', esgotadas, settings.TAREFAS_MAX_TENTATIVAS)
+    return travadas.update(status='PENDENTE', progresso=0)
+
+
+def _atualizar_progresso(tarefa, progresso):
+    tarefa.progresso = progresso
+    TarefaGeracao.objects.filter(pk=tarefa.pk).update(progresso=progresso, ultimo_sinal=timezone.now())
+
+
+@contextmanager
+def _sinal_de_vida(tarefa):
+    """Renova ultimo_sinal da tarefa numa thread enquanto o bloco executa."""
+    parar = threading.Event()
+
+    def renovar():
+        try:
+            while not parar.wait(settings.TAREFAS_INTERVALO_SINAL):
+                try:
+                    TarefaGeracao.objects.filter(pk=tarefa.pk, status='EXECUTANDO').update(ultimo_sinal=timezone.now())
+                except DatabaseError:
+                    logger.warning('Não foi possível renovar o sinal da tarefa %s.', tarefa.pk, exc_info=True)
+        finally:
+            connection.close()  # Conexão própria desta thread
+
+    thread = threading.Thread(target=renovar, name=f'sinal-tarefa-{tarefa.pk}', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        parar.set()
+        thread.join()
+
+
+# ==============================================================================
+# EXECUÇÃO
+# ==============================================================================
+def _salvar_pdf(origem, nome_arquivo, tarefa):
+    # Uma pasta por tarefa, para que relatórios do mesmo dia não se sobrescrevam.
+    # `origem` é um arquivo aberto, copiado em blocos e fechado ao final
+    arquivo = f'relatorios/{tarefa.pk}/{nome_arquivo.replace("/", "-")}'
+    filepath = os.path.join(settings.MEDIA_ROOT, arquivo)
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    with origem, open(filepath, 'wb') as destino:
+        shutil.copyfileobj(origem, destino)
+    return arquivo
+
+
+def _executar_documento(tarefa):
+    processo = carregar_processo(tarefa.processo_id, tarefa.tipo)
+    _atualizar_progresso(tarefa, 30)
+    documento, gerado = obter_documento(processo, tarefa.tipo, tarefa.solicitado_por)
+    tarefa.documento = documento
+    tarefa.arquivo = str(documento.arquivo)
+
+
+def _executar_andamento_pdf(tarefa):
+    processo = Processo.objects.select_related('orgao_responsavel').get(pk=tarefa.processo_id)
+    _atualizar_progresso(tarefa, 30)
+    conteudo = io.BytesIO(renderizar_andamento_pdf(processo))
+    _atualizar_progresso(tarefa, 90)
+    tarefa.arquivo = _salvar_pdf(conteudo, nome_arquivo_andamento(processo), tarefa)
+
+
+def _executar_relatorio_pdf(tarefa):
+    _atualizar_progresso(tarefa, 10)
+    conteudo = renderizar_relatorio_processos_pdf(
+        tarefa.parametros, progresso=lambda fracao: _atualizar_progresso(tarefa, 10 + int(fracao * 80))
+    )
+    _atualizar_progresso(tarefa, 90)
+    tarefa.arquivo = _salvar_pdf(conteudo, nome_arquivo_relatorio(), tarefa)
+
+
+EXECUTORES = {
+    'DFD': _executar_documento,
+    'ETP': _executar_documento,
+    'TR': _executar_documento,
+    'ANDAMENTO_PDF': _executar_andamento_pdf,
+    'RELATORIO_PDF': _executar_relatorio_pdf,
+}
+
+
+def executar(tarefa):
+    """
+    Executa uma tarefa já reservada e registra o resultado (ou o erro) no banco. A
+    gravação final é condicional à reserva (EXECUTANDO, mesma tentativa): se a tarefa
+    foi reenfileirada enquanto este worker trabalhava, outro worker é o dono dela e
+    este resultado é descartado.
+    """
+    try:
+        with _sinal_de_vida(tarefa):
+            EXECUTORES[tarefa.tipo](tarefa)
+    except Exception as e:
+        logger.error('Tarefa %s falhou:\n%s', tarefa.pk, traceback.format_exc())
+        tarefa.status = 'ERRO'
+        tarefa.erro = str(e)
+    else:
+        tarefa.status = 'CONCLUIDA'
+        tarefa.progresso = 100
+    tarefa.data_conclusao = timezone.now()
+    gravada = TarefaGeracao.objects.filter(pk=tarefa.pk, status='EXECUTANDO', tentativas=tarefa.tentativas).update(
+        status=tarefa.status, progresso=tarefa.progresso, documento=tarefa.documento, arquivo=tarefa.arquivo,
+        erro=tarefa.erro, data_conclusao=tarefa.data_conclusao,
+    )
+    if not gravada:
+        logger.warning('Tarefa %s foi reenfileirada durante a tentativa %s; resultado descartado.',
+                       tarefa.pk, tarefa.tentativas)
+        tarefa.refresh_from_db()
+    return tarefa
+
+
+def caminho_arquivo(tarefa):
+    return os.path.join(settings.MEDIA_ROOT, tarefa.arquivo)
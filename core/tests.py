@@ -1,3 +1,1049 @@
-from django.test import TestCase
+# Arquivo: core/tests.py (Testes do app core)
 
-# Create your tests here.
+import base64
+import importlib
+import json
+import os
+import queue
+import shutil
+import sys
+import tempfile
+import zipfile
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from docx import Document as DocxDocument
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import DecodedStreamObject
+
+from . import pdf, urls
+from .busca import buscar_processos
+from .consultas import RegistroConsultas
+from .documentos import carregar_processo, carregar_modelo, contexto_processo, salvar_arquivo
+from .etapas import concluir_etapa, concluir_etapas_em_lote, divergentes
+from .forms import ETPForm, FiltroProcessosForm
+from .importacao import importar
+from .lote import gerar_zip
+from .metricas import _chave
+from .normalizacao import cnpj_valido, filtro_prefixo, normalizar_nome
+from .paginacao import codificar_cursor, paginar_keyset
+from .pdf import juntar_pdfs
+from .resumo import dados_dashboard, divergencias, estado_resumo, mover_em_lote
+from .status import aplicar_status, MENSAGEM_CONFLITO, MENSAGEM_VERSAO_INVALIDA
+from .models import (
+    Orgao, Secretaria, Responsavel, Fornecedor, Processo, ProcessoETP, HistoricoProcesso, BlocoTexto, Documento,
+    ResumoDashboard, TarefaGeracao, BIT_ETAPA,
+)
+from .tarefas import executar, reenfileirar_travadas, reservar_proxima
+
+MEDIA_TESTES = tempfile.mkdtemp(prefix='sislicit-testes-')
+
+
+def tearDownModule():
+    shutil.rmtree(MEDIA_TESTES, ignore_errors=True)
+
+# Máximo de consultas de um GET em cada URL de core/urls.py sobre a base montada em
+# OrcamentoConsultasTests.setUpTestData (várias secretarias, processos e documentos,
+# para que um N+1 estoure o orçamento). Contam a sessão e o usuário logado e os
+# SAVEPOINTs das transações. URL nova em core/urls.py precisa entrar aqui.
+ORCAMENTO_CONSULTAS = {
+    'dashboard': 10,
+    'painel': 10,
+    'login': 4,
+    'logout': 4,
+    'register': 4,
+    'processo_list': 6,
+    'processo_busca': 5,
+    'processo_detail': 7,
+    'processo_create': 8,
+    'processo_update': 9,
+    'processo_delete': 6,
+    'exportar_andamento_pdf': 7,
+    'processo_etp_form': 10,
+    'processo_documentos': 6,
+    'salvar_etapa_historico': 5,  # Só POST: o GET mede o custo fixo (405)
+    'salvar_etapas_lote': 5,
+    'relatorio_processos': 10,
+    'relatorio_tempos_etapas': 7,
+    'relatorio_fases_excel': 6,
+    'relatorio_fases_pdf': 8,
+    'exportar_processos_csv': 5,
+    'exportar_processos_pdf': 7,
+    'documentos_list': 7,
+    'gerar_dfd': 9,
+    'gerar_etp': 9,
+    'gerar_tr': 9,
+    'gerar_documentos_lote': 6,
+    'download_documento': 6,
+    'importar_cadastros': 5,
+    'importacao_erros': 5,
+    'tarefa_criar': 5,
+    'tarefa_status': 6,
+    'tarefa_download': 6,
+    'orgao_list': 6,
+    'orgao_create': 5,
+    'orgao_sugestoes': 5,
+    'orgao_update': 6,
+    'orgao_delete': 6,
+    'fornecedor_list': 6,
+    'fornecedor_create': 5,
+    'fornecedor_sugestoes': 5,
+    'fornecedor_update': 6,
+    'fornecedor_delete': 6,
+    'responsavel_list': 6,
+    'responsavel_create': 6,
+    'responsavel_update': 7,
+    'responsavel_delete': 6,
+    'metricas': 5,
+}
+
+
+def _partes_na_mesma_thread(pks, renderizar_parte, *args, **kwargs):
+    # Os relatórios em PDF renderizam as partes em threads, com outra conexão, que não
+    # enxerga a transação do teste; aqui as partes (e suas consultas) ficam na thread do teste
+    tamanho = settings.REPORT_CHUNK_SIZE
+    lotes = [pks[i:i + tamanho] for i in range(0, len(pks), tamanho)] or [[]]
+    return BytesIO(b''.join(renderizar_parte(lote, indice, len(lotes)) for indice, lote in enumerate(lotes)))
+
+
+class OrcamentoConsultasMixin:
+    """assertOrcamentoConsultas: falha se a requisição passar do orçamento ou repetir consultas (N+1)."""
+
+    def assertOrcamentoConsultas(self, maximo, url, metodo='get', **kwargs):
+        with RegistroConsultas() as registro:
+            resposta = getattr(self.client, metodo)(url, **kwargs)
+        detalhes = f'\n{registro.relatorio()}'
+        self.assertLessEqual(registro.total, maximo, f'{url}: {registro.total} consultas, orçamento de {maximo}.{detalhes}')
+        repetidas = registro.repetidas(settings.CONSULTAS_LIMITE_REPETICOES)
+        self.assertFalse(repetidas, f'{url}: consultas repetidas (provável N+1): {repetidas}{detalhes}')
+        return resposta
+
+
+@override_settings(
+    MEDIA_ROOT=MEDIA_TESTES,
+    METRICAS_DIR=f'{MEDIA_TESTES}/metricas',
+    CONSULTAS_LENTAS_MS=None,  # O EXPLAIN das consultas lentas entraria na contagem
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class OrcamentoConsultasTests(OrcamentoConsultasMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser('admin', 'admin@example.com', 'senha')
+        orgaos = [
+            Orgao.objects.create(nome='Prefeitura', cnpj='11.222.333/0001-81', endereco='Rua A', email='a@example.com'),
+            Orgao.objects.create(nome='Câmara', cnpj='11.444.777/0001-61', endereco='Rua B', email='b@example.com'),
+        ]
+        secretarias = [Secretaria.objects.create(orgao=orgao, nome=f'Secretaria {i}') for orgao in orgaos for i in range(4)]
+        responsaveis = [
+            Responsavel.objects.create(nome=f'Responsável {i}', matricula=str(i), cargo='Chefe', secretaria=secretaria)
+            for i, secretaria in enumerate(secretarias)
+        ]
+        cls.fornecedor = Fornecedor.objects.create(razao_social='Fornecedor', cnpj='04.252.011/0001-10', email='f@example.com')
+        processos = [
+            Processo.objects.create(
+                numero_processo=f'{i}/2025', orgao_responsavel=secretaria.orgao, secretaria_responsavel=secretaria,
+                responsavel_demanda=responsavel, objeto=f'Objeto {i}', modalidade='PREGAO', valor_estimado=1000 + i,
+            )
+            for i, (secretaria, responsavel) in enumerate(zip(secretarias, responsaveis))
+        ]
+        concluir_etapas_em_lote([(processo.pk, etapa) for processo in processos for etapa in ('DFD', 'ETP', 'PUBLICACAO_AVISO')])
+        documentos = [
+            Documento.objects.create(processo=processo, tipo=tipo, arquivo=f'documentos/{tipo}_{processo.pk}.docx')
+            for processo in processos for tipo in ('DFD', 'ETP')
+        ]
+        for documento in documentos:
+            caminho = Path(MEDIA_TESTES) / documento.arquivo.name
+            caminho.parent.mkdir(parents=True, exist_ok=True)
+            caminho.write_bytes(b'docx')
+        cls.tarefa = TarefaGeracao.objects.create(
+            tipo='DFD', processo=processos[0], documento=documentos[0], arquivo=documentos[0].arquivo.name,
+            status='CONCLUIDA', solicitado_por=cls.usuario.username,
+        )
+        cls.orgao, cls.processo, cls.responsavel, cls.documento = orgaos[0], processos[0], responsaveis[0], documentos[0]
+
+    def _parametros(self, nome, padrao):
+        valores = {'pk': self.processo.pk, 'processo_id': self.processo.pk, 'documento_id': self.documento.pk,
+                   'relatorio': 'inexistente', 'tipo': 'DFD'}
+        for prefixo, objeto in (('orgao_', self.orgao), ('fornecedor_', self.fornecedor),
+                                ('responsavel_', self.responsavel), ('tarefa_', self.tarefa)):
+            if nome.startswith(prefixo):
+                valores['pk'] = objeto.pk
+        return {chave: valor for chave, valor in valores.items() if chave in padrao.pattern.converters}
+
+    @mock.patch('core.relatorios._renderizar_em_partes', _partes_na_mesma_thread)
+    @mock.patch('core.relatorios.renderizar_pdf', return_value=b'%PDF-1.7')
+    def test_orcamento_de_consultas_por_url(self, _renderizar_pdf):
+        for padrao in urls.urlpatterns:
+            with self.subTest(url=padrao.name):
+                self.assertIn(padrao.name, ORCAMENTO_CONSULTAS, 'URL sem orçamento de consultas em ORCAMENTO_CONSULTAS.')
+                self.client.force_login(self.usuario)
+                cache.clear()  # Orçamento medido com o cache vazio
+                url = reverse(padrao.name, kwargs=self._parametros(padrao.name, padrao))
+                resposta = self.assertOrcamentoConsultas(ORCAMENTO_CONSULTAS[padrao.name], url, secure=True)
+                self.assertLess(resposta.status_code, 500)
+
+    def test_formulario_de_processo_nao_consulta_por_secretaria(self):
+        # Secretaria.__str__ mostra o órgão: sem o select_related do manager, cada opção do select custa uma consulta
+        Secretaria.objects.bulk_create([Secretaria(orgao=self.orgao, nome=f'Extra {i}') for i in range(20)])
+        self.client.force_login(self.usuario)
+        url = reverse('processo_update', args=[self.processo.pk])
+        self.assertOrcamentoConsultas(ORCAMENTO_CONSULTAS['processo_update'], url, secure=True)
+
+    @override_settings(REPORT_MAX_RECORDS=3)
+    def test_relatorio_guarda_no_cache_so_as_linhas_exibidas(self):
+        self.client.force_login(self.usuario)
+        cache.clear()
+        resposta = self.client.get(reverse('relatorio_processos'), secure=True)
+        self.assertEqual(len(resposta.context['resultados']), 3)
+        self.assertTrue(resposta.context['limite_atingido'])
+        self.assertEqual(set(resposta.context['resultados'][0]), {
+            'pk', 'numero_processo', 'modalidade', 'status', 'data_abertura', 'orgao', 'secretaria',
+            'modalidade_nome', 'status_nome',
+        })
+        self.assertContains(resposta, 'Pregão')
+
+
+@override_settings(METRICAS_DIR=f'{MEDIA_TESTES}/metricas', METRICAS_TOKEN='token-de-teste')
+class MetricasTests(TestCase):
+    def test_exige_token_ou_staff(self):
+        self.assertEqual(self.client.get('/metrics', secure=True).status_code, 401)
+        resposta = self.client.get('/metrics', secure=True, HTTP_AUTHORIZATION='Bearer token-errado')
+        self.assertEqual(resposta.status_code, 401)
+        self.client.force_login(User.objects.create_user('staff', is_staff=True))
+        self.assertEqual(self.client.get('/metrics', secure=True).status_code, 200)
+
+    def test_soma_os_arquivos_de_todos_os_processos(self):
+        self.client.get('/login/', secure=True)
+        # Retrato gravado por outro worker (pid 1 está sempre vivo)
+        chave = _chave('sislicit_http_requisicoes_total', {'view': 'login', 'metodo': 'GET', 'status': 200})
+        Path(MEDIA_TESTES, 'metricas').mkdir(exist_ok=True)
+        Path(MEDIA_TESTES, 'metricas', '1.json').write_text(json.dumps({chave: 1000}))
+        try:
+            resposta = self.client.get('/metrics', secure=True, HTTP_AUTHORIZATION='Bearer token-de-teste')
+        finally:
+            Path(MEDIA_TESTES, 'metricas', '1.json').unlink()
+        texto = resposta.content.decode()
+        self.assertIn('# TYPE sislicit_http_duracao_segundos histogram', texto)
+        linha = next(linha for linha in texto.splitlines()
+                     if linha.startswith('sislicit_http_requisicoes_total{metodo="GET",status="200",view="login"}'))
+        self.assertGreater(int(linha.split()[-1]), 1000)
+        self.assertIn('sislicit_http_duracao_segundos_bucket{view="login",le="+Inf"}', texto)
+
+
+@override_settings(
+    CONSULTAS_LENTAS_MS=0,
+    METRICAS_DIR=f'{MEDIA_TESTES}/metricas',
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class ConsultasLentasTests(TestCase):
+    def test_registra_view_linha_e_plano(self):
+        cache.clear()  # O relatório em cache não consulta core_processo
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'senha'))
+        with self.assertLogs('core.consultas_lentas', 'WARNING') as logs:
+            self.client.get(reverse('relatorio_processos'), {'status': 'PUBLICADO'}, secure=True)
+        consultas = [json.loads(registro.getMessage()) for registro in logs.records]
+        consulta = next(consulta for consulta in consultas if 'FROM "core_processo"' in consulta['sql'])
+        self.assertEqual(consulta['view'], 'relatorio_processos')
+        self.assertRegex(consulta['local'], r'^core/views\.py:\d+ ')
+        self.assertTrue(consulta['plano'])
+
+    def test_comando_ordena_por_tempo_total(self):
+        arquivo = Path(MEDIA_TESTES, 'consultas_lentas.log')
+        consultas = [
+            {'sql': 'SELECT 1 FROM a WHERE id IN (%s, %s)', 'ms': 300.0, 'local': 'core/views.py:1 a', 'plano': ['SCAN a']},
+            {'sql': 'SELECT 1 FROM a WHERE id IN (%s)', 'ms': 300.0, 'local': 'core/views.py:1 a', 'plano': ['SCAN a']},
+            {'sql': 'SELECT 1 FROM b', 'ms': 500.0, 'local': 'core/views.py:2 b', 'plano': ['SCAN b']},
+        ]
+        arquivo.write_text(''.join(
+            json.dumps({'quando': '2025-01-01T00:00:00', 'view': 'v', 'metodo': 'GET', 'origem': None, **consulta}) + '\n'
+            for consulta in consultas
+        ) + 'linha que não é JSON\n', encoding='utf-8')
+        saida = StringIO()
+        call_command('consultas_lentas', arquivo=str(arquivo), stdout=saida)
+        texto = saida.getvalue()
+        self.assertIn('1. 0.60 s no total em 2 execuções', texto)
+        self.assertIn('2. 0.50 s no total em 1 execuções', texto)
+        self.assertLess(texto.index('FROM a'), texto.index('FROM b'))
+
+
+class PaginacaoKeysetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.orgaos = [
+            Orgao.objects.create(nome=f'Órgão {i}', cnpj=f'{i}', endereco='Rua A', email='a@example.com') for i in range(5)
+        ]
+
+    def test_proxima_pagina_pelo_cursor(self):
+        primeira = paginar_keyset(Orgao.objects.all(), ('nome', 'id'), por_pagina=2)
+        segunda = paginar_keyset(Orgao.objects.all(), ('nome', 'id'), primeira.proximo_cursor, por_pagina=2)
+        self.assertEqual(primeira.itens + segunda.itens, self.orgaos[:4])
+        self.assertTrue(segunda.tem_mais)
+
+    def test_cursor_adulterado_volta_a_primeira_pagina(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'senha'))
+        Processo.objects.create(numero_processo='1/2025', orgao_responsavel=self.orgaos[0], objeto='Objeto', modalidade='PREGAO')
+        adulterados = [['xx', 'yy'], [{'a': 1}, 1], [[1], 1], [None, 1], ['2025-01-01', 'id'], {'a': 1}, [1]]
+        for nome in ('processo_list', 'orgao_list', 'documentos_list'):
+            for valores in adulterados:
+                with self.subTest(url=nome, cursor=valores):
+                    cursor = base64.urlsafe_b64encode(json.dumps(valores).encode()).decode()
+                    resposta = self.client.get(reverse(nome), {'cursor': cursor}, secure=True)
+                    self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(paginar_keyset(Orgao.objects.all(), ('nome', 'id'), codificar_cursor(['x', 'y'])).itens[0], self.orgaos[0])
+
+
+class NormalizacaoCnpjTests(TestCase):
+    def test_digitos_verificadores(self):
+        self.assertTrue(cnpj_valido('11222333000181'))
+        self.assertFalse(cnpj_valido('11222333000182'))
+        self.assertFalse(cnpj_valido('11111111111111'))
+        self.assertFalse(cnpj_valido('11.222.333/0001-81'))  # Só dígitos; a máscara sai antes
+
+    def test_backfill_com_duplicado_com_e_sem_mascara(self):
+        # Registros anteriores à normalização: bulk_create não passa pelo save()
+        Orgao.objects.bulk_create([
+            Orgao(nome='Câmara Municipal', cnpj='11.222.333/0001-81', endereco='Rua A', email='a@example.com'),
+            Orgao(nome='Câmara (cópia)', cnpj='11222333000181', endereco='Rua A', email='a@example.com'),
+            Orgao(nome='Prefeitura', cnpj='123', endereco='Rua B', email='b@example.com'),
+        ])
+        saida = StringIO()
+        call_command('normalizar_cnpjs', stdout=saida)
+        original, copia, curto = Orgao.objects.order_by('pk')
+        self.assertEqual((original.cnpj, original.cnpj_digitos), ('11.222.333/0001-81', '11222333000181'))
+        self.assertIsNone(copia.cnpj_digitos)
+        self.assertIsNone(curto.cnpj_digitos)
+        self.assertEqual(copia.nome_busca, 'camara (copia)')
+        self.assertIn(f'CNPJ duplicado do registro {original.pk}', saida.getvalue())
+        self.assertIn('não tem 14 dígitos', saida.getvalue())
+
+    def test_busca_por_prefixo(self):
+        camara = Orgao.objects.create(nome='Câmara Municipal', cnpj='11.222.333/0001-81', endereco='Rua A', email='a@example.com')
+        Orgao.objects.create(nome='Prefeitura', cnpj='11.444.777/0001-61', endereco='Rua B', email='b@example.com')
+        por_cnpj = Orgao.objects.filter(**filtro_prefixo('cnpj_digitos', '112223'))
+        por_nome = Orgao.objects.filter(**filtro_prefixo('nome_busca', normalizar_nome('CÂMARA mun')))
+        self.assertEqual(list(por_cnpj), [camara])
+        self.assertEqual(list(por_nome), [camara])
+        # Intervalo no índice, não varredura da tabela
+        self.assertIn('USING INDEX', por_nome.explain())
+        self.assertIn('USING INDEX', por_cnpj.explain())
+
+
+@override_settings(MEDIA_ROOT=MEDIA_TESTES)
+class ImportacaoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.orgao = Orgao.objects.create(nome='Prefeitura de São José', cnpj='11.222.333/0001-81', endereco='Rua A', email='a@example.com')
+        cls.secretaria = Secretaria.objects.create(orgao=cls.orgao, nome='Educação')
+        Responsavel.objects.create(nome='Ana', matricula='123', cargo='Chefe', secretaria=cls.secretaria)
+        Fornecedor.objects.create(razao_social='Já Cadastrado', cnpj='04.252.011/0001-10', email='f@example.com')
+
+    def _importar(self, tipo, texto, codificacao='utf-8'):
+        return importar(tipo, BytesIO(texto.encode(codificacao)), 'planilha.csv')
+
+    def test_csv_em_windows_1252(self):
+        resultado = self._importar('FORNECEDOR', (
+            'Razão Social;CNPJ;E-mail\n'
+            'Comércio Ação Ltda;11.444.777/0001-61;c@example.com\n'
+        ), 'cp1252')
+        self.assertEqual((resultado.importados, resultado.erros), (1, []))
+        self.assertEqual(Fornecedor.objects.get(cnpj_digitos='11444777000161').razao_social, 'Comércio Ação Ltda')
+
+    def test_cnpj_duplicado_no_banco_e_no_arquivo(self):
+        resultado = self._importar('FORNECEDOR', (
+            'razao_social;cnpj;email\n'
+            'Repetido do banco;04252011000110;r@example.com\n'
+            'Novo;11.444.777/0001-61;n@example.com\n'
+            'Novo sem máscara;11444777000161;n@example.com\n'
+            'CNPJ inválido;11444777000162;n@example.com\n'
+            'E-mail inválido;45.997.418/0001-53;email\n'
+        ))
+        self.assertEqual(resultado.importados, 1)
+        self.assertEqual(resultado.linhas_com_erro, 4)
+        self.assertEqual([(linha, campo) for linha, campo, _ in sorted(resultado.erros)],
+                         [(2, 'cnpj'), (4, 'cnpj'), (5, 'cnpj'), (6, 'email')])
+
+    def test_consultas_nao_crescem_com_as_linhas(self):
+        def cnpj(base):  # 12 dígitos + os verificadores que os tornam válidos
+            return next(base + f'{dv:02d}' for dv in range(100) if cnpj_valido(base + f'{dv:02d}'))
+
+        linhas = ''.join(f'Fornecedor {i};{cnpj(f"{i:08d}0001")};f{i}@example.com\n' for i in range(1, 51))
+        with CaptureQueriesContext(connection) as consultas:
+            resultado = self._importar('FORNECEDOR', 'razao_social;cnpj;email\n' + linhas)
+        self.assertEqual((resultado.importados, resultado.erros), (50, []))
+        self.assertLessEqual(len(consultas), 5, '\n'.join(consulta['sql'] for consulta in consultas))
+
+    def test_chaves_estrangeiras_por_cnpj_nome_e_matricula(self):
+        resultado = self._importar('PROCESSO', (
+            'numero;orgao;secretaria;responsavel;objeto;modalidade;valor\n'
+            '1/2025;11.222.333/0001-81;Educação;123;Merenda;PREGAO;1.234,56\n'
+            '2/2025;prefeitura de sao jose;;;Transporte;PREGAO;\n'
+            '3/2025;Outro órgão;;;Obras;PREGAO;\n'
+            '4/2025;11222333000181;Saúde;999;Limpeza;PREGAO;\n'
+            '1/2025;11222333000181;;;Repetido;PREGAO;\n'
+        ))
+        self.assertEqual(resultado.importados, 2)
+        processo = Processo.objects.get(numero_processo='1/2025')
+        self.assertEqual(
+            (processo.orgao_responsavel, processo.secretaria_responsavel, processo.responsavel_demanda.matricula),
+            (self.orgao, self.secretaria, '123')
+        )
+        self.assertEqual(str(processo.valor_estimado), '1234.56')
+        self.assertEqual(Processo.objects.get(numero_processo='2/2025').orgao_responsavel, self.orgao)
+        self.assertEqual([(linha, campo) for linha, campo, _ in sorted(resultado.erros)],
+                         [(4, 'orgao'), (5, 'responsavel'), (5, 'secretaria'), (6, 'numero_processo')])
+
+    def test_arquivo_ilegivel_vira_erro_do_formulario(self):
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'senha'))
+        for nome, conteudo in (('planilha.xlsx', b'isto nao e um zip'), ('planilha.csv', b'\x00\x01binario\x00')):
+            with self.subTest(arquivo=nome):
+                arquivo = BytesIO(conteudo)
+                arquivo.name = nome
+                resposta = self.client.post(reverse('importar_cadastros'), {'tipo': 'FORNECEDOR', 'arquivo': arquivo}, secure=True)
+                self.assertEqual(resposta.status_code, 200)
+                self.assertTrue(resposta.context['form'].errors['arquivo'])
+                self.assertIsNone(resposta.context['resultado'])
+
+
+class StatusEVersaoTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.orgao = Orgao.objects.create(nome='Prefeitura', cnpj='11.222.333/0001-81', endereco='Rua A', email='a@example.com')
+
+    def setUp(self):
+        self.processo = Processo.objects.create(
+            numero_processo='1/2025', orgao_responsavel=self.orgao, objeto='Original', modalidade='PREGAO'
+        )
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'senha'))
+
+    def _editar(self, **dados):
+        dados = {'numero_processo': '1/2025', 'orgao_responsavel': self.orgao.pk, 'modalidade': 'PREGAO',
+                 'status': 'FASE_INTERNA', 'objeto': 'Editado', **dados}
+        return self.client.post(reverse('processo_update', args=[self.processo.pk]), dados, secure=True)
+
+    def test_versao_desatualizada_nao_grava(self):
+        Processo.objects.filter(pk=self.processo.pk).update(objeto='Outra pessoa', versao=self.processo.versao + 1)
+        resposta = self._editar(versao=self.processo.versao)
+        self.assertContains(resposta, MENSAGEM_CONFLITO)
+        self.processo.refresh_from_db()
+        self.assertEqual(self.processo.objeto, 'Outra pessoa')
+
+    def test_versao_ausente_ou_invalida_aparece_na_tela(self):
+        for versao in ({}, {'versao': 'abc'}):
+            with self.subTest(versao=versao):
+                resposta = self._editar(**versao)
+                self.assertContains(resposta, MENSAGEM_VERSAO_INVALIDA)
+        self.processo.refresh_from_db()
+        self.assertEqual(self.processo.objeto, 'Original')
+
+    def test_versao_atual_grava_e_incrementa(self):
+        resposta = self._editar(versao=self.processo.versao)
+        self.assertEqual(resposta.status_code, 302)
+        versao = self.processo.versao
+        self.processo.refresh_from_db()
+        self.assertEqual((self.processo.objeto, self.processo.versao), ('Editado', versao + 1))
+
+    def test_aplicar_status_so_avanca(self):
+        mascara = BIT_ETAPA['PUBLICACAO_AVISO'] | BIT_ETAPA['HOMOLOGACAO']
+        Processo.objects.filter(pk=self.processo.pk).update(etapas_mascara=BIT_ETAPA['PUBLICACAO_AVISO'])
+        outros = {
+            status: Processo.objects.create(
+                numero_processo=f'{status}/2025', orgao_responsavel=self.orgao, objeto='x', modalidade='PREGAO', status=status
+            )
+            for status in ('FASE_INTERNA', 'EM_ANALISE', 'CANCELADO')
+        }
+        Processo.objects.filter(pk__in=[processo.pk for processo in outros.values()]).update(etapas_mascara=mascara)
+        Processo.objects.filter(pk=outros['EM_ANALISE'].pk).update(etapas_mascara=BIT_ETAPA['PUBLICACAO_AVISO'])
+
+        self.assertEqual(aplicar_status(Processo.objects.all()), 2)
+        esperados = {self.processo.pk: ('PUBLICADO', 1), outros['FASE_INTERNA'].pk: ('HOMOLOGADO', 1),
+                     outros['EM_ANALISE'].pk: ('EM_ANALISE', 0), outros['CANCELADO'].pk: ('CANCELADO', 0)}
+        versoes = {processo.pk: processo.versao for processo in [self.processo, *outros.values()]}
+        for processo in Processo.objects.all():
+            status, incremento = esperados[processo.pk]
+            self.assertEqual((processo.status, processo.versao), (status, versoes[processo.pk] + incremento))
+        self.assertEqual(aplicar_status(Processo.objects.all()), 0)
+
+
+class BibliotecaTextosETPTests(TestCase):
+    def setUp(self):
+        BlocoTexto.limpar_cache()
+        orgao = Orgao.objects.create(nome='Prefeitura', cnpj='11.222.333/0001-81', endereco='Rua A', email='a@example.com')
+        processo = Processo.objects.create(numero_processo='1/2025', orgao_responsavel=orgao, objeto='Objeto', modalidade='PREGAO')
+        self.etp = ProcessoETP(processo=processo)
+
+    def test_secao_em_branco_nao_volta_ao_texto_da_biblioteca(self):
+        # O navegador devolve o texto da biblioteca com quebras \r\n
+        formulario = ETPForm(instance=self.etp)
+        dados = {nome: str(formulario[nome].value() or '').replace('\n', '\r\n') for nome in formulario.fields}
+        dados['etp_pca_texto'] = ''
+        formulario = ETPForm(dados, instance=self.etp)
+        self.assertTrue(formulario.is_valid(), formulario.errors)
+        etp = formulario.save()
+        etp.refresh_from_db()
+        self.assertEqual(etp.etp_pca_texto, '')
+        self.assertEqual(etp.texto('etp_pca_texto'), '')
+        self.assertIsNone(etp.etp_texto_estimativa_quantidades)
+        self.assertEqual(
+            etp.texto('etp_texto_estimativa_quantidades'), BlocoTexto.resolver('etp_texto_estimativa_quantidades')
+        )
+        self.assertIn('\n', etp.texto('etp_texto_estimativa_quantidades'))
+
+
+@override_settings(TAREFAS_TEMPO_MAXIMO=120, TAREFAS_MAX_TENTATIVAS=3)
+class FilaDeTarefasTests(TestCase):
+    def _tarefa(self, sinal_ha_segundos, tentativas):
+        agora = timezone.now()
+        return TarefaGeracao.objects.create(
+            tipo='RELATORIO_PDF', status='EXECUTANDO', tentativas=tentativas,
+            data_inicio=agora - timedelta(hours=1), ultimo_sinal=agora - timedelta(seconds=sinal_ha_segundos),
+        )
+
+    def test_reenfileira_so_tarefas_sem_sinal(self):
+        viva = self._tarefa(sinal_ha_segundos=10, tentativas=1)  # Relatório longo, worker vivo
+        travada = self._tarefa(sinal_ha_segundos=600, tentativas=1)
+        esgotada = self._tarefa(sinal_ha_segundos=600, tentativas=3)
+        self.assertEqual(reenfileirar_travadas(), 1)
+        for tarefa in (viva, travada, esgotada):
+            tarefa.refresh_from_db()
+        self.assertEqual(viva.status, 'EXECUTANDO')
+        self.assertEqual(travada.status, 'PENDENTE')
+        self.assertEqual(esgotada.status, 'ERRO')
+        self.assertTrue(esgotada.erro)
+
+    def test_reserva_conta_tentativas(self):
+        tarefa = TarefaGeracao.objects.create(tipo='RELATORIO_PDF')
+        reservada = reservar_proxima()
+        self.assertEqual((reservada.pk, reservada.status, reservada.tentativas), (tarefa.pk, 'EXECUTANDO', 1))
+        self.assertIsNotNone(reservada.ultimo_sinal)
+
+    def _executar(self, tarefa, executor):
+        with mock.patch.dict('core.tarefas.EXECUTORES', {'RELATORIO_PDF': executor}):
+            return executar(tarefa)
+
+    def test_executar_grava_o_resultado_da_propria_reserva(self):
+        TarefaGeracao.objects.create(tipo='RELATORIO_PDF')
+        tarefa = self._executar(reservar_proxima(), lambda tarefa: setattr(tarefa, 'arquivo', 'relatorios/1/a.pdf'))
+        tarefa.refresh_from_db()
+        self.assertEqual((tarefa.status, tarefa.progresso, tarefa.arquivo), ('CONCLUIDA', 100, 'relatorios/1/a.pdf'))
+        self.assertIsNotNone(tarefa.data_conclusao)
+
+    def test_worker_atrasado_nao_sobrescreve_a_nova_tentativa(self):
+        def reenfileirada_durante_a_execucao(falhar):
+            def executor(tarefa):
+                # O sinal de vida parou, a tarefa voltou à fila e outro worker a reservou
+                TarefaGeracao.objects.filter(pk=tarefa.pk).update(status='PENDENTE')
+                reservar_proxima()
+                tarefa.arquivo = 'relatorios/atrasado.pdf'
+                if falhar:
+                    raise RuntimeError('falhou')
+            return executor
+
+        for falhar in (False, True):
+            with self.subTest(falhar=falhar):
+                TarefaGeracao.objects.all().delete()
+                TarefaGeracao.objects.create(tipo='RELATORIO_PDF')
+                tarefa = self._executar(reservar_proxima(), reenfileirada_durante_a_execucao(falhar))
+                # O objeto devolvido é o estado da nova tentativa, intocado
+                self.assertEqual((tarefa.status, tarefa.tentativas, tarefa.arquivo, tarefa.erro), ('EXECUTANDO', 2, '', ''))
+                self.assertIsNone(tarefa.data_conclusao)
+
+
+def _renderizar_sem_processo_filho(processo_id, tipo):
+    # Substitui core.lote._renderizar: grava um arquivo "gerado" sem abrir o Django no filho
+    arquivo = f'documentos/lote_{processo_id}_{tipo}.docx'
+    Path(MEDIA_TESTES, arquivo).parent.mkdir(parents=True, exist_ok=True)
+    Path(MEDIA_TESTES, arquivo).write_bytes(b'docx')
+    return {'processo_id': processo_id, 'numero_processo': f'{processo_id}/2025', 'tipo': tipo,
+            'arquivo': arquivo, 'hash_conteudo': f'{processo_id}{tipo}', 'novo': True}
+
+
+@override_settings(MEDIA_ROOT=MEDIA_TESTES, DOCUMENTOS_LOTE_PROCESSOS=2)
+@mock.patch('core.lote._renderizar', _renderizar_sem_processo_filho)
+class DocumentosLoteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        orgao = Orgao.objects.create(nome='Prefeitura', cnpj='11.222.333/0001-81', endereco='Rua A', email='a@example.com')
+        cls.pks = [
+            Processo.objects.create(numero_processo=f'{i}/2025', orgao_responsavel=orgao, objeto='x', modalidade='PREGAO').pk
+            for i in range(5)
+        ]
+
+    def setUp(self):
+        for arquivo in Path(MEDIA_TESTES).glob('documentos/lote_*'):
+            arquivo.unlink()
+
+    def test_download_interrompido_registra_os_arquivos_ja_gerados(self):
+        with ThreadPoolExecutor(max_workers=2) as pool, mock.patch('core.lote._obter_pool', return_value=pool):
+            partes = gerar_zip(self.pks, ['DFD', 'ETP'], 'admin')
+            next(partes)
+            partes.close()  # O cliente desistiu do download
+        gerados = {f'documentos/lote_{pk}_{tipo}.docx' for pk in self.pks for tipo in ('DFD', 'ETP')
+                   if Path(MEDIA_TESTES, f'documentos/lote_{pk}_{tipo}.docx').exists()}
+        self.assertLess(len(gerados), 10)
+        self.assertEqual(set(Documento.objects.values_list('arquivo', flat=True)), gerados)
+
+    def test_lote_completo(self):
+        with ThreadPoolExecutor(max_workers=2) as pool, mock.patch('core.lote._obter_pool', return_value=pool):
+            conteudo = b''.join(gerar_zip(self.pks, ['DFD'], 'admin'))
+        self.assertEqual(Documento.objects.filter(gerado_por='admin').count(), 5)
+        self.assertEqual(len(zipfile.ZipFile(BytesIO(conteudo)).namelist()), 5)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_TESTES)
+class DocumentosWordTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        orgao = Orgao.objects.create(nome='Prefeitura', cnpj='11.222.333/0001-81', endereco='Rua A', email='a@example.com')
+        cls.processo = Processo.objects.create(
+            numero_processo='7/2025', orgao_responsavel=orgao, objeto='Merenda & lanches', modalidade='PREGAO',
+        )
+
+    def _texto(self, tipo):
+        processo = carregar_processo(self.processo.pk, tipo)
+        doc = carregar_modelo(tipo).renderizar(contexto_processo(processo, tipo))
+        saida = BytesIO()
+        doc.save(saida)
+        return '\n'.join(paragrafo.text for paragrafo in DocxDocument(saida).paragraphs)
+
+    def test_templates_renderizam_sem_marcacoes_restantes(self):
+        for tipo in ('DFD', 'ETP', 'TR'):
+            with self.subTest(tipo=tipo):
+                texto = self._texto(tipo)
+                self.assertIn('Merenda & lanches', texto)
+                self.assertNotRegex(texto, r'\{[{%]|[}%]\}')
+
+    def test_dfd_generico(self):
+        texto = self._texto('DFD')
+        self.assertIn('Processo nº: 7/2025', texto)
+        self.assertIn('3. MODALIDADE SUGERIDA\nPregão', texto)
+        self.assertIn('A ser definido após pesquisa de preços.', texto)
+        self.assertIn('6. RESPONSÁVEL PELA DEMANDA\nA ser definido.', texto)
+        self.assertNotIn('Unidade Requisitante', texto)
+        self.assertNotIn('locação', texto)
+
+    def test_arquivos_gerados_no_mesmo_segundo_nao_se_sobrescrevem(self):
+        modelo = carregar_modelo('DFD')
+        contexto = contexto_processo(self.processo, 'DFD')
+        arquivos = {salvar_arquivo(modelo.renderizar(contexto), self.processo, 'DFD') for _ in range(2)}
+        self.assertEqual(len(arquivos), 2)
+
+
+class FiltroProcessosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser('admin', 'admin@example.com', 'senha')
+        cls.prefeitura = Orgao.objects.create(nome='Prefeitura', cnpj='11.222.333/0001-81', endereco='Rua A', email='a@example.com')
+        cls.camara = Orgao.objects.create(nome='Câmara', cnpj='11.444.777/0001-61', endereco='Rua B', email='b@example.com')
+        cls.saude = Secretaria.objects.create(orgao=cls.prefeitura, nome='Saúde')
+        processos = [
+            ('1/2025', cls.prefeitura, cls.saude, 'PREGAO', '2025-01-10'),
+            ('2/2025', cls.prefeitura, None, 'DISPENSA', '2025-02-10'),
+            ('3/2025', cls.camara, None, 'PREGAO', '2025-03-10'),
+        ]
+        for numero, orgao, secretaria, modalidade, abertura in processos:
+            processo = Processo.objects.create(
+                numero_processo=numero, orgao_responsavel=orgao, secretaria_responsavel=secretaria,
+                objeto='x', modalidade=modalidade,
+            )
+            Processo.objects.filter(pk=processo.pk).update(data_abertura=abertura)  # auto_now_add
+        pks = dict(Processo.objects.values_list('numero_processo', 'pk'))
+        concluir_etapas_em_lote([(pks['1/2025'], 'DFD'), (pks['2/2025'], 'DFD'), (pks['2/2025'], 'ETP')])
+
+    def _numeros(self, **params):
+        filtro = FiltroProcessosForm(params)
+        return set(filtro.filtrar(Processo.objects.all()).values_list('numero_processo', flat=True)), filtro
+
+    def test_periodo_com_limites_inclusivos(self):
+        self.assertEqual(self._numeros(data_inicio='2025-02-10')[0], {'2/2025', '3/2025'})
+        self.assertEqual(self._numeros(data_fim='2025-02-10')[0], {'1/2025', '2/2025'})
+        self.assertEqual(self._numeros(data_inicio='2025-02-10', data_fim='2025-02-10')[0], {'2/2025'})
+
+    def test_orgao_secretaria_e_modalidade(self):
+        self.assertEqual(self._numeros(orgao=self.camara.pk)[0], {'3/2025'})
+        self.assertEqual(self._numeros(secretaria=self.saude.pk)[0], {'1/2025'})
+        self.assertEqual(self._numeros(modalidade='PREGAO')[0], {'1/2025', '3/2025'})
+        self.assertEqual(self._numeros(orgao=self.prefeitura.pk, modalidade='PREGAO')[0], {'1/2025'})
+
+    def test_etapas_pela_mascara(self):
+        self.assertEqual(self._numeros(com_etapa='DFD')[0], {'1/2025', '2/2025'})
+        self.assertEqual(self._numeros(com_etapa='ETP')[0], {'2/2025'})
+        self.assertEqual(self._numeros(sem_etapa='ETP')[0], {'1/2025', '3/2025'})
+        self.assertEqual(self._numeros(com_etapa='DFD', sem_etapa='ETP')[0], {'1/2025'})
+
+    def test_parametros_invalidos_sao_ignorados_e_listados(self):
+        todos = {'1/2025', '2/2025', '3/2025'}
+        for params, campo, esperados in (
+            ({'data_fim': '31/02/2025'}, 'data_fim', todos),
+            ({'orgao': 'abc'}, 'orgao', todos),
+            ({'modalidade': 'LEILAO_REVERSO'}, 'modalidade', todos),
+            ({'com_etapa': 'INEXISTENTE'}, 'com_etapa', todos),
+            # Só a data final, anterior à inicial, é descartada
+            ({'data_inicio': '2025-03-01', 'data_fim': '2025-01-01'}, 'data_fim', {'3/2025'}),
+        ):
+            with self.subTest(params=params):
+                numeros, filtro = self._numeros(**params)
+                self.assertIn(campo, filtro.errors)
+                self.assertEqual(numeros, esperados)
+
+    @mock.patch('core.relatorios._renderizar_em_partes', _partes_na_mesma_thread)
+    @mock.patch('core.relatorios.renderizar_pdf', return_value=b'%PDF-1.7')
+    def test_telas_e_exportacoes_nao_quebram_com_filtros(self, _renderizar_pdf):
+        # Só data_fim derrubava o PDF (nome indefinido); parâmetros inválidos derrubavam tudo
+        self.client.force_login(self.usuario)
+        for params in ({'data_fim': '2025-02-10'}, {'data_fim': 'xx', 'orgao': 'abc', 'secretaria': '-1'}):
+            for nome in ('relatorio_processos', 'exportar_processos_csv', 'exportar_processos_pdf'):
+                with self.subTest(url=nome, params=params):
+                    resposta = self.client.get(reverse(nome), params, secure=True)
+                    self.assertEqual(resposta.status_code, 200)
+        resposta = self.client.get(reverse('relatorio_processos'), {'data_fim': 'xx'}, secure=True)
+        self.assertIn('data_fim', resposta.context['filtro_form'].errors)
+        self.assertEqual(len(resposta.context['resultados']), 3)
+
+
+class SalvarEtapasLoteTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser('admin', 'admin@example.com', 'senha')
+        orgao = Orgao.objects.create(nome='Prefeitura', cnpj='11.222.333/0001-81', endereco='Rua A', email='a@example.com')
+        cls.p1, cls.p2 = [
+            Processo.objects.create(numero_processo=f'{i}/2025', orgao_responsavel=orgao, objeto='x', modalidade='PREGAO')
+            for i in (1, 2)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def _post(self, corpo):
+        corpo = corpo if isinstance(corpo, str) else json.dumps(corpo)
+        return self.client.post(reverse('salvar_etapas_lote'), corpo, content_type='application/json', secure=True)
+
+    def test_itens_atualizam_progresso_e_status(self):
+        resposta = self._post({'itens': [
+            {'processo_id': self.p1.pk, 'etapa': 'DFD'},
+            {'processo_id': self.p1.pk, 'etapa': 'PUBLICACAO_AVISO'},
+            {'processo_id': self.p2.pk, 'etapa': 'DFD'},
+        ]})
+        dados = resposta.json()
+        self.assertTrue(dados['success'])
+        self.assertEqual((len(dados['salvas']), dados['ja_salvas'], dados['invalidos']), (3, [], []))
+        self.p1.refresh_from_db()
+        self.p2.refresh_from_db()
+        self.assertEqual(self.p1.etapas_mascara, BIT_ETAPA['DFD'] | BIT_ETAPA['PUBLICACAO_AVISO'])
+        self.assertEqual((self.p1.etapas_concluidas, self.p1.status, self.p1.versao), (2, 'PUBLICADO', 1))
+        self.assertIn(self.p1.ultima_etapa, ('DFD', 'PUBLICACAO_AVISO'))
+        self.assertIsNotNone(self.p1.ultima_etapa_em)
+        self.assertEqual((self.p2.etapas_concluidas, self.p2.status, self.p2.versao), (1, 'FASE_INTERNA', 0))
+
+    def test_mesma_etapa_em_varios_processos(self):
+        concluir_etapas_em_lote([(self.p1.pk, 'DFD')])
+        dados = self._post({'etapa': 'DFD', 'processo_ids': [self.p1.pk, self.p2.pk, 999999]}).json()
+        self.assertTrue(dados['success'])
+        self.assertEqual(dados['salvas'], [{'processo_id': self.p2.pk, 'etapa': 'DFD'}])
+        self.assertEqual(dados['ja_salvas'], [{'processo_id': self.p1.pk, 'etapa': 'DFD'}])
+        self.assertEqual(dados['invalidos'], [
+            {'item': {'processo_id': 999999, 'etapa': 'DFD'}, 'error': 'Processo não encontrado.'},
+        ])
+        self.assertEqual(Processo.objects.get(pk=self.p1.pk).etapas_concluidas, 1)
+
+    def test_itens_invalidos_sao_listados_sem_impedir_os_validos(self):
+        dados = self._post({
+            'itens': [{'processo_id': 'abc', 'etapa': 'DFD'}, {'processo_id': self.p1.pk, 'etapa': 'INEXISTENTE'}, 'lixo'],
+            'etapa': 'ETP', 'processo_ids': [self.p2.pk],
+        }).json()
+        self.assertEqual(dados['salvas'], [{'processo_id': self.p2.pk, 'etapa': 'ETP'}])
+        self.assertEqual([item['error'] for item in dados['invalidos']],
+                         ['processo_id inválido.', 'Etapa inválida.', 'processo_id inválido.'])
+        self.assertEqual(Processo.objects.get(pk=self.p1.pk).etapas_concluidas, 0)
+
+    def test_nada_valido_nao_e_sucesso(self):
+        dados = self._post({'itens': [{'processo_id': 999999, 'etapa': 'DFD'}]}).json()
+        self.assertFalse(dados['success'])
+        self.assertEqual((dados['salvas'], dados['ja_salvas'], len(dados['invalidos'])), ([], [], 1))
+
+    @mock.patch('core.views.LIMITE_ETAPAS_LOTE', 2)
+    def test_limite_de_etapas_por_requisicao(self):
+        resposta = self._post({'etapa': 'DFD', 'processo_ids': [self.p1.pk, self.p2.pk, 999999]})
+        self.assertEqual(resposta.status_code, 400)
+        self.assertFalse(Processo.objects.filter(etapas_concluidas__gt=0).exists())
+        resposta = self._post({'etapa': 'DFD', 'processo_ids': [self.p1.pk, self.p2.pk]})
+        self.assertEqual((resposta.status_code, len(resposta.json()['salvas'])), (200, 2))
+
+    def test_corpo_invalido(self):
+        for corpo in ('{', '[]', {}, {'itens': []}):
+            with self.subTest(corpo=corpo):
+                self.assertEqual(self._post(corpo).status_code, 400)
+        self.assertEqual(self.client.get(reverse('salvar_etapas_lote'), secure=True).status_code, 405)
+
+
+class ProgressoEtapasTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        orgao = Orgao.objects.create(nome='Prefeitura', cnpj='11.222.333/0001-81', endereco='Rua A', email='a@example.com')
+        cls.p1, cls.p2, cls.p3 = [
+            Processo.objects.create(numero_processo=f'{i}/2025', orgao_responsavel=orgao, objeto='x', modalidade='PREGAO')
+            for i in (1, 2, 3)
+        ]
+
+    def _verificar(self):
+        saida = StringIO()
+        call_command('recalcular_progresso', '--verificar', stdout=saida)
+        return saida.getvalue()
+
+    def test_conclusao_individual_e_em_lote_mantem_o_resumo(self):
+        self.assertEqual(concluir_etapa(self.p1, 'DFD')[1], True)
+        self.assertEqual(concluir_etapa(self.p1, 'ETP')[1], True)
+        self.assertEqual(concluir_etapa(self.p1, 'DFD')[1], False)
+        novos, ja_concluidos = concluir_etapas_em_lote(
+            [(self.p1.pk, 'ETP'), (self.p2.pk, 'DFD'), (self.p2.pk, 'PUBLICACAO_AVISO'), (self.p3.pk, 'DFD')]
+        )
+        self.assertEqual((len(novos), ja_concluidos), (3, [(self.p1.pk, 'ETP')]))
+        self.assertFalse(divergentes(Processo.objects.all()).exists())
+        self.assertEqual(
+            dict(Processo.objects.values_list('numero_processo', 'etapas_concluidas')),
+            {'1/2025': 2, '2/2025': 2, '3/2025': 1},
+        )
+        self.assertEqual(Processo.objects.get(pk=self.p2.pk).status, 'PUBLICADO')
+        self.assertIn('0 processos com progresso divergente', self._verificar())
+
+    def test_verificar_acusa_e_comando_corrige_resumo_corrompido(self):
+        concluir_etapas_em_lote([(self.p1.pk, 'DFD'), (self.p2.pk, 'DFD')])
+        Processo.objects.filter(pk=self.p1.pk).update(etapas_mascara=0, etapas_concluidas=5)
+        HistoricoProcesso.objects.create(processo=self.p3, etapa='ETP')  # Gravado por fora de core/etapas.py
+        self.assertEqual(set(divergentes(Processo.objects.all()).values_list('pk', flat=True)), {self.p1.pk, self.p3.pk})
+
+        self.assertIn('2 processos com progresso divergente', self._verificar())
+        self.assertEqual(divergentes(Processo.objects.all()).count(), 2)  # --verificar não corrige
+
+        call_command('recalcular_progresso', stdout=StringIO())
+        self.assertFalse(divergentes(Processo.objects.all()).exists())
+        p1, p3 = Processo.objects.get(pk=self.p1.pk), Processo.objects.get(pk=self.p3.pk)
+        self.assertEqual((p1.etapas_mascara, p1.etapas_concluidas, p1.ultima_etapa), (BIT_ETAPA['DFD'], 1, 'DFD'))
+        self.assertEqual((p3.etapas_mascara, p3.etapas_concluidas, p3.ultima_etapa), (BIT_ETAPA['ETP'], 1, 'ETP'))
+        self.assertIn('0 processos com progresso divergente', self._verificar())
+
+
+class ResumoDashboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.prefeitura = Orgao.objects.create(nome='Prefeitura', cnpj='11.222.333/0001-81', endereco='Rua A', email='a@example.com')
+        cls.camara = Orgao.objects.create(nome='Câmara', cnpj='11.444.777/0001-61', endereco='Rua B', email='b@example.com')
+
+    def _processo(self, numero, orgao, modalidade='PREGAO', valor='100.00'):
+        return Processo.objects.create(numero_processo=numero, orgao_responsavel=orgao, objeto='x',
+                                       modalidade=modalidade, valor_estimado=Decimal(valor))
+
+    def assertResumoConfere(self):
+        """O resumo bate com o agregado dos processos, linha a linha e nos números do dashboard."""
+        self.assertEqual(divergencias(), [])
+        hoje = date.today()
+        dados = dados_dashboard(hoje)
+        processos = list(Processo.objects.select_related('orgao_responsavel'))
+        graficos = {nome: dict(zip(grafico['labels'], grafico['dados'])) for nome, grafico in dados['graficos'].items()}
+        self.assertEqual(dados['total_processos'], len(processos))
+        self.assertEqual(graficos['status'], Counter(p.get_status_display() for p in processos))
+        self.assertEqual(graficos['modalidade'], Counter(p.get_modalidade_display() for p in processos))
+        self.assertEqual(graficos['orgaos'], Counter(p.orgao_responsavel.nome for p in processos))
+        self.assertEqual(graficos['linha_do_tempo'][f'{hoje:%m/%Y}'], len(processos))  # Todos abertos hoje
+        self.assertEqual(dados['processos_homologados'], sum(p.status == 'HOMOLOGADO' for p in processos))
+
+    def test_resumo_acompanha_cada_gravacao(self):
+        p1 = self._processo('1/2025', self.prefeitura)
+        p2 = self._processo('2/2025', self.prefeitura, 'DISPENSA', '50.00')
+        p3 = self._processo('3/2025', self.camara)
+        self.assertResumoConfere()
+
+        p1.status = 'CANCELADO'
+        p1.save()
+        self.assertResumoConfere()
+
+        p2.orgao_responsavel = self.camara
+        p2.valor_estimado = Decimal('75.00')
+        p2.save()
+        self.assertResumoConfere()
+
+        p3.delete()
+        self.assertResumoConfere()
+
+        # Sem signals: aplicar_status e o queryset.update abaixo passam por mover_em_lote
+        concluir_etapas_em_lote([(p2.pk, 'PUBLICACAO_AVISO')])
+        self.assertEqual(Processo.objects.get(pk=p2.pk).status, 'PUBLICADO')
+        self.assertResumoConfere()
+
+        anteriores = list(Processo.objects.all())
+        Processo.objects.update(modalidade='CONCORRENCIA')
+        atuais = Processo.objects.in_bulk([p.pk for p in anteriores])
+        mover_em_lote([(estado_resumo(anterior), estado_resumo(atuais[anterior.pk])) for anterior in anteriores])
+        self.assertResumoConfere()
+
+    def test_reconstruir_resumo_dashboard(self):
+        for i in range(3):
+            self._processo(f'{i}/2025', (self.prefeitura, self.camara)[i % 2])
+        ResumoDashboard.objects.filter(orgao=self.prefeitura).update(quantidade=99)
+        ResumoDashboard.objects.filter(orgao=self.camara).delete()
+        self.assertEqual(len(divergencias()), 2)
+
+        saida = StringIO()
+        call_command('reconstruir_resumo_dashboard', '--verificar', stdout=saida)
+        self.assertIn('2 linhas do resumo divergentes dos processos.', saida.getvalue())
+        self.assertEqual(len(divergencias()), 2)  # --verificar não reconstrói
+
+        saida = StringIO()
+        call_command('reconstruir_resumo_dashboard', stdout=saida)
+        self.assertIn('Resumo reconstruído com 2 linhas.', saida.getvalue())
+        self.assertResumoConfere()
+
+
+class BuscaProcessosTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser('admin', 'admin@example.com', 'senha')
+        orgao = Orgao.objects.create(nome='Prefeitura', cnpj='11.222.333/0001-81', endereco='Rua A', email='a@example.com')
+        cls.combustivel, cls.merenda, cls.escritorio = [
+            Processo.objects.create(numero_processo=numero, orgao_responsavel=orgao, objeto=objeto,
+                                    justificativa=justificativa, modalidade='PREGAO')
+            for numero, objeto, justificativa in (
+                ('1/2025', 'Aquisição de combustível & lubrificantes para a frota', 'Frota parada'),
+                ('2/2025', 'Merenda escolar', 'Entrega com veículo movido a combustível'),
+                ('3/2025', 'Material de escritório', 'Reposição anual'),
+            )
+        ]
+
+    def _achados(self, texto):
+        return [resultado.processo.pk for resultado in buscar_processos(texto)[0]]
+
+    def test_sem_acentos_e_sem_diferenciar_maiusculas(self):
+        self.assertEqual(set(self._achados('combustivel')), {self.combustivel.pk, self.merenda.pk})
+        self.assertEqual(self._achados('AQUISICAO'), [self.combustivel.pk])
+        self.assertEqual(self._achados('escritorio'), [self.escritorio.pk])
+
+    def test_prefixo_e_todos_os_termos_obrigatorios(self):
+        self.assertEqual(self._achados('meren'), [self.merenda.pk])
+        self.assertEqual(self._achados('comb frot'), [self.combustivel.pk])
+        self.assertEqual(self._achados('comb escrit'), [])
+        self.assertEqual(self._achados('"  ( OR *'), [])  # Operadores digitados não chegam ao MATCH
+
+    def test_json_ordenado_por_relevancia_com_trecho(self):
+        self.client.force_login(self.usuario)
+        resposta = self.client.get(reverse('processo_busca'), {'q': 'combustivel', 'formato': 'json'}, secure=True)
+        resultados = resposta.json()['resultados']
+        # No objeto (peso 5) vale mais que na justificativa (peso 2)
+        self.assertEqual([r['id'] for r in resultados], [self.combustivel.pk, self.merenda.pk])
+        self.assertGreater(resultados[0]['relevancia'], resultados[1]['relevancia'])
+        self.assertIn('<mark>combustível</mark>', resultados[0]['trecho'])
+        self.assertIn('&amp; lubrificantes', resultados[0]['trecho'])  # Texto do processo escapado
+        self.assertFalse(resposta.json()['tem_mais'])
+
+    def test_indice_acompanha_processo_e_etp(self):
+        self.escritorio.objeto = 'Combustível de aviação'
+        self.escritorio.save()
+        self.assertIn(self.escritorio.pk, self._achados('aviacao'))
+        self.assertEqual(self._achados('escritorio'), [])
+
+        etp = ProcessoETP.objects.create(processo=self.merenda, etp_texto_levantamento_mercado='Cotação de pneus')
+        self.assertEqual(self._achados('pneus'), [self.merenda.pk])
+        etp.etp_texto_levantamento_mercado = 'Cotação de baterias'
+        etp.save()
+        self.assertEqual((self._achados('pneus'), self._achados('baterias')), ([], [self.merenda.pk]))
+        etp.delete()
+        self.assertEqual(self._achados('baterias'), [])
+        self.assertEqual(self._achados('merenda'), [self.merenda.pk])  # O processo continua indexado
+
+        self.combustivel.delete()
+        self.assertEqual(self._achados('lubrificantes'), [])
+
+    def test_busca_do_admin_usa_o_indice(self):
+        modelo_admin = admin.site._registry[Processo]
+        requisicao = RequestFactory().get('/admin/core/processo/', {'q': 'combustivel'})
+        requisicao.user = self.usuario
+        resultados, duplicados = modelo_admin.get_search_results(requisicao, Processo.objects.all(), 'combustivel')
+        self.assertEqual(set(resultados), {self.combustivel, self.merenda})
+        self.assertFalse(duplicados)
+        resultados, _ = modelo_admin.get_search_results(requisicao, Processo.objects.all(), '  ')
+        self.assertEqual(resultados.count(), 3)
+        self.client.force_login(self.usuario)
+        resposta = self.client.get('/admin/core/processo/', {'q': 'frota'}, secure=True)
+        self.assertEqual(list(resposta.context['cl'].result_list), [self.combustivel])
+
+
+def _pdf_com_textos(textos):
+    """PDF (bytes) com uma página por texto, escrito direto no fluxo de conteúdo da página."""
+    escritor = PdfWriter()
+    for texto in textos:
+        pagina = escritor.add_blank_page(width=595, height=842)
+        conteudo = DecodedStreamObject()
+        conteudo.set_data(f'BT 10 10 Td ({texto}) Tj ET'.encode())
+        pagina.replace_contents(conteudo)
+    saida = BytesIO()
+    escritor.write(saida)
+    return saida.getvalue()
+
+
+def _rodapes(html_string, estilo):
+    # Substitui core.pdf.renderizar_pdf (WeasyPrint) na numeração: uma <section> por página
+    total = html_string.count('<section>')
+    return _pdf_com_textos([f'Pagina {numero} de {total}' for numero in range(1, total + 1)])
+
+
+class JuntarPdfsTests(TestCase):
+    def _partes(self):
+        return [BytesIO(_pdf_com_textos(textos)) for textos in (['A1', 'A2'], ['B1'], ['C1', 'C2'])]
+
+    def _conteudos(self, arquivo):
+        return [pagina.get_contents().get_data() for pagina in PdfReader(arquivo).pages]
+
+    def test_junta_as_partes_em_ordem_sem_numeracao(self):
+        partes = self._partes()
+        with mock.patch('core.pdf.renderizar_pdf') as renderizar, juntar_pdfs(iter(partes)) as resultado:
+            conteudos = self._conteudos(resultado)
+        renderizar.assert_not_called()
+        self.assertEqual([conteudo.split(b'(')[1].split(b')')[0] for conteudo in conteudos],
+                         [b'A1', b'A2', b'B1', b'C1', b'C2'])
+        self.assertTrue(all(parte.closed for parte in partes))
+
+    def test_numeracao_continua_entre_as_partes(self):
+        with mock.patch('core.pdf.renderizar_pdf', side_effect=_rodapes) as renderizar:
+            with juntar_pdfs(self._partes(), 'numeracao_paisagem') as resultado:
+                conteudos = self._conteudos(resultado)
+        renderizar.assert_called_once_with('<section></section>' * 5, 'numeracao_paisagem')
+        self.assertEqual(len(conteudos), 5)
+        for numero, (conteudo, texto) in enumerate(zip(conteudos, (b'A1', b'A2', b'B1', b'C1', b'C2')), start=1):
+            # A página original e, por cima, o rodapé com a numeração do documento inteiro
+            self.assertIn(b'(' + texto + b')', conteudo)
+            self.assertIn(f'(Pagina {numero} de 5)'.encode(), conteudo)
+
+
+class AquecimentoPdfTests(TestCase):
+    def test_servidor_web_aquece_os_renderizadores(self):
+        for ligado in (True, False):
+            with self.subTest(ligado=ligado), override_settings(PDF_INICIAR_NO_SERVIDOR=ligado), \
+                    mock.patch('core.pdf.iniciar') as iniciar:
+                for modulo in ('config.wsgi', 'config.asgi'):
+                    sys.modules.pop(modulo, None)
+                    importlib.import_module(modulo)
+            self.assertEqual(iniciar.call_count, 2 if ligado else 0)
+
+    @override_settings(PDF_RENDERIZADORES=0)
+    def test_pool_herdado_por_fork_e_descartado(self):
+        herdado, ociosos = mock.Mock(), queue.Queue()
+        ociosos.put(herdado)
+        with mock.patch.object(pdf, '_renderizadores', [herdado]), mock.patch.object(pdf, '_ociosos', ociosos), \
+                mock.patch.object(pdf, '_dono', os.getpid() + 1):
+            pdf.iniciar()
+            self.assertEqual((pdf._renderizadores, pdf._dono), ([], os.getpid()))
+            self.assertTrue(pdf._ociosos.empty())
+        herdado.conexao.send.assert_not_called()  # Os Pipes do pai ficam intocados
@@ -15,6 +15,7 @@ urlpatterns = [
     
     # Processos
     path('processos/', views.processo_list, name='processo_list'),
+    path('processos/busca/', views.processo_busca, name='processo_busca'),
     path('processos/<int:pk>/', views.processo_detail, name='processo_detail'), 
     path('processos/novo/', views.processo_create, name='processo_create'),
     path('processos/<int:pk>/editar/', views.processo_update, name='processo_update'),
@@ -24,9 +25,11 @@ urlpatterns = [
     path('processos/<int:pk>/documentos/', views.processo_documentos, name='processo_documentos'),
     # ADICIONADA A URL FALTANTE (DO CHECKLIST):
     path('processos/salvar-etapa/', views.salvar_etapa_historico, name='salvar_etapa_historico'), # <--- URL FALTANTE
+    path('processos/salvar-etapas/', views.salvar_etapas_lote, name='salvar_etapas_lote'),
 
     # Relatórios
     path('relatorios/', views.relatorio_processos, name='relatorio_processos'), 
+    path('relatorios/tempos-etapas/', views.relatorio_tempos_etapas, name='relatorio_tempos_etapas'),
     path('relatorios/fases-excel/', views.relatorio_fases_excel, name='relatorio_fases_excel'),
     path('relatorios/fases-pdf/', views.relatorio_fases_pdf, name='relatorio_fases_pdf'),
     path('relatorios/exportar-csv/', views.exportar_processos_csv, name='exportar_processos_csv'), 
@@ -37,17 +40,29 @@ urlpatterns = [
     path('documentos/gerar-dfd/<int:processo_id>/', views.gerar_dfd, name='gerar_dfd'),
     path('documentos/gerar-etp/<int:processo_id>/', views.gerar_etp, name='gerar_etp'),
     path('documentos/gerar-tr/<int:processo_id>/', views.gerar_tr, name='gerar_tr'),
+    path('documentos/gerar-lote/', views.gerar_documentos_lote, name='gerar_documentos_lote'),
     path('documentos/download/<int:documento_id>/', views.download_documento, name='download_documento'),
 
+    # Importação em massa (CSV / XLSX)
+    path('importacao/', views.importar_cadastros, name='importar_cadastros'),
+    path('importacao/erros/<slug:relatorio>/', views.importacao_erros, name='importacao_erros'),
+
+    # Tarefas em segundo plano (geração assíncrona)
+    path('tarefas/nova/<str:tipo>/', views.tarefa_criar, name='tarefa_criar'),
+    path('tarefas/<int:pk>/status/', views.tarefa_status, name='tarefa_status'),
+    path('tarefas/<int:pk>/download/', views.tarefa_download, name='tarefa_download'),
+
     # ==== CRUD ÓRGÃOS ==== 
     path('orgaos/', views.orgao_list, name='orgao_list'), 
     path('orgaos/novo/', views.orgao_create, name='orgao_create'), 
+    path('orgaos/sugestoes/', views.orgao_sugestoes, name='orgao_sugestoes'),
     path('orgaos/<int:pk>/editar/', views.orgao_update, name='orgao_update'), 
     path('orgaos/<int:pk>/deletar/', views.orgao_delete, name='orgao_delete'), 
 
     # ==== CRUD FORNECEDORES ==== 
     path('fornecedores/', views.fornecedor_list, name='fornecedor_list'), 
     path('fornecedores/novo/', views.fornecedor_create, name='fornecedor_create'), 
+    path('fornecedores/sugestoes/', views.fornecedor_sugestoes, name='fornecedor_sugestoes'),
     path('fornecedores/<int:pk>/editar/', views.fornecedor_update, name='fornecedor_update'), 
     path('fornecedores/<int:pk>/deletar/', views.fornecedor_delete, name='fornecedor_delete'), 
 
@@ -56,4 +71,7 @@ urlpatterns = [
     path('responsaveis/novo/', views.responsavel_create, name='responsavel_create'), 
     path('responsaveis/<int:pk>/editar/', views.responsavel_update, name='responsavel_update'), 
     path('responsaveis/<int:pk>/deletar/', views.responsavel_delete, name='responsavel_delete'), 
+
+    # Métricas para o Prometheus (sem barra no fim, o caminho padrão dele)
+    path('metrics', views.metricas, name='metricas'),
 ]
\ No newline at end of file
@@ -1,78 +1,85 @@
 # Arquivo: core/views.py (COMPLETO E CORRIGIDO - Caminhos de Template de Auth)
 
 # --- Importações Nativas e do Django ---
-import os, io, locale, json, csv
+import os, io, re, locale, json, tempfile, uuid
 from datetime import date, datetime
 from django.shortcuts import render, redirect, get_object_or_404
-from django.db.models import Count
-from django.http import HttpResponse, JsonResponse, FileResponse
+from django.db import transaction
+from django.db.models import F
+from django.http import HttpResponse, JsonResponse, FileResponse, StreamingHttpResponse
 from django.conf import settings
 from django.views.decorators.csrf import csrf_exempt
-from django.template.loader import render_to_string
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
+from django.utils.crypto import constant_time_compare
 
 # --- Importações de Bibliotecas Externas ---
-from weasyprint import HTML
-from docxtpl import DocxTemplate, InlineImage
-from docx import Document as DocxDocument
-from docx.shared import Pt, RGBColor, Inches
-from docx.enum.text import WD_ALIGN_PARAGRAPH
-from num2words import num2words
-from decimal import Decimal, InvalidOperation
 import google.generativeai as genai
 
 # --- Importações do Projeto ---
 from .models import (
     Processo, Orgao, Secretaria, Fornecedor, 
-    Responsavel, HistoricoProcesso, Documento
+    Responsavel, HistoricoProcesso, Documento, TarefaGeracao, TempoEtapa, BIT_ETAPA
 )
 from .forms import (
     ProcessoForm, OrgaoForm, FornecedorForm, 
-    ResponsavelForm, ETPForm
+    ResponsavelForm, ETPForm, ETPProcessoForm, FiltroProcessosForm, ImportacaoForm
 )
+from .documentos import processos_para_documento, obter_documento
+from .relatorios import (
+    etapas_por_fase, renderizar_andamento_pdf,
+    renderizar_relatorio_processos_pdf, nome_arquivo_andamento, nome_arquivo_relatorio,
+    linhas_csv_processos, gravar_excel_fases, nome_arquivo_fases_excel,
+    renderizar_relatorio_fases_pdf, nome_arquivo_fases_pdf
+)
+from . import tarefas
+from .lote import gerar_zip, TIPOS_LOTE
+from .paginacao import paginar_keyset
+from .busca import buscar_processos
+from .etapas import concluir_etapa, concluir_etapas_em_lote
+from .status import salvar_com_versao, MENSAGEM_CONFLITO
+from .resumo import dados_dashboard
+from .cache import obter_ou_calcular
+from .analise import tempos_do_recorte, recortes_disponiveis, gargalo
+from .importacao import importar, gravar_relatorio_erros, PlanilhaInvalida
+from .normalizacao import somente_digitos, normalizar_nome, filtro_prefixo
+from .metricas import exposicao
 
 # ==============================================================================
 # FUNÇÃO AUXILIAR
 # ==============================================================================
-def _formata_moeda(valor):
-    if valor in (None, ""): 
-        return "Não informado"
-    try: 
-        v = Decimal(str(valor))
-    except (InvalidOperation, ValueError, TypeError): 
-        return "Não informado"
-    reais, centavos = int(v), int((v - int(v)) * 100)
-    reais_fmt = f"{reais:,d}".replace(",", ".")
-    return f"R$ {reais_fmt},{centavos:02d}"
+def _listar_paginado(request, queryset, ordenacao, template, template_linhas, nome_lista, contexto=None):
+    """
+    Renderiza uma listagem paginada por cursor. Com ?fragmento=1 devolve só as
+    linhas da tabela (botão "Carregar mais") e o próximo cursor no cabeçalho X-Proximo-Cursor.
+    """
+    pagina = paginar_keyset(queryset, ordenacao, request.GET.get('cursor'))
+    context = {nome_lista: pagina.itens, 'pagina': pagina, 'template_linhas': template_linhas}
+    if request.GET.get('fragmento'):
+        response = render(request, template_linhas, context)
+        response['X-Proximo-Cursor'] = pagina.proximo_cursor
+        return response
+    context.update(contexto or {})
+    return render(request, template, context)
 
 # ==============================================================================
 # VIEW DO DASHBOARD
 # ==============================================================================
 @login_required
 def dashboard(request):
-    total_processos = Processo.objects.count()
-    total_orgaos = Orgao.objects.count()
-    total_fornecedores = Fornecedor.objects.count()
-    processos_ativos = Processo.objects.filter(status__in=['FASE_INTERNA', 'PUBLICADO', 'AGUARDANDO_PROPOSTAS', 'EM_ANALISE']).count()
-    processos_homologados = Processo.objects.filter(status='HOMOLOGADO').count()
-    status_data = Processo.objects.values('status').annotate(count=Count('status')).order_by('status')
-    status_choices = dict(Processo.STATUS_CHOICES)
-    chart_labels = [status_choices.get(item['status'], item['status']) for item in status_data]
-    chart_data = [item['count'] for item in status_data]
-    atividades_recentes = HistoricoProcesso.objects.select_related('processo', 'processo__orgao_responsavel').order_by('-data_conclusao')[:5]
-    context = {
-        'total_processos': total_processos, 
-        'total_orgaos': total_orgaos, 
-        'total_fornecedores': total_fornecedores, 
-        'processos_ativos': processos_ativos, 
-        'processos_homologados': processos_homologados, 
-        'chart_labels': chart_labels, 
-        'chart_data': chart_data, 
-        'atividades_recentes': atividades_recentes
-    }
+    # Contagens e gráficos vêm do resumo agregado (core/resumo.py), guardados no cache
+    # até a próxima gravação de processo, histórico ou órgão (core/cache.py)
+    def calcular():
+        dados = dados_dashboard()
+        dados['total_orgaos'] = Orgao.objects.count()
+        dados['atividades_recentes'] = list(HistoricoProcesso.objects.select_related('processo', 'processo__orgao_responsavel').order_by('-data_conclusao')[:5])
+        return dados
+
+    context = obter_ou_calcular('dashboard', (Processo, HistoricoProcesso, Orgao), calcular, date.today())
+    context['total_fornecedores'] = Fornecedor.objects.count()
     return render(request, 'core/dashboard.html', context)
 
 # ==============================================================================
@@ -110,19 +117,54 @@ def register_view(request):
 # ==============================================================================
 # VIEWS DE PROCESSOS
 # ==============================================================================
+# Cada ordenação tem um índice correspondente em Processo.Meta.indexes
+ORDENACOES_PROCESSOS = {
+    'recentes': ('-data_abertura', '-id'),
+    'progresso': ('-etapas_concluidas', '-id'),
+}
+
 @login_required
 def processo_list(request):
-    processos = Processo.objects.select_related('orgao_responsavel', 'secretaria_responsavel').order_by('-data_abertura')
-    return render(request, 'core/processo_list.html', {'processos': processos})
+    processos = Processo.objects.select_related('orgao_responsavel', 'secretaria_responsavel')
+    ordem = request.GET.get('ordem') if request.GET.get('ordem') in ORDENACOES_PROCESSOS else 'recentes'
+    return _listar_paginado(
+        request, processos, ORDENACOES_PROCESSOS[ordem], 'core/processo_list.html', 'core/parciais/processo_linhas.html', 'processos',
+        {'ordem': ordem}
+    )
+
+@login_required
+def processo_busca(request):
+    termo = request.GET.get('q', '').strip()
+    try:
+        pagina = max(int(request.GET.get('pagina', 1)), 1)
+    except ValueError:
+        pagina = 1
+    resultados, tem_mais = buscar_processos(termo, pagina)
+
+    if request.GET.get('formato') == 'json':
+        return JsonResponse({
+            'q': termo,
+            'pagina': pagina,
+            'tem_mais': tem_mais,
+            'resultados': [{
+                'id': r.processo.pk,
+                'numero_processo': r.processo.numero_processo,
+                'objeto': r.processo.objeto,
+                'orgao': r.processo.orgao_responsavel.nome,
+                'status': r.processo.get_status_display(),
+                'trecho': r.trecho,
+                'relevancia': r.relevancia,
+                'url': reverse('processo_detail', args=[r.processo.pk]),
+            } for r in resultados],
+        })
+
+    context = {'q': termo, 'pagina': pagina, 'tem_mais': tem_mais, 'resultados': resultados}
+    return render(request, 'core/processo_busca.html', context)
 
 @login_required
 def processo_detail(request, pk):
     processo = get_object_or_404(Processo.objects.select_related('orgao_responsavel', 'secretaria_responsavel', 'responsavel_demanda'), pk=pk)
-    historico_qs = HistoricoProcesso.objects.filter(processo=processo)
-    etapas_concluidas_dict = {item.etapa: item.data_conclusao for item in historico_qs}
-    todas_etapas = HistoricoProcesso.ETAPAS_CHOICES
-    fase_interna_etapas = [{'key': key, 'name': name, 'date': etapas_concluidas_dict.get(key)} for key, name in todas_etapas[:12]]
-    fase_externa_etapas = [{'key': key, 'name': name, 'date': etapas_concluidas_dict.get(key)} for key, name in todas_etapas[12:]]
+    fase_interna_etapas, fase_externa_etapas = etapas_por_fase(processo)
     context = {
         'processo': processo, 
         'fase_interna_etapas': fase_interna_etapas, 
@@ -152,8 +194,9 @@ def processo_update(request, pk):
     if request.method == 'POST':
         form = ProcessoForm(request.POST, instance=processo)
         if form.is_valid():
-            form.save()
-            return redirect('processo_list')
+            if salvar_com_versao(form, form.cleaned_data['versao']):
+                return redirect('processo_list')
+            form.add_error(None, MENSAGEM_CONFLITO)
     else:
         form = ProcessoForm(instance=processo)
     return render(request, 'core/processo_form.html', {'form': form, 'titulo': 'Editar Processo'})
@@ -168,16 +211,25 @@ def processo_delete(request, pk):
 
 @login_required
 def processo_etp_form(request, pk):
-    processo = get_object_or_404(Processo, pk=pk)
+    processo = get_object_or_404(Processo.objects.select_related('etp'), pk=pk)
+    etp = processo.get_etp()
     if request.method == 'POST':
-        form = ETPForm(request.POST, instance=processo)
-        if form.is_valid():
-            form.save()
-            return redirect('processo_detail', pk=processo.pk)
+        form_processo = ETPProcessoForm(request.POST, instance=processo)
+        form = ETPForm(request.POST, instance=etp)
+        if form_processo.is_valid() and form.is_valid():
+            with transaction.atomic():
+                salvo = salvar_com_versao(form_processo, form_processo.cleaned_data['versao'])
+                if salvo:
+                    form.save()
+            if salvo:
+                return redirect('processo_detail', pk=processo.pk)
+            form_processo.add_error(None, MENSAGEM_CONFLITO)
     else:
-        form = ETPForm(instance=processo)
+        form_processo = ETPProcessoForm(instance=processo)
+        form = ETPForm(instance=etp)
     context = {
         'form': form, 
+        'form_processo': form_processo,
         'processo': processo, 
         'titulo': 'Estudo Técnico Preliminar (ETP)'
     }
@@ -188,394 +240,54 @@ def processo_etp_form(request, pk):
 def documentos_list(request):
     """Lista todos os documentos gerados"""
     documentos = Documento.objects.all().select_related('processo')
-    processos = Processo.objects.all()
-    
-    context = {
-        'documentos': documentos,
-        'processos': processos,
-    }
-    return render(request, 'core/documentos_list.html', context)
+    # O processo do modal "Gerar Novo Documento" é escolhido pela busca (processo_busca?formato=json)
+    return _listar_paginado(
+        request, documentos, ('-data_geracao', '-id'), 'core/documentos_list.html', 'core/parciais/documento_linhas.html',
+        'documentos'
+    )
 
-@login_required
-def gerar_dfd(request, processo_id):
-    """Gera o Documento de Formalização da Demanda"""
-    processo = get_object_or_404(Processo, pk=processo_id)
-    
-    # Criar documento Word
-    doc = DocxDocument()
-    
-    # Configurar margens
-    sections = doc.sections
-    for section in sections:
-        section.top_margin = Inches(1)
-        section.bottom_margin = Inches(1)
-        section.left_margin = Inches(1)
-        section.right_margin = Inches(1)
+def _responder_documento(request, processo_id, tipo, mensagem):
+    processo = get_object_or_404(processos_para_documento(tipo), pk=processo_id)
+    documento, gerado = obter_documento(processo, tipo, request.user.username)
     
-    # Título
-    titulo = doc.add_heading('DOCUMENTO DE FORMALIZAÇÃO DA DEMANDA (DFD)', 0)
-    titulo.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    
-    # Informações do Órgão
-    doc.add_paragraph()
-    p = doc.add_paragraph()
-    p.add_run('Órgão: ').bold = True
-    p.add_run(processo.orgao_responsavel.nome)
-    
-    if processo.secretaria_responsavel:
-        p = doc.add_paragraph()
-        p.add_run('Unidade Requisitante: ').bold = True
-        p.add_run(processo.secretaria_responsavel.nome)
-    
-    p = doc.add_paragraph()
-    p.add_run('Processo nº: ').bold = True
-    p.add_run(processo.numero_processo)
-    
-    p = doc.add_paragraph()
-    p.add_run('Data: ').bold = True
-    p.add_run(datetime.now().strftime('%d/%m/%Y'))
-    
-    # 1. Descrição da Necessidade
-    doc.add_heading('1. DESCRIÇÃO DA NECESSIDADE', 1)
-    doc.add_paragraph(processo.justificativa or 'A ser preenchido.')
-    
-    # 2. Objeto da Contratação
-    doc.add_heading('2. OBJETO DA CONTRATAÇÃO', 1)
-    doc.add_paragraph(processo.descricao_detalhada_objeto or processo.objeto)
-    
-    # 3. Modalidade Sugerida
-    doc.add_heading('3. MODALIDADE SUGERIDA', 1)
-    doc.add_paragraph(f'{processo.get_modalidade_display()}')
-    
-    # 4. Valor Estimado
-    doc.add_heading('4. VALOR ESTIMADO', 1)
-    if processo.valor_estimado:
-        doc.add_paragraph(f'R$ {processo.valor_estimado:,.2f}'.replace(',', 'X').replace('.', ',').replace('X', '.'))
-    else:
-        doc.add_paragraph('A ser definido após pesquisa de preços.')
-    
-    # 5. Justificativa
-    doc.add_heading('5. JUSTIFICATIVA DA CONTRATAÇÃO', 1)
-    doc.add_paragraph(processo.etp_justificativa_contratacao or 'A contratação se faz necessária para atender as demandas do órgão.')
-    
-    # 6. Responsável pela Demanda
-    doc.add_heading('6. RESPONSÁVEL PELA DEMANDA', 1)
-    if processo.responsavel_demanda:
-        doc.add_paragraph(f'Nome: {processo.responsavel_demanda.nome}')
-        doc.add_paragraph(f'Cargo: {processo.responsavel_demanda.cargo}')
-        doc.add_paragraph(f'Matrícula: {processo.responsavel_demanda.matricula}')
+    if gerado:
+        messages.success(request, mensagem)
     else:
-        doc.add_paragraph('A ser definido.')
-    
-    # Assinatura
-    doc.add_paragraph()
-    doc.add_paragraph()
-    doc.add_paragraph('_' * 50)
-    doc.add_paragraph('Assinatura do Responsável')
-    
-    # Salvar documento
-    filename = f'DFD_{processo.numero_processo.replace("/", "-")}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.docx'
-    filepath = os.path.join(settings.MEDIA_ROOT, 'documentos', filename)
-    
-    # Criar diretório se não existir
-    os.makedirs(os.path.dirname(filepath), exist_ok=True)
-    
-    doc.save(filepath)
-    
-    # Salvar registro no banco
-    documento = Documento.objects.create(
-        processo=processo,
-        tipo='DFD',
-        arquivo=f'documentos/{filename}',
-        gerado_por=request.user.username
-    )
-    
-    messages.success(request, f'DFD gerado com sucesso!')
+        messages.info(request, 'Nenhuma alteração desde a última geração: o documento existente foi reaproveitado.')
     
     # Retornar arquivo para download
-    return FileResponse(open(filepath, 'rb'), as_attachment=True, filename=filename)
+    filepath = os.path.join(settings.MEDIA_ROOT, str(documento.arquivo))
+    return FileResponse(open(filepath, 'rb'), as_attachment=True, filename=os.path.basename(filepath))
+
+@login_required
+def gerar_dfd(request, processo_id):
+    """Gera o Documento de Formalização da Demanda"""
+    return _responder_documento(request, processo_id, 'DFD', 'DFD gerado com sucesso!')
 
 @login_required
 def gerar_etp(request, processo_id):
     """Gera o Estudo Técnico Preliminar"""
-    processo = get_object_or_404(Processo, pk=processo_id)
-    
-    # Criar documento Word
-    doc = DocxDocument()
-    
-    # Configurar margens
-    sections = doc.sections
-    for section in sections:
-        section.top_margin = Inches(1)
-        section.bottom_margin = Inches(1)
-        section.left_margin = Inches(1)
-        section.right_margin = Inches(1)
-    
-    # Título
-    titulo = doc.add_heading('ESTUDO TÉCNICO PRELIMINAR (ETP)', 0)
-    titulo.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    
-    # Subtítulo
-    subtitulo = doc.add_heading('Conforme Art. 18, §1º da Lei 14.133/2021', 2)
-    subtitulo.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    
-    # Informações do Órgão
-    doc.add_paragraph()
-    p = doc.add_paragraph()
-    p.add_run('Órgão: ').bold = True
-    p.add_run(processo.orgao_responsavel.nome)
-    
-    p = doc.add_paragraph()
-    p.add_run('Processo nº: ').bold = True
-    p.add_run(processo.numero_processo)
-    
-    p = doc.add_paragraph()
-    p.add_run('Data: ').bold = True
-    p.add_run(datetime.now().strftime('%d/%m/%Y'))
-    
-    # 1. Descrição da Necessidade
-    doc.add_heading('1. DESCRIÇÃO DA NECESSIDADE', 1)
-    doc.add_paragraph(processo.justificativa or 'A ser preenchido.')
-    
-    # 2. Previsão no PCA
-    doc.add_heading('2. PREVISÃO NO PLANO DE CONTRATAÇÕES ANUAL (PCA)', 1)
-    doc.add_paragraph(processo.etp_pca_texto)
-    
-    # 3. Descrição dos Requisitos da Contratação
-    doc.add_heading('3. DESCRIÇÃO DOS REQUISITOS DA CONTRATAÇÃO', 1)
-    doc.add_heading('3.1. Objeto da Contratação', 2)
-    doc.add_paragraph(processo.descricao_detalhada_objeto or processo.objeto)
-    
-    if processo.etp_requisitos_tecnicos_detalhe:
-        doc.add_heading('3.2. Requisitos Técnicos', 2)
-        doc.add_paragraph(processo.etp_requisitos_tecnicos_detalhe)
-    
-    # 4. Levantamento de Mercado
-    doc.add_heading('4. LEVANTAMENTO DE MERCADO', 1)
-    doc.add_paragraph(processo.etp_texto_levantamento_mercado)
-    
-    # 5. Estimativa das Quantidades
-    doc.add_heading('5. ESTIMATIVA DAS QUANTIDADES', 1)
-    doc.add_paragraph(processo.etp_texto_estimativa_quantidades)
-    
-    # 6. Estimativa de Preços
-    doc.add_heading('6. ESTIMATIVA DE PREÇOS', 1)
-    if processo.valor_estimado:
-        doc.add_paragraph(f'Valor Estimado Total: R$ {processo.valor_estimado:,.2f}'.replace(',', 'X').replace('.', ',').replace('X', '.'))
-    if processo.etp_estimativa_metodologia:
-        doc.add_paragraph(f'Metodologia: {processo.etp_estimativa_metodologia}')
-    
-    # 7. Descrição da Solução
-    doc.add_heading('7. DESCRIÇÃO DA SOLUÇÃO COMO UM TODO', 1)
-    doc.add_paragraph(processo.etp_descricao_solucao_texto)
-    
-    # 8. Justificativa para Parcelamento
-    doc.add_heading('8. JUSTIFICATIVA PARA PARCELAMENTO OU NÃO DA SOLUÇÃO', 1)
-    doc.add_paragraph(processo.etp_justificativa_parcelamento_texto)
-    
-    # 9. Contratações Correlatas
-    doc.add_heading('9. CONTRATAÇÕES CORRELATAS E/OU INTERDEPENDENTES', 1)
-    doc.add_paragraph(processo.etp_contratacoes_correlatas_texto)
-    
-    # 10. Alinhamento Estratégico
-    doc.add_heading('10. ALINHAMENTO AO PLANEJAMENTO', 1)
-    doc.add_paragraph(processo.etp_alinhamento_estrategico_texto or 'A contratação está alinhada com os objetivos estratégicos do órgão.')
-    
-    # 11. Resultados Pretendidos
-    doc.add_heading('11. DEMONSTRATIVO DOS RESULTADOS PRETENDIDOS', 1)
-    doc.add_paragraph(processo.etp_resultados_pretendidos_texto)
-    
-    # 12. Providências
-    doc.add_heading('12. PROVIDÊNCIAS A SEREM ADOTADAS', 1)
-    doc.add_paragraph(processo.etp_providencias_texto)
-    
-    # 13. Impactos Ambientais
-    doc.add_heading('13. POSSÍVEIS IMPACTOS AMBIENTAIS', 1)
-    doc.add_paragraph(processo.etp_impactos_ambientais_texto)
-    
-    # 14. Modalidade e Critério de Julgamento
-    doc.add_heading('14. MODALIDADE E CRITÉRIO DE JULGAMENTO', 1)
-    doc.add_paragraph(f'Modalidade: {processo.get_modalidade_display()}')
-    if processo.etp_criterio_julgamento:
-        doc.add_paragraph(f'Critério de Julgamento: {processo.get_etp_criterio_julgamento_display()}')
-    if processo.etp_justificativa_modalidade_criterio:
-        doc.add_paragraph(f'Justificativa: {processo.etp_justificativa_modalidade_criterio}')
-    
-    # 15. Prazo e Vigência
-    doc.add_heading('15. PRAZO DE EXECUÇÃO E VIGÊNCIA CONTRATUAL', 1)
-    if processo.vigencia_meses:
-        doc.add_paragraph(f'Vigência: {processo.vigencia_meses} meses')
-    if processo.etp_justificativa_prazo:
-        doc.add_paragraph(f'Justificativa: {processo.etp_justificativa_prazo}')
-    
-    # 16. Dotação Orçamentária
-    doc.add_heading('16. DOTAÇÃO ORÇAMENTÁRIA', 1)
-    if processo.etp_dotacao_programa_trabalho:
-        doc.add_paragraph(f'Programa de Trabalho: {processo.etp_dotacao_programa_trabalho}')
-    if processo.etp_dotacao_natureza_despesa:
-        doc.add_paragraph(f'Natureza da Despesa: {processo.etp_dotacao_natureza_despesa}')
-    if processo.etp_dotacao_fonte_recursos:
-        doc.add_paragraph(f'Fonte de Recursos: {processo.etp_dotacao_fonte_recursos}')
-    
-    # Assinatura
-    doc.add_paragraph()
-    doc.add_paragraph()
-    doc.add_paragraph('_' * 50)
-    if processo.etp_responsavel_elaboracao:
-        doc.add_paragraph(f'{processo.etp_responsavel_elaboracao.nome}')
-        doc.add_paragraph(f'{processo.etp_responsavel_elaboracao.cargo}')
-    else:
-        doc.add_paragraph('Responsável pela Elaboração')
-    
-    # Salvar documento
-    filename = f'ETP_{processo.numero_processo.replace("/", "-")}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.docx'
-    filepath = os.path.join(settings.MEDIA_ROOT, 'documentos', filename)
-    
-    # Criar diretório se não existir
-    os.makedirs(os.path.dirname(filepath), exist_ok=True)
-    
-    doc.save(filepath)
-    
-    # Salvar registro no banco
-    documento = Documento.objects.create(
-        processo=processo,
-        tipo='ETP',
-        arquivo=f'documentos/{filename}',
-        gerado_por=request.user.username
-    )
-    
-    messages.success(request, f'ETP gerado com sucesso!')
-    
-    # Retornar arquivo para download
-    return FileResponse(open(filepath, 'rb'), as_attachment=True, filename=filename)
+    return _responder_documento(request, processo_id, 'ETP', 'ETP gerado com sucesso!')
 
 @login_required
 def gerar_tr(request, processo_id):
     """Gera o Termo de Referência"""
-    processo = get_object_or_404(Processo, pk=processo_id)
-    
-    # Criar documento Word
-    doc = DocxDocument()
-    
-    # Configurar margens
-    sections = doc.sections
-    for section in sections:
-        section.top_margin = Inches(1)
-        section.bottom_margin = Inches(1)
-        section.left_margin = Inches(1)
-        section.right_margin = Inches(1)
-    
-    # Título
-    titulo = doc.add_heading('TERMO DE REFERÊNCIA', 0)
-    titulo.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    
-    # Informações do Órgão
-    doc.add_paragraph()
-    p = doc.add_paragraph()
-    p.add_run('Órgão: ').bold = True
-    p.add_run(processo.orgao_responsavel.nome)
-    
-    p = doc.add_paragraph()
-    p.add_run('Processo nº: ').bold = True
-    p.add_run(processo.numero_processo)
-    
-    p = doc.add_paragraph()
-    p.add_run('Data: ').bold = True
-    p.add_run(datetime.now().strftime('%d/%m/%Y'))
-    
-    # 1. Objeto
-    doc.add_heading('1. DO OBJETO', 1)
-    doc.add_paragraph(processo.descricao_detalhada_objeto or processo.objeto)
-    
-    # 2. Justificativa
-    doc.add_heading('2. DA JUSTIFICATIVA', 1)
-    doc.add_paragraph(processo.etp_justificativa_contratacao or processo.justificativa)
-    
-    # 3. Especificações Técnicas
-    doc.add_heading('3. DAS ESPECIFICAÇÕES TÉCNICAS', 1)
-    doc.add_paragraph(processo.etp_requisitos_tecnicos_detalhe or 'Conforme especificações detalhadas no anexo.')
-    
-    # 4. Quantitativos
-    doc.add_heading('4. DOS QUANTITATIVOS', 1)
-    doc.add_paragraph(processo.etp_texto_estimativa_quantidades)
-    
-    # 5. Valor Estimado
-    doc.add_heading('5. DO VALOR ESTIMADO', 1)
-    if processo.valor_estimado:
-        doc.add_paragraph(f'O valor estimado para esta contratação é de R$ {processo.valor_estimado:,.2f}'.replace(',', 'X').replace('.', ',').replace('X', '.'))
-    
-    # 6. Prazo e Local de Entrega
-    doc.add_heading('6. DO PRAZO E LOCAL DE ENTREGA', 1)
-    doc.add_paragraph('Os produtos/serviços deverão ser entregues conforme cronograma estabelecido no edital.')
-    
-    # 7. Condições de Pagamento
-    doc.add_heading('7. DAS CONDIÇÕES DE PAGAMENTO', 1)
-    doc.add_paragraph('O pagamento será efetuado em até 30 (trinta) dias após a entrega e aceitação dos produtos/serviços.')
-    
-    # 8. Obrigações da Contratada
-    doc.add_heading('8. DAS OBRIGAÇÕES DA CONTRATADA', 1)
-    doc.add_paragraph('A contratada deverá:')
-    doc.add_paragraph('a) Fornecer os produtos/serviços conforme especificações;', style='List Bullet')
-    doc.add_paragraph('b) Responsabilizar-se por todos os encargos;', style='List Bullet')
-    doc.add_paragraph('c) Manter durante toda a execução as condições de habilitação.', style='List Bullet')
-    
-    # 9. Obrigações da Contratante
-    doc.add_heading('9. DAS OBRIGAÇÕES DA CONTRATANTE', 1)
-    doc.add_paragraph('A contratante deverá:')
-    doc.add_paragraph('a) Efetuar o pagamento nas condições estabelecidas;', style='List Bullet')
-    doc.add_paragraph('b) Fiscalizar a execução do contrato;', style='List Bullet')
-    doc.add_paragraph('c) Notificar a contratada sobre irregularidades.', style='List Bullet')
-    
-    # 10. Fiscalização
-    doc.add_heading('10. DA FISCALIZAÇÃO', 1)
-    if processo.etp_fiscal_tecnico:
-        doc.add_paragraph(f'Fiscal Técnico: {processo.etp_fiscal_tecnico}')
-    if processo.etp_fiscal_administrativo:
-        doc.add_paragraph(f'Fiscal Administrativo: {processo.etp_fiscal_administrativo}')
-    if processo.etp_gestor_contrato:
-        doc.add_paragraph(f'Gestor do Contrato: {processo.etp_gestor_contrato}')
-    
-    # 11. Vigência
-    doc.add_heading('11. DA VIGÊNCIA', 1)
-    if processo.vigencia_meses:
-        doc.add_paragraph(f'O contrato terá vigência de {processo.vigencia_meses} meses, contados da data de sua assinatura.')
-    
-    # 12. Dotação Orçamentária
-    doc.add_heading('12. DA DOTAÇÃO ORÇAMENTÁRIA', 1)
-    if processo.etp_dotacao_programa_trabalho:
-        doc.add_paragraph(f'Programa de Trabalho: {processo.etp_dotacao_programa_trabalho}')
-    if processo.etp_dotacao_natureza_despesa:
-        doc.add_paragraph(f'Natureza da Despesa: {processo.etp_dotacao_natureza_despesa}')
-    if processo.etp_dotacao_fonte_recursos:
-        doc.add_paragraph(f'Fonte de Recursos: {processo.etp_dotacao_fonte_recursos}')
-    
-    # Assinatura
-    doc.add_paragraph()
-    doc.add_paragraph()
-    doc.add_paragraph('_' * 50)
-    doc.add_paragraph('Responsável Técnico')
-    
-    # Salvar documento
-    filename = f'TR_{processo.numero_processo.replace("/", "-")}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.docx'
-    filepath = os.path.join(settings.MEDIA_ROOT, 'documentos', filename)
-    
-    # Criar diretório se não existir
-    os.makedirs(os.path.dirname(filepath), exist_ok=True)
-    
-    doc.save(filepath)
-    
-    # Salvar registro no banco
-    documento = Documento.objects.create(
-        processo=processo,
-        tipo='TR',
-        arquivo=f'documentos/{filename}',
-        gerado_por=request.user.username
-    )
+    return _responder_documento(request, processo_id, 'TR', 'Termo de Referência gerado com sucesso!')
+
+@login_required
+def gerar_documentos_lote(request):
+    """Gera DFD/ETP/TR de todos os processos filtrados (mesmos filtros do relatório) em um único ZIP"""
+    resultados = FiltroProcessosForm(request.GET).filtrar(Processo.objects.order_by('-data_abertura'))
+    processo_ids = list(resultados.values_list('pk', flat=True)[:settings.REPORT_MAX_RECORDS])
+    tipos = [tipo for tipo in request.GET.getlist('tipo') if tipo in TIPOS_LOTE] or list(TIPOS_LOTE)
     
-    messages.success(request, f'Termo de Referência gerado com sucesso!')
+    if not processo_ids:
+        messages.warning(request, 'Nenhum processo encontrado para os filtros aplicados.')
+        return redirect(f"{reverse('relatorio_processos')}?{request.GET.urlencode()}")
     
-    # Retornar arquivo para download
-    return FileResponse(open(filepath, 'rb'), as_attachment=True, filename=filename)
+    response = StreamingHttpResponse(gerar_zip(processo_ids, tipos, request.user.username), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="documentos_{date.today().strftime("%Y-%m-%d")}.zip"'
+    return response
 
 @login_required
 def download_documento(request, documento_id):
@@ -589,6 +301,47 @@ def download_documento(request, documento_id):
         messages.error(request, 'Arquivo não encontrado.')
         return redirect('documentos_list')
 
+# ==============================================================================
+# IMPORTAÇÃO EM MASSA (CSV / XLSX)
+# ==============================================================================
+PASTA_IMPORTACOES = 'importacoes'
+ERROS_EXIBIDOS = 50
+
+@login_required
+def importar_cadastros(request):
+    resultado = relatorio_erros = None
+    if request.method == 'POST':
+        form = ImportacaoForm(request.POST, request.FILES)
+        if form.is_valid():
+            arquivo = form.cleaned_data['arquivo']
+            try:
+                resultado = importar(form.cleaned_data['tipo'], arquivo.file, arquivo.name)
+            except PlanilhaInvalida as e:
+                form.add_error('arquivo', str(e))
+            if resultado and resultado.erros:
+                # Relatório completo em disco; a tela mostra só os primeiros erros
+                relatorio_erros = uuid.uuid4().hex
+                pasta = os.path.join(settings.MEDIA_ROOT, PASTA_IMPORTACOES)
+                os.makedirs(pasta, exist_ok=True)
+                with open(os.path.join(pasta, f'{relatorio_erros}.csv'), 'w', encoding='utf-8-sig', newline='') as destino:
+                    gravar_relatorio_erros(resultado, destino)
+    else:
+        form = ImportacaoForm()
+    return render(request, 'core/importacao.html', {
+        'form': form,
+        'resultado': resultado,
+        'erros': sorted(resultado.erros)[:ERROS_EXIBIDOS] if resultado else [],
+        'relatorio_erros': relatorio_erros,
+    })
+
+@login_required
+def importacao_erros(request, relatorio):
+    filepath = os.path.join(settings.MEDIA_ROOT, PASTA_IMPORTACOES, f'{relatorio}.csv')
+    if not os.path.exists(filepath):
+        messages.error(request, 'Relatório de erros não encontrado.')
+        return redirect('importar_cadastros')
+    return FileResponse(open(filepath, 'rb'), as_attachment=True, filename='erros_importacao.csv')
+
 # ==== (FIM) CÓDIGO MESCLADO DO 'views 1.txt' ====
 
 
@@ -596,23 +349,65 @@ def download_documento(request, documento_id):
 @login_required
 def exportar_andamento_pdf(request, pk):
     processo = get_object_or_404(Processo.objects.select_related('orgao_responsavel'), pk=pk)
-    historico_qs = HistoricoProcesso.objects.filter(processo=processo)
-    etapas_concluidas_dict = {item.etapa: item.data_conclusao for item in historico_qs}
-    todas_etapas = HistoricoProcesso.ETAPAS_CHOICES
-    fase_interna_etapas = [{'key': key, 'name': name, 'date': etapas_concluidas_dict.get(key)} for key, name in todas_etapas[:12]]
-    fase_externa_etapas = [{'key': key, 'name': name, 'date': etapas_concluidas_dict.get(key)} for key, name in todas_etapas[12:]]
-    context = {
-        'processo': processo, 
-        'fase_interna_etapas': fase_interna_etapas, 
-        'fase_externa_etapas': fase_externa_etapas, 
-        'data_hoje': date.today().strftime("%d/%m/%Y")
-    }
-    html_string = render_to_string('core/processo_andamento_pdf.html', context)
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="andamento_processo_{processo.numero_processo}.pdf"'
-    HTML(string=html_string).write_pdf(response)
+    response = HttpResponse(renderizar_andamento_pdf(processo), content_type='application/pdf')
+    response['Content-Disposition'] = f'attachment; filename="{nome_arquivo_andamento(processo)}"'
     return response
 
+# ==============================================================================
+# VIEWS DE TAREFAS EM SEGUNDO PLANO
+# ==============================================================================
+@login_required
+def tarefa_criar(request, tipo):
+    """
+    Enfileira a geração de um documento/relatório e devolve a URL de acompanhamento.
+    Documentos e andamento recebem `processo_id`; o relatório usa os filtros da query string.
+    """
+    if request.method != 'POST': 
+        return JsonResponse({'error': 'Método não permitido'}, status=405)
+    if tipo not in dict(TarefaGeracao.TIPO_CHOICES):
+        return JsonResponse({'error': 'Tipo de tarefa inválido.'}, status=400)
+    
+    processo = None
+    parametros = {}
+    if tipo == 'RELATORIO_PDF':
+        parametros = request.GET.dict()
+    else:
+        processo = get_object_or_404(Processo, pk=request.POST.get('processo_id') or request.GET.get('processo_id'))
+    
+    tarefa = tarefas.enfileirar(tipo, request.user.username, processo=processo, parametros=parametros)
+    return JsonResponse({
+        'id': tarefa.pk,
+        'status': tarefa.status,
+        'status_url': reverse('tarefa_status', args=[tarefa.pk]),
+    }, status=202)
+
+@login_required
+def tarefa_status(request, pk):
+    tarefa = get_object_or_404(TarefaGeracao, pk=pk, solicitado_por=request.user.username)
+    data = {
+        'id': tarefa.pk,
+        'tipo': tarefa.tipo,
+        'status': tarefa.status,
+        'status_display': tarefa.get_status_display(),
+        'progresso': tarefa.progresso,
+    }
+    if tarefa.status == 'CONCLUIDA':
+        data['download_url'] = reverse('tarefa_download', args=[tarefa.pk])
+    elif tarefa.status == 'ERRO':
+        data['erro'] = tarefa.erro
+    return JsonResponse(data)
+
+@login_required
+def tarefa_download(request, pk):
+    tarefa = get_object_or_404(TarefaGeracao, pk=pk, solicitado_por=request.user.username, status='CONCLUIDA')
+    filepath = tarefas.caminho_arquivo(tarefa)
+    
+    if os.path.exists(filepath):
+        return FileResponse(open(filepath, 'rb'), as_attachment=True, filename=os.path.basename(filepath))
+    else:
+        messages.error(request, 'Arquivo não encontrado.')
+        return redirect('documentos_list')
+
 # --- VIEW DA IA ---
 @csrf_exempt
 def generate_etp_justificativa_ia(request):
@@ -642,48 +437,83 @@ def salvar_etapa_historico(request):
         processo_id = data.get('processo_id')
         etapa_key = data.get('etapa')
         processo = get_object_or_404(Processo, pk=processo_id)
-        historico, created = HistoricoProcesso.objects.get_or_create(processo=processo, etapa=etapa_key)
+        if etapa_key not in BIT_ETAPA:
+            return JsonResponse({'success': False, 'error': 'Etapa inválida.'}, status=400)
+        historico, created = concluir_etapa(processo, etapa_key)
         if created:
-            if etapa_key == 'PUBLICACAO_AVISO': 
-                processo.status = 'PUBLICADO'
-                processo.save()
-            elif etapa_key == 'HOMOLOGACAO': 
-                processo.status = 'HOMOLOGADO'
-                processo.save()
             return JsonResponse({'success': True, 'message': 'Etapa salva com sucesso.'})
         else:
             return JsonResponse({'success': False, 'message': 'Etapa já havia sido salva.'})
     except Exception as e:
         return JsonResponse({'success': False, 'error': str(e)}, status=400)
 
+LIMITE_ETAPAS_LOTE = 1000
+
+@login_required
+def salvar_etapas_lote(request):
+    """
+    Conclui várias etapas de uma vez. Corpo JSON: {"itens": [{"processo_id": 1, "etapa": "..."}, ...]}
+    ou, para a mesma etapa em vários processos, {"etapa": "...", "processo_ids": [1, 2, ...]}.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Método não permitido'}, status=405)
+    try:
+        data = json.loads(request.body)
+        itens = list(data.get('itens') or [])
+        itens += [{'processo_id': pk, 'etapa': data.get('etapa')} for pk in data.get('processo_ids') or []]
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'success': False, 'error': 'JSON inválido.'}, status=400)
+    if not itens:
+        return JsonResponse({'success': False, 'error': 'Nenhuma etapa informada.'}, status=400)
+    if len(itens) > LIMITE_ETAPAS_LOTE:
+        return JsonResponse({'success': False, 'error': f'No máximo {LIMITE_ETAPAS_LOTE} etapas por requisição.'}, status=400)
+
+    pares, invalidos = [], []
+    for item in itens:
+        try:
+            par = (int(item.get('processo_id')), item.get('etapa'))
+        except (TypeError, ValueError, AttributeError):
+            invalidos.append({'item': item, 'error': 'processo_id inválido.'})
+            continue
+        if par[1] not in BIT_ETAPA:
+            invalidos.append({'item': item, 'error': 'Etapa inválida.'})
+        else:
+            pares.append(par)
+
+    salvas, ja_salvas = concluir_etapas_em_lote(pares)
+    encontrados = set(salvas) | set(ja_salvas)
+    invalidos += [{'item': {'processo_id': pk, 'etapa': etapa}, 'error': 'Processo não encontrado.'}
+                  for pk, etapa in dict.fromkeys(pares) if (pk, etapa) not in encontrados]
+    return JsonResponse({
+        'success': bool(salvas) or bool(ja_salvas),
+        'salvas': [{'processo_id': pk, 'etapa': etapa} for pk, etapa in salvas],
+        'ja_salvas': [{'processo_id': pk, 'etapa': etapa} for pk, etapa in ja_salvas],
+        'invalidos': invalidos,
+    })
+
 # ==============================================================================
 # VIEW DE RELATÓRIOS
 # ==============================================================================
 @login_required
 def relatorio_processos(request):
-    resultados = Processo.objects.select_related('orgao_responsavel', 'secretaria_responsavel').order_by('-data_abertura')
-    orgao_id = request.GET.get('orgao')
-    secretaria_id = request.GET.get('secretaria')
-    modalidade = request.GET.get('modalidade')
-    status = request.GET.get('status')
-    data_inicio = request.GET.get('data_inicio')
-    data_fim = request.GET.get('data_fim')
-    
-    if orgao_id: 
-        resultados = resultados.filter(orgao_responsavel__pk=orgao_id)
-    if secretaria_id: 
-        resultados = resultados.filter(secretaria_responsavel__pk=secretaria_id)
-    if modalidade: 
-        resultados = resultados.filter(modalidade=modalidade)
-    if status: 
-        resultados = resultados.filter(status=status)
-    if data_inicio: 
-        resultados = resultados.filter(data_abertura__gte=data_inicio)
-    if data_fim: 
-        resultados = resultados.filter(data_abertura__lte=data_fim)
-        
-    orgaos = Orgao.objects.all().order_by('nome')
-    secretarias = Secretaria.objects.all().order_by('nome')
+    filtro = FiltroProcessosForm(request.GET)
+    # Só as colunas da tabela e no máximo REPORT_MAX_RECORDS linhas, o mesmo limite das exportações
+    resultados = filtro.filtrar(Processo.objects.order_by('-data_abertura', '-pk')).values(
+        'pk', 'numero_processo', 'modalidade', 'status', 'data_abertura',
+        orgao=F('orgao_responsavel__nome'), secretaria=F('secretaria_responsavel__nome'),
+    )[:settings.REPORT_MAX_RECORDS]
+    # Mesma combinação de filtros válidos, mesmas versões dos modelos: mesmo resultado
+    resultados = obter_ou_calcular(
+        'relatorio_processos', (Processo, HistoricoProcesso, Orgao, Secretaria),
+        lambda: list(resultados), sorted(filtro.cleaned_data.items())
+    )
+    modalidades, status = dict(Processo.MODALIDADE_CHOICES), dict(Processo.STATUS_CHOICES)
+    for linha in resultados:
+        linha['modalidade_nome'] = modalidades.get(linha['modalidade'], linha['modalidade'])
+        linha['status_nome'] = status.get(linha['status'], linha['status'])
+    orgaos, secretarias = obter_ou_calcular('relatorio_opcoes', (Orgao, Secretaria), lambda: (
+        list(Orgao.objects.all().order_by('nome')), list(Secretaria.objects.all().order_by('nome'))
+    ))
     modalidades_choices = Processo.MODALIDADE_CHOICES
     status_choices = Processo.STATUS_CHOICES
     
@@ -692,88 +522,114 @@ def relatorio_processos(request):
         'secretarias': secretarias, 
         'modalidades': modalidades_choices, 
         'status_list': status_choices, 
+        'etapas': HistoricoProcesso.ETAPAS_CHOICES,
         'resultados': resultados, 
-        'filtros_aplicados': request.GET
+        'limite_atingido': len(resultados) >= settings.REPORT_MAX_RECORDS,
+        'filtros_aplicados': request.GET,
+        'filtro_form': filtro
     }
     return render(request, 'core/relatorio_processos.html', context)
 
-# --- VIEWS DE RELATÓRIOS FALTANTES (STUBS) ---
+@login_required
+def relatorio_tempos_etapas(request):
+    # ?recorte=MODALIDADE:PREGAO (padrão: todos os processos); &formato=json para o endpoint
+    dimensao, _, valor = request.GET.get('recorte', 'GERAL:').partition(':')
+    linhas = tempos_do_recorte(dimensao, valor)
+    mais_lenta = gargalo(linhas)
+
+    if request.GET.get('formato') == 'json':
+        return JsonResponse({
+            'dimensao': dimensao,
+            'valor': valor,
+            'rotulo': linhas[0].rotulo if linhas else '',
+            'calculado_em': linhas[0].calculado_em.isoformat() if linhas else None,
+            'gargalo': mais_lenta.etapa if mais_lenta else None,
+            'etapas': [{
+                'etapa': linha.etapa,
+                'nome': linha.get_etapa_display(),
+                'quantidade': linha.quantidade,
+                'media_dias': linha.media_dias,
+                'mediana_dias': linha.mediana_dias,
+                'p90_dias': linha.p90_dias,
+                'maximo_dias': linha.maximo_dias,
+            } for linha in linhas],
+        })
+
+    context = {
+        'linhas': linhas,
+        'gargalo': mais_lenta,
+        'recorte': f'{dimensao}:{valor}',
+        'recortes': recortes_disponiveis(),
+        'dimensoes': TempoEtapa.DIMENSAO_CHOICES,
+    }
+    return render(request, 'core/relatorio_tempos_etapas.html', context)
+
 @login_required
 def relatorio_fases_excel(request):
-    # Lógica para gerar Excel aqui
-    messages.info(request, "Função 'Relatório Fases Excel' ainda não implementada.")
-    return redirect('relatorio_processos')
+    # Arquivo temporário: o openpyxl write-only monta o XLSX em disco, não em memória
+    arquivo = tempfile.TemporaryFile(suffix='.xlsx')
+    gravar_excel_fases(request.GET, arquivo)
+    arquivo.seek(0)
+    return FileResponse(
+        arquivo, as_attachment=True, filename=nome_arquivo_fases_excel(),
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
 
 @login_required
 def relatorio_fases_pdf(request):
-    # Lógica para gerar PDF aqui
-    messages.info(request, "Função 'Relatório Fases PDF' ainda não implementada.")
-    return redirect('relatorio_processos')
-# --- FIM DOS STUBS DE RELATÓRIOS ---
+    return FileResponse(
+        renderizar_relatorio_fases_pdf(request.GET), as_attachment=True,
+        filename=nome_arquivo_fases_pdf(), content_type='application/pdf'
+    )
 
 
 @login_required
 def exportar_processos_csv(request):
-    resultados = Processo.objects.select_related('orgao_responsavel', 'secretaria_responsavel').prefetch_related('historico').order_by('-data_abertura')
-    # ... (lógica de filtro repetida, idealmente seria refatorada) ...
-    orgao_id = request.GET.get('orgao'); secretaria_id = request.GET.get('secretaria'); modalidade = request.GET.get('modalidade'); status = request.GET.get('status'); data_inicio = request.GET.get('data_inicio'); data_fim = request.GET.get('data_fim')
-    if orgao_id: resultados = resultados.filter(orgao_responsavel__pk=orgao_id)
-    if secretaria_id: resultados = resultados.filter(secretaria_responsavel__pk=secretaria_id)
-    if modalidade: resultados = resultados.filter(modalidade=modalidade)
-    if status: resultados = resultados.filter(status=status)
-    if data_inicio: resultados = resultados.filter(data_abertura__gte=data_inicio)
-    if data_fim: resultados = resultados.filter(data_abertura__lte=data_fim)
-    
-    response = HttpResponse(content_type='text/csv')
+    response = StreamingHttpResponse(linhas_csv_processos(request.GET), content_type='text/csv; charset=utf-8')
     response['Content-Disposition'] = f'attachment; filename="relatorio_processos_{date.today().strftime("%Y-%m-%d")}.csv"'
-    response.write(u'\ufeff'.encode('utf8'))
-    writer = csv.writer(response, delimiter=';')
-    writer.writerow(['Nº Processo', 'Objeto', 'Órgão', 'Status', 'Data de Abertura', 'Valor Estimado', 'Etapas Concluídas (Andamento)'])
-    
-    for processo in resultados:
-        etapas_concluidas = [item.get_etapa_display() for item in processo.historico.all()]
-        andamento = " | ".join(etapas_concluidas) if etapas_concluidas else "Nenhuma etapa iniciada"
-        writer.writerow([
-            processo.numero_processo, 
-            processo.objeto, 
-            processo.orgao_responsavel.nome, 
-            processo.get_status_display(), 
-            processo.data_abertura.strftime("%d/%m/%Y"), 
-            str(processo.valor_estimado).replace('.', ',') if processo.valor_estimado else '0,00', 
-            andamento
-        ])
     return response
 
 @login_required
 def exportar_processos_pdf(request):
-    resultados = Processo.objects.select_related('orgao_responsavel', 'secretaria_responsavel').prefetch_related('historico').order_by('-data_abertura')
-    # ... (lógica de filtro repetida) ...
-    orgao_id = request.GET.get('orgao'); secretaria_id = request.GET.get('secretaria'); modalidade = request.GET.get('modalidade'); status = request.GET.get('status'); data_inicio = request.GET.get('data_inicio'); data_fim = request.GET.get('data_fim')
-    if orgao_id: resultados = resultados.filter(orgao_responsavel__pk=orgao_id)
-    if secretaria_id: resultados = resultados.filter(secretaria_responsavel__pk=secretaria_id)
-    if modalidade: resultados = resultados.filter(modalidade=modalidade)
-    if status: resultados = resultados.filter(status=status)
-    if data_inicio: resultados = resultados.filter(data_abertura__gte=data_inicio)
-    if data_fim: resultados = resultados.filter(data_abertura__lte=dataim)
-    
-    context = {
-        'resultados': resultados, 
-        'data_hoje': date.today().strftime("%d/%m/%Y"), 
-        'filtros_aplicados': request.GET
-    }
-    html_string = render_to_string('core/relatorio_pdf_template.html', context)
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="relatorio_processos_{date.today().strftime("%Y-%m-%d")}.pdf"'
-    HTML(string=html_string).write_pdf(response)
-    return response
+    return FileResponse(
+        renderizar_relatorio_processos_pdf(request.GET), as_attachment=True,
+        filename=nome_arquivo_relatorio(), content_type='application/pdf'
+    )
 
 # ==============================================================================
 # VIEWS DE ÓRGÃOS, FORNECEDORES E RESPONSÁVEIS (CRUDs)
 # ==============================================================================
+LIMITE_SUGESTOES = 10
+
+def _sugerir(queryset, termo, campos_busca, valores):
+    """
+    Até LIMITE_SUGESTOES registros cujo CNPJ (se o termo só tem números e máscara)
+    ou nome começa com `termo`. Cada campo é uma consulta por intervalo no seu índice.
+    """
+    if re.fullmatch(r'[\d./\-\s]+', termo):
+        consultas = [('cnpj_digitos', somente_digitos(termo))]
+    else:
+        consultas = [(campo, normalizar_nome(termo)) for campo in campos_busca]
+    encontrados = {}
+    for campo, prefixo in consultas:
+        if not prefixo:
+            continue
+        for item in queryset.filter(**filtro_prefixo(campo, prefixo)).order_by(campo).values(*valores)[:LIMITE_SUGESTOES]:
+            encontrados.setdefault(item['pk'], item)
+    return list(encontrados.values())[:LIMITE_SUGESTOES]
+
 @login_required
 def orgao_list(request):
-    orgaos = Orgao.objects.all().order_by('nome')
-    return render(request, 'core/orgao_list.html', {'orgaos': orgaos})
+    return _listar_paginado(request, Orgao.objects.all(), ('nome', 'id'), 'core/orgao_list.html', 'core/parciais/orgao_linhas.html', 'orgaos')
+
+@login_required
+def orgao_sugestoes(request):
+    termo = request.GET.get('q', '').strip()
+    itens = _sugerir(Orgao.objects.all(), termo, ('nome_busca',), ('pk', 'nome', 'cnpj')) if len(termo) >= 2 else []
+    return JsonResponse({'resultados': [
+        {'id': item['pk'], 'nome': item['nome'], 'cnpj': item['cnpj'], 'url': reverse('orgao_update', args=[item['pk']])}
+        for item in itens
+    ]})
 
 @login_required
 def orgao_create(request):
@@ -808,8 +664,22 @@ def orgao_delete(request, pk):
 
 @login_required
 def fornecedor_list(request):
-    fornecedores = Fornecedor.objects.all().order_by('razao_social')
-    return render(request, 'core/fornecedor_list.html', {'fornecedores': fornecedores})
+    return _listar_paginado(request, Fornecedor.objects.all(), ('razao_social', 'id'), 'core/fornecedor_list.html', 'core/parciais/fornecedor_linhas.html', 'fornecedores')
+
+@login_required
+def fornecedor_sugestoes(request):
+    termo = request.GET.get('q', '').strip()
+    itens = _sugerir(
+        Fornecedor.objects.all(), termo, ('razao_social_busca', 'nome_fantasia_busca'),
+        ('pk', 'razao_social', 'nome_fantasia', 'cnpj')
+    ) if len(termo) >= 2 else []
+    return JsonResponse({'resultados': [
+        {
+            'id': item['pk'], 'razao_social': item['razao_social'], 'nome_fantasia': item['nome_fantasia'] or '',
+            'cnpj': item['cnpj'], 'url': reverse('fornecedor_update', args=[item['pk']])
+        }
+        for item in itens
+    ]})
 
 @login_required
 def fornecedor_create(request):
@@ -844,8 +714,8 @@ def fornecedor_delete(request, pk):
 
 @login_required
 def responsavel_list(request):
-    object_list = Responsavel.objects.select_related('secretaria').order_by('nome')
-    return render(request, 'core/responsavel_list.html', {'object_list': object_list})
+    object_list = Responsavel.objects.select_related('secretaria')
+    return _listar_paginado(request, object_list, ('nome', 'id'), 'core/responsavel_list.html', 'core/parciais/responsavel_linhas.html', 'object_list')
 
 @login_required
 def responsavel_create(request):
@@ -876,4 +746,20 @@ def responsavel_delete(request, pk):
     if request.method == 'POST': 
         obj.delete()
         return redirect('responsavel_list')
-    return render(request, 'core/responsavel_confirm_delete.html', {'object': obj})
\ No newline at end of file
+    return render(request, 'core/responsavel_confirm_delete.html', {'object': obj})
+
+# ==============================================================================
+# MÉTRICAS (PROMETHEUS)
+# ==============================================================================
+def metricas(request):
+    """
+    Métricas de todos os workers no formato texto do Prometheus (core/metricas.py).
+    O Prometheus se autentica com "Authorization: Bearer <METRICAS_TOKEN>"; sem o
+    token, só usuários staff logados.
+    """
+    token = settings.METRICAS_TOKEN
+    autorizado = bool(token) and constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}')
+    if not (autorizado or request.user.is_staff):
+        return HttpResponse('Não autorizado.', status=401, content_type='text/plain; charset=utf-8',
+                            headers={'WWW-Authenticate': 'Bearer'})
+    return HttpResponse(exposicao(), content_type='text/plain; version=0.0.4; charset=utf-8')